@@ -0,0 +1,30 @@
+import logging
+from django.core.management.base import BaseCommand, CommandError
+from accounts import onboarding
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Onboard members in bulk from a CSV or XLSX file: KYC, account, investment account and next of kin."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file with one member per row and a header row.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows validated and inserted per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate the file without creating anything.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "rb") as file:
+                result = onboarding.import_members(
+                    onboarding.read_rows(file, options["path"]),
+                    chunk_size=options["chunk_size"],
+                    dry_run=options["dry_run"],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for error in result["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        verb = "Validated" if options["dry_run"] else "Created"
+        self.stdout.write(f"{verb} {result['created']} member(s); rejected {len(result['errors'])} row(s).")
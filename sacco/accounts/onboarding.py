@@ -0,0 +1,246 @@
+"""
+Bulk member onboarding.
+
+A branch spreadsheet (CSV or XLSX) is read as a stream of rows. Each chunk of rows is
+validated in memory, checked for clashing emails, usernames, ID numbers, KRA PINs and phone
+numbers with one query per column, and written with one bulk insert per table: users, KYC, Account,
+InvestmentAccount and NextOfKin. The per-row signals are bypassed, so what they would have
+done is done here in bulk: names are copied to the user, the "KYC Submitted" and "Account
+Created" notifications are bulk inserted and the welcome emails are queued in the email outbox.
+"""
+import csv
+import io
+from datetime import date, datetime, time
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from phonenumber_field.serializerfields import PhoneNumberField
+from rest_framework import serializers
+from investments.models import InvestmentAccount
+from notifications.models import UserNotification
+from .models import KYC, Account, NextOfKin
+from .signals import send_email_notifications
+import logging
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Columns checked against the database and the rest of the file
+UNIQUE_COLUMNS = ('email', 'username', 'id_number', 'kra_pin', 'contact_number')
+
+
+class MemberRowSerializer(serializers.Serializer):
+    """
+    One spreadsheet row. Validation runs without queries; uniqueness is checked per chunk.
+    """
+    email = serializers.EmailField()
+    username = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    full_name = serializers.CharField(max_length=1000)
+    marital_status = serializers.ChoiceField(choices=KYC.MARITAL_STATUS)
+    gender = serializers.ChoiceField(choices=KYC.GENDER)
+    identity_type = serializers.ChoiceField(choices=KYC.IDENTITY_TYPE)
+    id_number = serializers.CharField(max_length=10)
+    date_of_birth = serializers.DateField()
+    kra_pin = serializers.CharField(max_length=15)
+    contact_number = PhoneNumberField()
+    country = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    county = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    town = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    employment_status = serializers.ChoiceField(choices=KYC.EMPLOYMENT_STATUS, required=False, allow_blank=True)
+    next_of_kin_name = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    next_of_kin_relationship = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    next_of_kin_contact_number = PhoneNumberField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        data['email'] = data['email'].lower()
+        data['username'] = data.get('username') or data['email']
+        data['date_of_birth'] = timezone.make_aware(datetime.combine(data['date_of_birth'], time.min))
+        data['contact_number'] = str(data['contact_number'])
+        kin = [data.get('next_of_kin_name'), data.get('next_of_kin_relationship'), data.get('next_of_kin_contact_number')]
+        if any(kin) and not all(kin):
+            raise serializers.ValidationError("Next of kin needs a name, relationship and contact number.")
+        return data
+
+
+def _cell(value):
+    # Spreadsheet cells come typed: dates as datetimes and numbers (ID numbers, PINs) as floats.
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, date):
+        return value
+    return str(value).strip()
+
+
+def read_rows(file, filename):
+    """
+    Yield the rows of a CSV or XLSX file, opened in binary mode, as dicts keyed by the header row.
+    """
+    if filename.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("XLSX imports need the openpyxl package; upload a CSV instead.")
+        rows = load_workbook(file, read_only=True, data_only=True).active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            if any(value not in (None, '') for value in values):
+                yield {column: _cell(value) for column, value in zip(header, values) if column}
+    elif filename.lower().endswith('.csv'):
+        for row in csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline='')):
+            yield {column.strip(): (value or '').strip() for column, value in row.items() if column}
+    else:
+        raise ValueError("Upload a .csv or .xlsx file.")
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for number, row in enumerate(rows, start=2):  # Row 1 is the header
+        chunk.append((number, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _taken(values):
+    """
+    Values of each unique column that are already registered: one query per column. An email
+    is taken once its user has a KYC; a user without one is onboarded in place.
+    """
+    users = User.objects.annotate(email_lower=Lower('email'))
+    return {
+        'email': set(users.filter(email_lower__in=values['email'], kyc__isnull=False).values_list('email_lower', flat=True)),
+        'username': set(users.filter(username__in=values['username']).exclude(email_lower__in=values['email']).values_list('username', flat=True)),
+        'id_number': set(KYC.objects.filter(id_number__in=values['id_number']).values_list('id_number', flat=True)),
+        'kra_pin': set(KYC.objects.filter(kra_pin__in=values['kra_pin']).values_list('kra_pin', flat=True)),
+        'contact_number': {str(number) for number in KYC.objects.filter(contact_number__in=values['contact_number']).values_list('contact_number', flat=True)},
+    }
+
+
+def validate_chunk(chunk, seen):
+    """
+    Validate a chunk of (row number, row) pairs. seen holds the unique values of earlier rows
+    in the file and is updated. Returns the valid rows and a list of {'row', 'errors'}.
+    """
+    valid, errors = [], []
+    for number, row in chunk:
+        serializer = MemberRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            errors.append({'row': number, 'errors': serializer.errors})
+
+    taken = _taken({column: {data[column] for _, data in valid} for column in UNIQUE_COLUMNS})
+    accepted = []
+    for number, data in valid:
+        clashes = {}
+        for column in UNIQUE_COLUMNS:
+            if data[column] in taken[column]:
+                clashes[column] = ["This value is already registered."]
+            elif data[column] in seen[column]:
+                clashes[column] = [f"Duplicate of row {seen[column][data[column]]}."]
+        if clashes:
+            errors.append({'row': number, 'errors': clashes})
+            continue
+        for column in UNIQUE_COLUMNS:
+            seen[column][data[column]] = number
+        accepted.append(data)
+    return accepted, errors
+
+
+@transaction.atomic
+def create_members(rows):
+    """
+    Create the user (when the email is new), KYC, Account, InvestmentAccount and next of kin
+    for each validated row with one bulk insert per table. Returns the created accounts.
+    """
+    existing = {
+        user.email_lower: user
+        for user in User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=[row['email'] for row in rows])
+    }
+    unusable_password = make_password(None)
+
+    new_users, renamed, kycs, kins = [], [], [], []
+    for row in rows:
+        first_name, _, last_name = row['full_name'].strip().partition(' ')
+        user = existing.get(row['email'])
+        if user is None:
+            user = User(
+                username=row['username'], email=row['email'], role='customer',
+                first_name=first_name, last_name=last_name.strip(), password=unusable_password,
+            )
+            new_users.append(user)
+        else:
+            user.first_name, user.last_name = first_name, last_name.strip()
+            renamed.append(user)
+
+        kyc = KYC(
+            user=user,
+            full_name=row['full_name'],
+            marital_status=row['marital_status'],
+            gender=row['gender'],
+            identity_type=row['identity_type'],
+            id_number=row['id_number'],
+            date_of_birth=row['date_of_birth'],
+            kra_pin=row['kra_pin'],
+            contact_number=row['contact_number'],
+            country=row.get('country') or None,
+            county=row.get('county') or None,
+            town=row.get('town') or None,
+            employment_status=row.get('employment_status') or None,
+            kyc_submitted=True,
+        )
+        kycs.append(kyc)
+        if row.get('next_of_kin_name'):
+            kins.append(NextOfKin(
+                kyc=kyc,
+                name=row['next_of_kin_name'],
+                relationship=row['next_of_kin_relationship'],
+                contact_number=row['next_of_kin_contact_number'],
+            ))
+
+    User.objects.bulk_create(new_users)
+    User.objects.bulk_update(renamed, ['first_name', 'last_name'])
+    KYC.objects.bulk_create(kycs)
+    accounts = Account.objects.bulk_create([Account(user=kyc.user, kyc=kyc) for kyc in kycs])
+    InvestmentAccount.objects.bulk_create([InvestmentAccount(account=account) for account in accounts])
+    NextOfKin.objects.bulk_create(kins)
+
+    notifications = []
+    for account in accounts:
+        notifications.append(UserNotification(
+            user_id=account.user_id, account=account, title="KYC Submitted",
+            message="Your KYC information has been submitted.", notification_type="info", user_action="kyc_submission",
+        ))
+        notifications.append(UserNotification(
+            user_id=account.user_id, account=account, title="Account Created",
+            message="Your account has been successfully created.", notification_type="success", user_action="account_creation",
+        ))
+    UserNotification.objects.bulk_create(notifications)
+    send_email_notifications([kyc.user.email for kyc in kycs])
+    return accounts
+
+
+def import_members(rows, chunk_size=500, dry_run=False):
+    """
+    Validate and import member rows chunk by chunk. Invalid rows are reported and skipped;
+    each chunk's valid rows are committed together. Returns {'created', 'errors'}.
+    """
+    seen = {column: {} for column in UNIQUE_COLUMNS}
+    created, errors = 0, []
+    for chunk in _chunks(rows, chunk_size):
+        accepted, chunk_errors = validate_chunk(chunk, seen)
+        errors.extend(chunk_errors)
+        if accepted and not dry_run:
+            created += len(create_members(accepted))
+        elif dry_run:
+            created += len(accepted)
+    logger.info(f"Member import: {created} {'valid' if dry_run else 'created'}, {len(errors)} rejected.")
+    return {'created': created, 'errors': errors}
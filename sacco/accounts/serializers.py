@@ -1,7 +1,10 @@
+from contextlib import contextmanager
 from rest_framework import serializers
-from django.db import transaction
+from django.db import transaction, IntegrityError
+from django.db.models import Q
 from .models import KYC, Account, NextOfKin
 from userManager.serializers import CustomUserSerializer
+from notifications import outbox
 
 class NextOfKinSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,64 +12,160 @@ class NextOfKinSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'relationship', 'contact_number']
 
 
+class NestedNextOfKinSerializer(NextOfKinSerializer):
+    # Writable so a KYC update can refer to its existing entries
+    id = serializers.IntegerField(required=False)
+
+
 class KYCSerializer(serializers.ModelSerializer):
-    next_of_kin = NextOfKinSerializer(many=True, required=False)
+    next_of_kin = NestedNextOfKinSerializer(many=True, required=False)
+
+    # Unique fields and the error reported when a value is taken. They are checked together in
+    # validate() rather than by one UniqueValidator query per field.
+    UNIQUE_FIELDS = {
+        'user': "KYC with this user already exists.",
+        'id_number': "This ID number is already in use.",
+        'kra_pin': "This KRA PIN is already in use.",
+        'contact_number': "This contact number is already in use.",
+    }
 
     class Meta:
         model = KYC
         fields = '__all__'
-
-    def validate_id_number(self, value):
-        if KYC.objects.filter(id_number=value).exclude(membership_number=self.instance.membership_number if self.instance else None).exists():
-            raise serializers.ValidationError("This ID number is already in use.")
+        extra_kwargs = {
+            'user': {'validators': []},
+            'id_number': {'validators': []},
+            'kra_pin': {'validators': []},
+            'contact_number': {'validators': []},
+        }
+
+    def unique_errors(self, attrs):
+        """
+        Errors for the unique values in attrs that another KYC already holds, found with one
+        OR query.
+        """
+        lookups = {field: attrs[field] for field in self.UNIQUE_FIELDS if attrs.get(field) is not None}
+        if not lookups:
+            return {}
+        condition = Q()
+        for field, value in lookups.items():
+            condition |= Q(**{field: value})
+        clashes = KYC.objects.filter(condition)
+        if self.instance is not None:
+            clashes = clashes.exclude(pk=self.instance.pk)
+
+        errors = {}
+        for row in clashes.values('user', *[field for field in lookups if field != 'user']):
+            for field, value in lookups.items():
+                if str(row[field]) == str(getattr(value, 'pk', value)):
+                    errors[field] = [self.UNIQUE_FIELDS[field]]
+        return errors
+
+    def validate_next_of_kin(self, value):
+        """
+        Ids refer to the entries of the KYC being edited; a new KYC has none yet.
+        """
+        ids = [kin['id'] for kin in value if kin.get('id') is not None]
+        if not ids:
+            return value
+        if self.instance is None:
+            raise serializers.ValidationError("Next of kin ids can only be sent when updating a KYC.")
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each next of kin id can only be sent once.")
+        foreign = set(ids) - set(self.instance.next_of_kin.filter(pk__in=ids).values_list('pk', flat=True))
+        if foreign:
+            raise serializers.ValidationError(
+                f"Next of kin {', '.join(str(pk) for pk in sorted(foreign))} do not belong to this KYC."
+            )
         return value
 
-    def validate_kra_pin(self, value):
-        if KYC.objects.filter(kra_pin=value).exclude(membership_number=self.instance.membership_number if self.instance else None).exists():
-            raise serializers.ValidationError("This KRA PIN is already in use.")
-        return value
+    def validate(self, attrs):
+        errors = self.unique_errors(attrs)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    @contextmanager
+    def unique_violations(self, attrs):
+        """
+        Run the block in a transaction and report a unique value taken by a concurrent request,
+        which slips past validate(), as a validation error.
+        """
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError:
+            errors = self.unique_errors(attrs)
+            if not errors:
+                raise
+            raise serializers.ValidationError(errors)
 
-    @transaction.atomic
     def create(self, validated_data):
         next_of_kin_data = validated_data.pop('next_of_kin', [])
-        kyc_instance = KYC.objects.create(**validated_data)
+        with self.unique_violations(validated_data):
+            kyc_instance = KYC.objects.create(**validated_data)
 
-        # Create Next of Kin entries if provided
-        for kin_data in next_of_kin_data:
-            NextOfKin.objects.create(kyc=kyc_instance, **kin_data)
+            # Create Next of Kin entries if provided
+            self.sync_next_of_kin(kyc_instance, next_of_kin_data, existing=[])
 
         return kyc_instance
 
-    def update_next_of_kin(self, kyc_instance, next_of_kin_data):
-        existing_kin_ids = [kin.get('id') for kin in next_of_kin_data if kin.get('id')]
-        kyc_instance.next_of_kin.exclude(id__in=existing_kin_ids).delete()
-
+    def sync_next_of_kin(self, kyc_instance, next_of_kin_data, existing=None):
+        """
+        Make the KYC's next of kin match next_of_kin_data: entries with a known id are updated,
+        entries without one are created and the rest are deleted. The diff is worked out in
+        memory and applied with one bulk_update, one bulk_create and one delete; additions
+        raise a single notification.
+        """
+        if existing is None:
+            existing = kyc_instance.next_of_kin.all()
+        existing = {kin.pk: kin for kin in existing}
+
+        changed, created, fields = [], [], set()
         for kin_data in next_of_kin_data:
-            kin_id = kin_data.get('id')
-            if kin_id:
-                NextOfKin.objects.filter(id=kin_id, kyc=kyc_instance).update(**kin_data)
-            else:
-                NextOfKin.objects.create(kyc=kyc_instance, **kin_data)
+            kin_data = dict(kin_data)
+            kin_id = kin_data.pop('id', None)
+            if kin_id is None:
+                created.append(NextOfKin(kyc=kyc_instance, **kin_data))
+                continue
+            kin = existing.pop(kin_id, None)
+            if kin is None:
+                continue  # Deleted since validation
+            updates = {attr: value for attr, value in kin_data.items() if getattr(kin, attr) != value}
+            if updates:
+                for attr, value in updates.items():
+                    setattr(kin, attr, value)
+                fields.update(updates)
+                changed.append(kin)
+
+        if existing:
+            NextOfKin.objects.filter(pk__in=existing).delete()
+        if changed:
+            NextOfKin.objects.bulk_update(changed, sorted(fields))
+        if created:
+            NextOfKin.objects.bulk_create(created)
+            outbox.notify(
+                user_id=kyc_instance.user_id,
+                title="Next of Kin Added",
+                message="A new next of kin has been added to your account." if len(created) == 1
+                else f"{len(created)} new next of kin have been added to your account.",
+                notification_type="info",
+                user_action="next_of_kin_added"
+            )
 
-    @transaction.atomic
     def update(self, instance, validated_data):
-        next_of_kin_data = validated_data.pop('next_of_kin', [])
-        self.update_next_of_kin(instance, next_of_kin_data)
+        # Leaving next_of_kin out (e.g. in a partial update) keeps the current entries
+        next_of_kin_data = validated_data.pop('next_of_kin', None)
+        with self.unique_violations(validated_data):
+            if next_of_kin_data is not None:
+                self.sync_next_of_kin(instance, next_of_kin_data)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
 
         return instance
 
-    def validate_user(self, value):
-        query = KYC.objects.filter(user=value)
-        if self.instance:
-            query = query.exclude(user=self.instance.user)
-        if query.exists():
-            raise serializers.ValidationError("KYC with this user already exists.")
-        return value
-
 class AccountSerializer(serializers.ModelSerializer):
     kyc = KYCSerializer(required=False)
     user = CustomUserSerializer(required=False)
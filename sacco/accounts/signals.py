@@ -3,8 +3,8 @@ from django.dispatch import receiver
 from .models import Account,KYC
 from django.core.exceptions import ValidationError
 from django.conf import settings
-from django.core.mail import send_mail
 from userManager.models import CustomUser
+from notifications.models import OutgoingEmail
 
 @receiver(post_save, sender=Account)
 def account_created(sender, instance, created, **kwargs):
@@ -16,18 +16,17 @@ def account_created(sender, instance, created, **kwargs):
         send_email_notification(instance.user.email)
 
 def send_email_notification(user_email):
+    send_email_notifications([user_email])
+
+def send_email_notifications(user_emails):
     name = settings.SITENAME
     subject = "Account Created Successfully"
     message = "Hello, your account has been created successfully. Welcome to our " + name + " platform!"
-    from_email = settings.EMAIL_HOST_USER  
-    
-    send_mail(
-        subject,
-        message,
-        from_email,
-        [user_email],
-        fail_silently=False,
-    )
+    from_email = settings.EMAIL_HOST_USER
+
+    # Queued with the account and delivered by the send_emails command
+    OutgoingEmail.queue(user_emails, subject, message, from_email)
+
 @receiver(post_save, sender=KYC)
 def kyc_created(sender, instance, created, **kwargs):
     if created:
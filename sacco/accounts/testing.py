@@ -0,0 +1,34 @@
+"""
+Fixtures shared by the apps' test suites.
+"""
+import datetime
+from userManager.models import CustomUser
+from .models import KYC, Account
+
+
+def make_member(n, balance=0):
+    """
+    Create a customer with a submitted KYC and return the Account created for it.
+    n keeps the member's unique fields apart from other members'.
+    """
+    user = CustomUser.objects.create_user(
+        username=f"member{n}", email=f"member{n}@example.com", password="x", role="customer"
+    )
+    kyc = KYC.objects.create(
+        user=user, full_name=f"Member {n}", marital_status="single", gender="male",
+        identity_type="national_id_card", id_number=f"ID{n:06d}",
+        date_of_birth=datetime.datetime(1990, 1, 1, tzinfo=datetime.timezone.utc),
+        kra_pin=f"KRA{n:06d}", contact_number=f"+2547{n:08d}",
+    )
+    if balance:
+        Account.objects.filter(pk=kyc.account.pk).update(account_balance=balance)
+    return Account.objects.get(pk=kyc.account.pk)
+
+
+def make_admin(username="test-admin"):
+    """
+    Create a superuser with the admin role. The "admin" username is taken by a data migration.
+    """
+    return CustomUser.objects.create_superuser(
+        username=username, email=f"{username}@example.com", password="x", role="admin"
+    )
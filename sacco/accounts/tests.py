@@ -1,3 +1,228 @@
-from django.test import TestCase
+import csv
+import io
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APITestCase
+from investments.models import InvestmentAccount
+from notifications.models import UserNotification, OutgoingEmail
+from userManager.models import CustomUser
+from .models import KYC, Account, NextOfKin
+from .serializers import KYCSerializer
+from .testing import make_member, make_admin
+from . import onboarding
 
-# Create your tests here.
+HEADER = [
+    "email", "full_name", "marital_status", "gender", "identity_type", "id_number", "date_of_birth",
+    "kra_pin", "contact_number", "next_of_kin_name", "next_of_kin_relationship", "next_of_kin_contact_number",
+]
+
+
+def member_row(n, **fields):
+    row = {
+        "email": f"new{n}@example.com", "full_name": f"New Member{n}", "marital_status": "single",
+        "gender": "female", "identity_type": "national_id_card", "id_number": f"NEW{n:05d}",
+        "date_of_birth": "1991-02-03", "kra_pin": f"PIN{n:06d}", "contact_number": f"+2547{n + 500:08d}",
+        "next_of_kin_name": "", "next_of_kin_relationship": "", "next_of_kin_contact_number": "",
+    }
+    row.update(fields)
+    return row
+
+
+def csv_file(rows, name="members.csv"):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=HEADER)
+    writer.writeheader()
+    writer.writerows(rows)
+    return SimpleUploadedFile(name, buffer.getvalue().encode(), content_type="text/csv")
+
+
+class MemberImportTests(APITestCase):
+
+    def setUp(self):
+        self.existing = make_member(1)
+        self.client.force_authenticate(make_admin("branch-admin"))
+
+    def upload(self, rows, **data):
+        return self.client.post("/api/kyc/import/", {"file": csv_file(rows), **data}, format="multipart")
+
+    def test_valid_rows_are_created_and_clashes_reported(self):
+        rows = [
+            member_row(1, next_of_kin_name="Kin One", next_of_kin_relationship="sister",
+                       next_of_kin_contact_number="+254799000001"),
+            member_row(2),
+            member_row(3, id_number=self.existing.kyc.id_number),
+            member_row(4, kra_pin=member_row(2)["kra_pin"]),
+        ]
+
+        response = self.upload(rows)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [4, 5])
+        self.assertEqual(response.data["errors"][1]["errors"], {"kra_pin": ["Duplicate of row 3."]})
+        accounts = Account.objects.filter(user__email__in=["new1@example.com", "new2@example.com"])
+        self.assertEqual(accounts.count(), 2)
+        self.assertEqual(InvestmentAccount.objects.filter(account__in=accounts).count(), 2)
+        self.assertEqual(NextOfKin.objects.get(kyc__user__email="new1@example.com").name, "Kin One")
+        self.assertEqual(CustomUser.objects.get(email="new2@example.com").last_name, "Member2")
+        self.assertEqual(UserNotification.objects.filter(account__in=accounts).count(), 4)
+        self.assertEqual(OutgoingEmail.objects.filter(recipient__in=["new1@example.com", "new2@example.com"]).count(), 2)
+        self.assertEqual(mail.outbox, [])
+
+    def test_dry_run_only_validates(self):
+        response = self.upload([member_row(1), member_row(2, gender="unknown")], dry_run="true")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"][0]["row"], 3)
+        self.assertFalse(KYC.objects.filter(id_number=member_row(1)["id_number"]).exists())
+
+    def test_earlier_chunks_count_as_registered(self):
+        rows = [member_row(1), member_row(2, email="NEW1@example.com"), member_row(3)]
+
+        result = onboarding.import_members(onboarding.read_rows(csv_file(rows), "members.csv"), chunk_size=1)
+
+        self.assertEqual(result["created"], 2)
+        self.assertEqual([error["row"] for error in result["errors"]], [3])
+        self.assertEqual(result["errors"][0]["errors"]["email"], ["This value is already registered."])
+
+    def test_user_without_kyc_is_onboarded_in_place(self):
+        user = CustomUser.objects.create_user(username="walkin", email="new1@example.com", password="x", role="customer")
+
+        response = self.upload([member_row(1)])
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(Account.objects.get(user=user).kyc.full_name, "New Member1")
+        self.assertEqual(CustomUser.objects.filter(email="new1@example.com").count(), 1)
+
+    def test_only_csv_or_xlsx_is_accepted(self):
+        upload = SimpleUploadedFile("members.txt", b"email\n", content_type="text/plain")
+        response = self.client.post("/api/kyc/import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_requires_admin(self):
+        self.client.force_authenticate(self.existing.user)
+        self.assertEqual(self.upload([member_row(1)]).status_code, 403)
+
+
+class KYCUniquenessTests(APITestCase):
+
+    def setUp(self):
+        self.existing = make_member(1)
+        self.user = CustomUser.objects.create_user(username="applicant", email="applicant@example.com", password="x", role="customer")
+
+    def kyc_data(self, **fields):
+        data = {
+            "user": self.user.pk, "full_name": "Applicant", "marital_status": "single", "gender": "female",
+            "identity_type": "national_id_card", "id_number": "APP000001", "date_of_birth": "1992-04-05T00:00:00Z",
+            "kra_pin": "APPPIN0001", "contact_number": "+254711000999",
+        }
+        data.update(fields)
+        return data
+
+    def test_clashes_are_found_with_one_query(self):
+        kyc = self.existing.kyc
+        serializer = KYCSerializer(data=self.kyc_data(id_number=kyc.id_number, kra_pin=kyc.kra_pin))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(serializer.is_valid())
+
+        self.assertEqual(serializer.errors, {
+            "id_number": ["This ID number is already in use."],
+            "kra_pin": ["This KRA PIN is already in use."],
+        })
+        self.assertEqual(len([query for query in queries if '"accounts_kyc"' in query["sql"]]), 1)
+
+    def test_own_values_are_not_clashes(self):
+        kyc = self.existing.kyc
+        serializer = KYCSerializer(kyc, data={"id_number": kyc.id_number, "user": kyc.user_id}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_value_taken_after_validation_is_a_field_error(self):
+        serializer = KYCSerializer(data=self.kyc_data(id_number="RACE00001"))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        KYC.objects.filter(pk=self.existing.kyc.pk).update(id_number="RACE00001")
+
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertEqual(raised.exception.detail, {"id_number": ["This ID number is already in use."]})
+        self.assertFalse(KYC.objects.filter(user=self.user).exists())
+
+
+class NextOfKinSyncTests(APITestCase):
+
+    def setUp(self):
+        self.member, self.other = make_member(1), make_member(2)
+        self.kyc = self.member.kyc
+        self.kin = [
+            NextOfKin.objects.create(kyc=self.kyc, name=name, relationship="sibling", contact_number=f"+25470000{n:04d}")
+            for n, name in enumerate(["Amina", "Baraka", "Chege"])
+        ]
+        self.foreign = NextOfKin.objects.create(kyc=self.other.kyc, name="Stranger", relationship="friend", contact_number="+254700009999")
+        self.client.force_authenticate(make_admin("kyc-admin"))
+
+    def entry(self, kin=None, **fields):
+        data = {"name": "New Kin", "relationship": "cousin", "contact_number": "+254700001111"}
+        if kin is not None:
+            data.update(id=kin.pk, name=kin.name, relationship=kin.relationship, contact_number=str(kin.contact_number))
+        data.update(fields)
+        return data
+
+    def edit(self, entries):
+        return self.client.patch(f"/api/kyc/{self.kyc.pk}/", {"next_of_kin": entries}, format="json")
+
+    def names(self, kyc):
+        return sorted(kyc.next_of_kin.values_list("name", flat=True))
+
+    def test_entries_are_updated_created_and_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.edit([self.entry(self.kin[0], name="Amina W."), self.entry(self.kin[1]), self.entry()])
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.names(self.kyc), ["Amina W.", "Baraka", "New Kin"])
+        self.assertEqual(NextOfKin.objects.get(pk=self.kin[0].pk).name, "Amina W.")
+        self.assertFalse(NextOfKin.objects.filter(pk=self.kin[2].pk).exists())
+        self.assertEqual(UserNotification.objects.filter(user=self.member.user, user_action="next_of_kin_added").count(), 1)
+
+    def test_edit_cost_does_not_grow_with_entries(self):
+        def kin_queries(entries):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.edit(entries).status_code, 200)
+            return len([query for query in queries if '"accounts_nextofkin"' in query["sql"]])
+
+        small = kin_queries([self.entry(self.kin[0], name="A"), self.entry()])
+        large = kin_queries([self.entry(kin, name=f"Renamed {kin.pk}") for kin in self.kin[:1]]
+                            + [self.entry(name=f"Kin {n}") for n in range(4)])
+        self.assertEqual(small, large)
+
+    def test_foreign_ids_are_rejected(self):
+        response = self.edit([self.entry(self.kin[0]), self.entry(self.foreign, name="Hijacked")])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("do not belong to this KYC", str(response.data["next_of_kin"]))
+        self.assertEqual(NextOfKin.objects.get(pk=self.foreign.pk).name, "Stranger")
+        self.assertEqual(self.names(self.kyc), ["Amina", "Baraka", "Chege"])
+
+    def test_ids_are_rejected_on_create(self):
+        user = CustomUser.objects.create_user(username="applicant", email="applicant@example.com", password="x", role="customer")
+        data = {
+            "user": user.pk, "full_name": "Applicant", "marital_status": "single", "gender": "female",
+            "identity_type": "national_id_card", "id_number": "APP000001", "date_of_birth": "1992-04-05T00:00:00Z",
+            "kra_pin": "APPPIN0001", "contact_number": "+254711000999", "next_of_kin": [self.entry(self.foreign)],
+        }
+
+        response = self.client.post("/api/kyc/", data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("next_of_kin", response.data)
+        self.assertFalse(KYC.objects.filter(user=user).exists())
+        self.assertEqual(NextOfKin.objects.get(pk=self.foreign.pk).kyc_id, self.other.kyc.pk)
+
+    def test_partial_update_without_entries_keeps_them(self):
+        response = self.client.patch(f"/api/kyc/{self.kyc.pk}/", {"town": "Nakuru"}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(self.kyc), ["Amina", "Baraka", "Chege"])
@@ -1,9 +1,12 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, permissions
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from .models import KYC, Account, NextOfKin
 from .serializers import KYCSerializer, AccountSerializer, NextOfKinSerializer,CustomUserSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import NextOfKinFilter, KYCFilter, AccountFilter
+from . import onboarding
 
 class KYCViewSet(viewsets.ModelViewSet):
     queryset = KYC.objects.all()
@@ -34,6 +37,22 @@ class KYCViewSet(viewsets.ModelViewSet):
 
         return super().create(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser], permission_classes=[permissions.IsAdminUser])
+    def import_members(self, request):
+        """
+        Onboard members in bulk from an uploaded CSV or XLSX file ("file"). Valid rows are
+        created and the rejected ones are listed with their errors; "dry_run" only validates.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "A CSV or XLSX file is required."}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        try:
+            result = onboarding.import_members(onboarding.read_rows(upload, upload.name), dry_run=dry_run)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
 
 class AccountViewSet(viewsets.ModelViewSet):
     queryset = Account.objects.all()
@@ -1,7 +1,7 @@
 # admin.py
 from django.contrib import admin
 from django.db.models import Sum
-from .models import InvestmentType, Investment, InvestmentAccount, UserInvestment, Dividend
+from .models import InvestmentType, Investment, InvestmentAccount, UserInvestment, Dividend, DividendRun, DividendRunResult, InvestmentValuation
 
 # Investment Type Model Admin
 class InvestmentTypeAdmin(admin.ModelAdmin):
@@ -49,9 +49,31 @@ class DividendAdmin(admin.ModelAdmin):
         return obj.calculate_dividend
     calculate_dividend.admin_order_field = 'calculate_dividend'  # Allows ordering by calculated dividend
 
+# Dividend Run Model Admin
+class DividendRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'investment_type', 'total_amount', 'distributed_amount', 'holder_count', 'status', 'created_at', 'distributed_at']
+    list_filter = ['investment_type', 'status']
+    readonly_fields = ['distributed_amount', 'holder_count', 'status', 'created_at', 'distributed_at']
+
+# Dividend Run Result Model Admin
+class DividendRunResultAdmin(admin.ModelAdmin):
+    list_display = ['id', 'run', 'investment_account', 'amount']
+    list_filter = ['run__investment_type']
+    search_fields = ['investment_account__account__user__username']
+    raw_id_fields = ['run', 'investment_account']
+
+# Investment Valuation Model Admin
+class InvestmentValuationAdmin(admin.ModelAdmin):
+    list_display = ['investment', 'date', 'nav', 'amount_invested', 'unit_value', 'period_return']
+    list_filter = ['investment__investment_type', 'date']
+    raw_id_fields = ['investment']
+
 # Register the models with the custom admin classes
 admin.site.register(InvestmentType, InvestmentTypeAdmin)
 admin.site.register(Investment, InvestmentAdmin)
 admin.site.register(InvestmentAccount, InvestmentAccountAdmin)
 admin.site.register(UserInvestment, UserInvestmentAdmin)
 admin.site.register(Dividend, DividendAdmin)
+admin.site.register(DividendRun, DividendRunAdmin)
+admin.site.register(DividendRunResult, DividendRunResultAdmin)
+admin.site.register(InvestmentValuation, InvestmentValuationAdmin)
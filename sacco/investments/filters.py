@@ -17,7 +17,7 @@ class InvestmentFilter(django_filters.FilterSet):
         fields = ["investment_type", "is_active", "maturity_date"]
 
 class UserInvestmentFilter(django_filters.FilterSet):
-    account = django_filters.NumberFilter(field_name="account__id")
+    account = django_filters.CharFilter(field_name="account")
     investment = django_filters.NumberFilter(field_name="investment__id")
     min_amount = django_filters.NumberFilter(field_name="invested_amount", lookup_expr="gte")
     max_amount = django_filters.NumberFilter(field_name="invested_amount", lookup_expr="lte")
@@ -29,7 +29,7 @@ class UserInvestmentFilter(django_filters.FilterSet):
         fields = ["account", "investment"]
 
 class InvestmentAccountFilter(django_filters.FilterSet):
-    account = django_filters.NumberFilter(field_name="account__id")
+    account = django_filters.CharFilter(field_name="account")
     min_total_investments = django_filters.NumberFilter(field_name="total_investments", lookup_expr="gte")
     max_total_investments = django_filters.NumberFilter(field_name="total_investments", lookup_expr="lte")
     has_reached_limit = django_filters.BooleanFilter(method="filter_has_reached_limit")
@@ -43,7 +43,7 @@ class InvestmentAccountFilter(django_filters.FilterSet):
 
 class DividendFilter(django_filters.FilterSet):
     investment_type = django_filters.ModelChoiceFilter(queryset=InvestmentType.objects.all())
-    investment_account = django_filters.NumberFilter(field_name="investment_account__id")
+    investment_account = django_filters.CharFilter(field_name="investment_account")
     min_amount = django_filters.NumberFilter(field_name="amount", lookup_expr="gte")
     max_amount = django_filters.NumberFilter(field_name="amount", lookup_expr="lte")
     date_distributed_after = django_filters.DateFilter(field_name="date_distributed", lookup_expr="gte")
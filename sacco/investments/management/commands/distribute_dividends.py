@@ -0,0 +1,35 @@
+import logging
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from investments.models import DividendRun, InvestmentType
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Distribute a pending dividend run, or declare and distribute a new one for an investment type."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--run", type=int, help="Id of a pending DividendRun to distribute.")
+        parser.add_argument("--type", type=int, dest="investment_type", help="InvestmentType id to declare a new run for.")
+        parser.add_argument("--amount", type=Decimal, help="Pool to distribute when declaring a new run.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Holders paid per batch.")
+
+    def handle(self, *args, **options):
+        if options["run"]:
+            try:
+                run = DividendRun.objects.select_related("investment_type").get(pk=options["run"])
+            except DividendRun.DoesNotExist:
+                raise CommandError(f"Dividend run {options['run']} does not exist.")
+        elif options["investment_type"] and options["amount"]:
+            try:
+                investment_type = InvestmentType.objects.get(pk=options["investment_type"])
+            except InvestmentType.DoesNotExist:
+                raise CommandError(f"Investment type {options['investment_type']} does not exist.")
+            run = DividendRun.objects.create(investment_type=investment_type, total_amount=options["amount"])
+        else:
+            raise CommandError("Pass --run, or both --type and --amount.")
+
+        if not run.distribute(chunk_size=options["chunk_size"]):
+            raise CommandError(f"Dividend run {run.pk} has already been distributed.")
+        self.stdout.write(f"Distributed {run.distributed_amount} to {run.holder_count} holder(s) for {run.investment_type.name}.")
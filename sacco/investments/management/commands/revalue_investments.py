@@ -0,0 +1,17 @@
+import logging
+from django.core.management.base import BaseCommand
+from investments.models import InvestmentAccount
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Recompute InvestmentAccount profit/loss from current investment values in a single UPDATE."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--investment", type=int, action="append", dest="investments", help="Only revalue holders of this investment (repeatable).")
+
+    def handle(self, *args, **options):
+        updated = InvestmentAccount.revalue(investment_ids=options["investments"])
+        logger.info(f"Revalued profit/loss on {updated} investment account(s).")
+        self.stdout.write(f"Revalued {updated} investment account(s).")
@@ -0,0 +1,36 @@
+import logging
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from investments.models import Investment, InvestmentValuation
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Record a NAV point for every active investment, keeping any point already recorded for the day."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, default=None, help="Valuation date (YYYY-MM-DD), defaults to today.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Investments valued per batch.")
+
+    def handle(self, *args, **options):
+        on_date = options["date"] or timezone.now().date()
+        chunk_size = options["chunk_size"]
+        investments = Investment.objects.filter(is_active=True).only("pk", "current_value", "amount_invested").order_by("pk")
+        # Points already recorded for the day are kept, so only rows that appear are counted, once each.
+        day_points = InvestmentValuation.objects.filter(date=on_date).values("pk").distinct()
+        already_recorded = day_points.count()
+
+        batch = []
+        for investment in investments.iterator(chunk_size=chunk_size):
+            batch.append(investment)
+            if len(batch) >= chunk_size:
+                InvestmentValuation.record(batch, on_date, overwrite=False)
+                batch = []
+        if batch:
+            InvestmentValuation.record(batch, on_date, overwrite=False)
+
+        recorded = day_points.count() - already_recorded
+        logger.info(f"Recorded {recorded} new NAV point(s) for {on_date}.")
+        self.stdout.write(f"Recorded {recorded} new NAV point(s) for {on_date}.")
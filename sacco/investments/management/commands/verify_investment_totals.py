@@ -0,0 +1,22 @@
+import logging
+from django.core.management.base import BaseCommand
+from investments.models import InvestmentAccount
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Compare running InvestmentAccount totals with their holdings and correct any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted accounts without correcting them.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Accounts corrected per bulk update.")
+
+    def handle(self, *args, **options):
+        drifted = InvestmentAccount.verify_totals(fix=not options["dry_run"], batch_size=options["batch_size"])
+        if drifted:
+            action = "found" if options["dry_run"] else "corrected"
+            logger.info(f"Investment totals {action} on {drifted} account(s).")
+            self.stdout.write(f"{drifted} investment account(s) {action}.")
+        else:
+            self.stdout.write("All investment account totals match their holdings.")
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:26
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DividendRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('distributed_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('holder_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('distributed', 'Distributed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('distributed_at', models.DateTimeField(blank=True, null=True)),
+                ('investment_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dividend_runs', to='investments.investmenttype')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DividendRunResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('investment_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dividend_results', to='investments.investmentaccount')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='investments.dividendrun')),
+            ],
+            options={
+                'unique_together': {('run', 'investment_account')},
+            },
+        ),
+    ]
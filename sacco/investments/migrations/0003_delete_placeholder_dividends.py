@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+def delete_unused_placeholder_dividends(apps, schema_editor):
+    """
+    Drop the zero rows created for every account and investment type when the account did
+    not hold that type.
+    """
+    Dividend = apps.get_model('investments', 'Dividend')
+    UserInvestment = apps.get_model('investments', 'UserInvestment')
+    holdings = UserInvestment.objects.filter(
+        account=models.OuterRef('investment_account'),
+        investment__investment_type=models.OuterRef('investment_type'),
+    )
+    Dividend.objects.filter(is_distributed=False, amount=0).exclude(models.Exists(holdings)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0002_dividendrun_dividendrunresult'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_unused_placeholder_dividends, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0003_delete_placeholder_dividends'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvestmentValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('nav', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('amount_invested', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('unit_value', models.DecimalField(decimal_places=6, max_digits=12)),
+                ('period_return', models.DecimalField(blank=True, decimal_places=4, max_digits=9, null=True)),
+                ('investment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='investments.investment')),
+            ],
+            options={
+                'ordering': ['investment', 'date'],
+                'unique_together': {('investment', 'date')},
+            },
+        ),
+    ]
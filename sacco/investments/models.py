@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Q, Case, When, Value
+from django.db.models.functions import Coalesce, TruncWeek, TruncMonth
+from datetime import timedelta
 from django.utils import timezone
 from accounts.models import Account, KYC
-from decimal import Decimal
+from decimal import Decimal, ROUND_DOWN
 import logging
 logger = logging.getLogger(__name__)
 
@@ -24,9 +27,19 @@ class Investment(models.Model):
     description = models.TextField()
     is_active = models.BooleanField(default=True)
 
+    # Changes to these are announced to every holder; amount_invested and current_value move with each new holding.
+    USER_VISIBLE_FIELDS = ("investment_type_id", "return_on_investment", "maturity_date", "description", "is_active")
+
     def __str__(self):
         return f"{self.investment_type.name} Investment"
 
+    def has_user_visible_changes(self):
+        """
+        Whether this save changes a field holders see. The old values are read by a pre_save signal.
+        """
+        old_values = getattr(self, "_old_values", None)
+        return bool(old_values) and any(old_values[field] != getattr(self, field) for field in self.USER_VISIBLE_FIELDS)
+
     @property
     def profit_or_loss(self):
         return self.current_value - self.amount_invested
@@ -46,6 +59,117 @@ class Investment(models.Model):
     def save(self, *args, **kwargs):
         self.current_value = self.calculate_current_value()  # Auto-update before saving
         super().save(*args, **kwargs)
+# Investment Valuation Model
+class InvestmentValuation(models.Model):
+    """
+    Daily NAV point for an Investment. One row per (investment, date); later saves on the same
+    day overwrite that day's point. unit_value is the value of one unit invested, so
+    period_return is not moved by money flowing in or out.
+    """
+    INTERVALS = {
+        'daily': None,
+        'weekly': TruncWeek,
+        'monthly': TruncMonth,
+    }
+
+    investment = models.ForeignKey(Investment, on_delete=models.CASCADE, related_name="valuations")
+    date = models.DateField()
+    nav = models.DecimalField(max_digits=15, decimal_places=2)
+    amount_invested = models.DecimalField(max_digits=15, decimal_places=2)
+    unit_value = models.DecimalField(max_digits=12, decimal_places=6)
+    period_return = models.DecimalField(max_digits=9, decimal_places=4, null=True, blank=True)  # % since the previous point
+
+    class Meta:
+        unique_together = ('investment', 'date')
+        ordering = ['investment', 'date']
+
+    def __str__(self):
+        return f"{self.investment_id} NAV {self.nav} on {self.date}"
+
+    @staticmethod
+    def _unit_value(nav, amount_invested):
+        if amount_invested > 0:
+            return (nav / amount_invested).quantize(Decimal('0.000001'))
+        return Decimal('1.000000')
+
+    @staticmethod
+    def _return(unit_value, previous_unit_value):
+        if previous_unit_value:
+            return ((unit_value / previous_unit_value - 1) * 100).quantize(Decimal('0.0001'))
+        return None
+
+    @classmethod
+    def record(cls, investments, on_date=None, overwrite=True, batch_size=1000):
+        """
+        Record each investment's current value as its point for on_date, with the return since
+        its previous point. Previous points come from one correlated subquery. overwrite replaces
+        an existing point for the day; otherwise existing points are kept (bulk insert, ignoring conflicts).
+        """
+        on_date = on_date or timezone.now().date()
+        investment_ids = [investment.pk for investment in investments]
+        previous = dict(
+            Investment.objects.filter(pk__in=investment_ids).annotate(
+                previous_unit_value=Subquery(
+                    cls.objects.filter(investment=OuterRef('pk'), date__lt=on_date)
+                    .order_by('-date').values('unit_value')[:1]
+                )
+            ).values_list('pk', 'previous_unit_value')
+        )
+
+        points = []
+        for investment in investments:
+            unit_value = cls._unit_value(investment.current_value, investment.amount_invested)
+            points.append(cls(
+                investment_id=investment.pk,
+                date=on_date,
+                nav=investment.current_value,
+                amount_invested=investment.amount_invested,
+                unit_value=unit_value,
+                period_return=cls._return(unit_value, previous.get(investment.pk)),
+            ))
+
+        if overwrite:
+            for point in points:
+                cls.objects.update_or_create(
+                    investment_id=point.investment_id, date=on_date,
+                    defaults={field: getattr(point, field) for field in ('nav', 'amount_invested', 'unit_value', 'period_return')},
+                )
+        else:
+            cls.objects.bulk_create(points, batch_size=batch_size, ignore_conflicts=True)
+        return points
+
+    @classmethod
+    def series(cls, investment_id, interval='daily', start=None, end=None):
+        """
+        NAV history for one investment, downsampled to the last point of each week or month.
+        Daily points use their stored returns; coarser intervals get returns between the
+        points kept.
+        """
+        points = cls.objects.filter(investment_id=investment_id)
+        if start:
+            points = points.filter(date__gte=start)
+        if end:
+            points = points.filter(date__lte=end)
+
+        trunc = cls.INTERVALS[interval]
+        if trunc is not None:
+            closes = points.annotate(bucket=trunc('date')).values('bucket').annotate(close=models.Max('date')).values('close')
+            points = points.filter(date__in=Subquery(closes))
+
+        series, previous_unit_value = [], None
+        for date, nav, amount_invested, unit_value, period_return in points.order_by('date').values_list(
+            'date', 'nav', 'amount_invested', 'unit_value', 'period_return'
+        ):
+            series.append({
+                'date': date,
+                'nav': nav,
+                'amount_invested': amount_invested,
+                'unit_value': unit_value,
+                'return': period_return if trunc is None else cls._return(unit_value, previous_unit_value),
+            })
+            previous_unit_value = unit_value
+        return series
+
 # Investment Account Model
 class InvestmentAccount(models.Model):
     account = models.OneToOneField(Account, on_delete=models.CASCADE, primary_key=True)
@@ -69,10 +193,141 @@ class InvestmentAccount(models.Model):
 
     @property
     def has_reached_investment_limit(self):
-        total_invested = self.user_investments.filter(investment__is_active=True).aggregate(
-            total_invested=models.Sum('invested_amount')
-        )['total_invested'] or Decimal('0.00')
-        return total_invested >= self.investment_limit
+        return self.total_investments >= self.investment_limit
+
+    @classmethod
+    def reserve_capacity(cls, account_id, amount):
+        """
+        Add amount to the account's used capacity (total_investments) in one conditional UPDATE
+        that only matches while the result stays within investment_limit. Releases (negative
+        amounts) always succeed. Raises ValueError when the limit would be exceeded.
+        """
+        if amount <= 0:
+            cls.apply_deltas(account_id, investments_delta=amount)
+            return
+        reserved = cls.objects.filter(
+            pk=account_id, total_investments__lte=F('investment_limit') - amount
+        ).update(total_investments=F('total_investments') + amount, last_updated=timezone.now())
+        if not reserved:
+            investment_limit = cls.objects.filter(pk=account_id).values_list('investment_limit', flat=True).first()
+            raise ValueError(f"Investment exceeds limit of {investment_limit}")
+
+    @classmethod
+    def apply_investment_status(cls, investment_id, is_active):
+        """
+        Add every holder's amount in an investment to total_investments when it is reactivated,
+        or remove it when it is deactivated, in one UPDATE. Returns the number of accounts updated.
+        """
+        held = Coalesce(
+            Subquery(
+                UserInvestment.objects.filter(account=OuterRef('pk'), investment_id=investment_id)
+                .values('account').annotate(total=models.Sum('invested_amount')).values('total'),
+                output_field=models.DecimalField(max_digits=15, decimal_places=2),
+            ),
+            models.Value(Decimal('0.00')),
+        )
+        accounts = cls.objects.filter(
+            pk__in=UserInvestment.objects.filter(investment_id=investment_id).values('account_id')
+        )
+        total_investments = F('total_investments') + held if is_active else F('total_investments') - held
+        return accounts.update(total_investments=total_investments, last_updated=timezone.now())
+
+    @classmethod
+    def apply_deltas(cls, account_id, investments_delta=Decimal('0.00'), profit_or_loss_delta=Decimal('0.00')):
+        """
+        Shift an account's running totals with a single F() UPDATE, without reading the portfolio.
+        """
+        if not investments_delta and not profit_or_loss_delta:
+            return
+        cls.objects.filter(pk=account_id).update(
+            total_investments=F('total_investments') + investments_delta,
+            total_profit_or_loss=F('total_profit_or_loss') + profit_or_loss_delta,
+            last_updated=timezone.now(),
+        )
+
+    @staticmethod
+    def expected_investments():
+        """
+        Correlated subquery summing an account's holdings in active investments.
+        """
+        return Coalesce(
+            Subquery(
+                UserInvestment.objects.filter(account=OuterRef('pk'), investment__is_active=True)
+                .values('account').annotate(total=models.Sum('invested_amount')).values('total'),
+                output_field=models.DecimalField(max_digits=15, decimal_places=2),
+            ),
+            models.Value(Decimal('0.00')),
+        )
+
+    @staticmethod
+    def expected_profit_or_loss():
+        """
+        Correlated subquery summing the profit or loss of every investment an account holds.
+        """
+        return Coalesce(
+            Subquery(
+                UserInvestment.objects.filter(account=OuterRef('pk')).values('account')
+                .annotate(total=models.Sum(F('investment__current_value') - F('investment__amount_invested')))
+                .values('total'),
+                output_field=models.DecimalField(max_digits=15, decimal_places=2),
+            ),
+            models.Value(Decimal('0.00')),
+        )
+
+    @classmethod
+    def with_expected_totals(cls):
+        """
+        Annotate each account with its totals recomputed from its holdings.
+        """
+        return cls.objects.annotate(
+            expected_investments=cls.expected_investments(),
+            expected_profit_or_loss=cls.expected_profit_or_loss(),
+        )
+
+    @classmethod
+    def revalue(cls, investment_ids=None, account_ids=None):
+        """
+        Recompute total_profit_or_loss in one UPDATE for every account holding the given
+        investments (or the given accounts, or all accounts if neither is passed).
+        Returns the number of accounts updated.
+        """
+        accounts = cls.objects.all()
+        if investment_ids is not None:
+            accounts = accounts.filter(
+                pk__in=UserInvestment.objects.filter(investment_id__in=investment_ids).values('account_id')
+            )
+        if account_ids is not None:
+            accounts = accounts.filter(pk__in=account_ids)
+        return accounts.update(total_profit_or_loss=cls.expected_profit_or_loss(), last_updated=timezone.now())
+
+    @classmethod
+    def verify_totals(cls, fix=True, batch_size=500):
+        """
+        Find accounts whose running totals have drifted from their holdings and, if fix is set,
+        correct them with bulk_update. Returns the number of drifted accounts.
+        """
+        drifted = cls.with_expected_totals().filter(
+            ~Q(total_investments=F('expected_investments')) | ~Q(total_profit_or_loss=F('expected_profit_or_loss'))
+        ).only('pk', 'total_investments', 'total_profit_or_loss')
+
+        count, batch = 0, []
+        for investment_account in drifted.iterator(chunk_size=batch_size):
+            logger.warning(
+                f"Investment account {investment_account.pk} drifted: "
+                f"investments {investment_account.total_investments} != {investment_account.expected_investments}, "
+                f"profit/loss {investment_account.total_profit_or_loss} != {investment_account.expected_profit_or_loss}"
+            )
+            count += 1
+            if fix:
+                investment_account.total_investments = investment_account.expected_investments
+                investment_account.total_profit_or_loss = investment_account.expected_profit_or_loss
+                batch.append(investment_account)
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_update(batch, ['total_investments', 'total_profit_or_loss'])
+                    batch = []
+        if batch:
+            cls.objects.bulk_update(batch, ['total_investments', 'total_profit_or_loss'])
+        return count
 
 # User Investment Model
 class UserInvestment(models.Model):
@@ -84,10 +339,143 @@ class UserInvestment(models.Model):
     def __str__(self):
         return f"Investment in {self.investment.investment_type.name} by {self.account.account.user.username}"
 
+    def save(self, *args, **kwargs):
+        # Capacity is reserved in pre_save; keep it in the same transaction as the write.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     @property
     def current_profit_or_loss(self):
         return self.investment.current_value - self.invested_amount
 
+    @staticmethod
+    def contribution(investment, invested_amount):
+        """
+        What one holding adds to its account's totals: its amount while the investment is active,
+        and the investment's profit or loss.
+        """
+        invested = invested_amount if investment.is_active else Decimal('0.00')
+        return invested, investment.profit_or_loss
+
+# Dividend Run Model
+class DividendRun(models.Model):
+    """
+    A dividend pool declared for one InvestmentType and shared pro rata between its holders.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('distributed', 'Distributed'),
+    ]
+    CREDIT_QUANTUM = Decimal('1')  # Shares are credited to Account.account_balance, which holds whole units
+
+    investment_type = models.ForeignKey(InvestmentType, on_delete=models.CASCADE, related_name="dividend_runs")
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2)
+    distributed_amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    holder_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    distributed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.investment_type.name} dividend of {self.total_amount} ({self.status})"
+
+    def allocate(self):
+        """
+        Split total_amount between holders in proportion to their active holdings.
+        Holdings come from one grouped aggregate. Each share is rounded down to CREDIT_QUANTUM and
+        the leftover quanta go to the largest remainders, so the shares add up to exactly the
+        distributable pool. Returns [(investment_account_id, amount), ...].
+        """
+        holdings = [
+            (account_id, invested)
+            for account_id, invested in UserInvestment.objects.filter(
+                investment__investment_type=self.investment_type, investment__is_active=True
+            ).values_list('account_id').annotate(invested=models.Sum('invested_amount')).order_by('account_id')
+            if invested > 0
+        ]
+        total_invested = sum((invested for _, invested in holdings), Decimal('0.00'))
+        if not total_invested:
+            return []
+
+        pool = (self.total_amount / self.CREDIT_QUANTUM).to_integral_value(rounding=ROUND_DOWN)
+        shares = []
+        for account_id, invested in holdings:
+            exact = pool * invested / total_invested
+            whole = exact.to_integral_value(rounding=ROUND_DOWN)
+            shares.append([account_id, whole, exact - whole])
+
+        leftover = int(pool - sum(share[1] for share in shares))
+        for share in sorted(shares, key=lambda share: (-share[2], share[0]))[:leftover]:
+            share[1] += 1
+
+        return [(account_id, whole * self.CREDIT_QUANTUM) for account_id, whole, _ in shares if whole > 0]
+
+    def distribute(self, chunk_size=500):
+        """
+        Allocate the pool and pay it out. Each chunk of holders takes one insert into the run's
+        results, one CASE UPDATE crediting account balances and one notification insert.
+        Returns False if the run was already distributed.
+        """
+        from notifications.models import UserNotification  # Avoid circular import
+
+        now = timezone.now()
+        with transaction.atomic():
+            if not DividendRun.objects.filter(pk=self.pk, status='pending').update(status='distributed', distributed_at=now):
+                return False
+
+            shares = self.allocate()
+            for start in range(0, len(shares), chunk_size):
+                chunk = dict(shares[start:start + chunk_size])
+
+                DividendRunResult.objects.bulk_create([
+                    DividendRunResult(run=self, investment_account_id=account_id, amount=amount)
+                    for account_id, amount in chunk.items()
+                ])
+
+                Account.objects.filter(pk__in=chunk).update(account_balance=F('account_balance') + Case(
+                    *[When(pk=account_id, then=Value(int(amount))) for account_id, amount in chunk.items()],
+                    default=Value(0),
+                    output_field=models.PositiveIntegerField(),
+                ))
+
+                UserNotification.objects.bulk_create([
+                    UserNotification(
+                        user_id=user_id,
+                        account_id=account_id,
+                        title="Dividend Distributed",
+                        message=f"A dividend of {chunk[account_id]:,.2f} has been distributed for your investment in '{self.investment_type.name}'.",
+                        notification_type="success",
+                        user_action="dividend_distribution",
+                    )
+                    for account_id, user_id in Account.objects.filter(pk__in=chunk).values_list('pk', 'user_id')
+                ])
+
+            self.status, self.distributed_at = 'distributed', now
+            self.holder_count = len(shares)
+            self.distributed_amount = sum((amount for _, amount in shares), Decimal('0.00'))
+            self.save(update_fields=['holder_count', 'distributed_amount'])
+        logger.info(f"Distributed {self.distributed_amount} of {self.total_amount} to {self.holder_count} holder(s) for {self.investment_type.name}")
+        return True
+
+# Dividend Run Result Model
+class DividendRunResult(models.Model):
+    """
+    One holder's payout from a DividendRun; type and date come from the run.
+    """
+    run = models.ForeignKey(DividendRun, on_delete=models.CASCADE, related_name="results")
+    investment_account = models.ForeignKey(InvestmentAccount, on_delete=models.CASCADE, related_name="dividend_results")
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        unique_together = ('run', 'investment_account')
+
+    def __str__(self):
+        return f"{self.amount} to {self.investment_account_id} from run {self.run_id}"
+
 # Dividend Distribution Model
 class Dividend(models.Model):
     investment_account = models.ForeignKey(InvestmentAccount, on_delete=models.CASCADE, related_name="dividends")
@@ -99,16 +487,21 @@ class Dividend(models.Model):
     def __str__(self):
         return f"Dividend for {self.investment_account.account.user.username} - {self.investment_type.name}"
 
-    def calculate_user_dividend_share(self, user_investment):
+    def type_total_invested(self):
+        """
+        Total invested across all holders of this dividend's investment type.
+        """
+        return UserInvestment.objects.filter(investment__investment_type=self.investment_type).aggregate(
+            total=models.Sum('invested_amount')
+        )['total'] or Decimal('0.00')
+
+    def calculate_user_dividend_share(self, user_investment, total_investment_value=None):
         """
         Calculate the dividend for a specific user based on their share in the total investment.
+        Pass total_investment_value when computing several shares to avoid re-summing the type.
         """
-        # Total invested amount for the specific investment type
-        total_investment_value = sum([
-            user_investment.invested_amount for user_investment in UserInvestment.objects.filter(
-                investment__investment_type=self.investment_type
-            )
-        ])
+        if total_investment_value is None:
+            total_investment_value = self.type_total_invested()
 
         if total_investment_value == Decimal('0.00'):
             return Decimal('0.00')  # Avoid division by zero
@@ -122,14 +515,19 @@ class Dividend(models.Model):
     def calculate_dividend(self):
         """
         Calculate the dividend distribution for the investment account based on user's share.
+        The type total and the account's weighted profit are each one aggregate query.
         """
-        user_investments = UserInvestment.objects.filter(
-            account=self.investment_account
-        )
-        
-        total_dividend = Decimal('0.00')
-        
-        for user_investment in user_investments:
-            total_dividend += self.calculate_user_dividend_share(user_investment)
+        total_investment_value = self.type_total_invested()
+        if total_investment_value == Decimal('0.00'):
+            return Decimal('0.00')  # Avoid division by zero
+
+        weighted_profit = UserInvestment.objects.filter(
+            account=self.investment_account, investment__investment_type=self.investment_type
+        ).aggregate(
+            total=models.Sum(
+                (F('investment__current_value') - F('invested_amount')) * F('invested_amount'),
+                output_field=models.DecimalField(max_digits=30, decimal_places=4),
+            )
+        )['total'] or Decimal('0.00')
 
-        return total_dividend
+        return weighted_profit / total_investment_value
@@ -1,6 +1,6 @@
 # serializers.py
 from rest_framework import serializers
-from .models import InvestmentType, Investment, InvestmentAccount, UserInvestment, Dividend
+from .models import InvestmentType, Investment, InvestmentAccount, UserInvestment, Dividend, DividendRun, DividendRunResult
 
 class InvestmentTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -39,3 +39,19 @@ class DividendSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dividend
         fields = '__all__'
+
+class DividendRunSerializer(serializers.ModelSerializer):
+    investment_type = serializers.PrimaryKeyRelatedField(queryset=InvestmentType.objects.all())
+
+    class Meta:
+        model = DividendRun
+        fields = '__all__'
+        read_only_fields = ['distributed_amount', 'holder_count', 'status', 'created_at', 'distributed_at']
+
+class DividendRunResultSerializer(serializers.ModelSerializer):
+    investment_type = serializers.IntegerField(source='run.investment_type_id', read_only=True)
+    distributed_at = serializers.DateTimeField(source='run.distributed_at', read_only=True)
+
+    class Meta:
+        model = DividendRunResult
+        fields = ['id', 'run', 'investment_account', 'investment_type', 'amount', 'distributed_at']
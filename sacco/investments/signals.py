@@ -3,7 +3,7 @@ from django.dispatch import receiver
 from django.db import transaction, models
 from decimal import Decimal
 from threading import local
-from .models import Investment, InvestmentAccount, Dividend, InvestmentType, UserInvestment
+from .models import Investment, InvestmentAccount, Dividend, InvestmentType, UserInvestment, InvestmentValuation
 from accounts.models import Account
 from django.db.models import Sum
 import logging
@@ -12,75 +12,92 @@ logger = logging.getLogger(__name__)
 # ✅ Thread-local storage to track recursion per request
 _recursion_tracker = local()
 
-# 🏦 1. Create InvestmentAccount and Default Dividends when an Account is created
+# 🏦 1. Create InvestmentAccount when an Account is created
 @receiver(post_save, sender=Account)
 def create_investment_account(sender, instance, created, **kwargs):
+    """
+    Dividend rows are not created here; they appear once the account holds an investment type.
+    """
     if created:
-        investment_account = InvestmentAccount.objects.create(account=instance)
-
-        # Create dividend records for all investment types
-        for investment_type in InvestmentType.objects.all():
-            Dividend.objects.create(
-                investment_account=investment_account,
-                investment_type=investment_type,
-                amount=Decimal('0.00'),
-                is_distributed=False
-            )
-        logger.info(f"Investment Account & Dividends created for {instance.user.username}")
+        InvestmentAccount.objects.create(account=instance)
+        logger.info(f"Investment Account created for {instance.user.username}")
 
-# 📊 2. Ensure investment limit is not exceeded before saving
-@receiver(pre_save, sender=UserInvestment)
-def check_investment_limit(sender, instance, **kwargs):
-    investment_account = instance.account
-    total_invested = investment_account.user_investments.filter(investment__is_active=True).aggregate(
-        total=models.Sum('invested_amount')
-    )['total'] or Decimal('0.00')
-
-    new_total_investment = total_invested + instance.invested_amount
-    if new_total_investment > investment_account.investment_limit:
-        raise ValueError(f"Investment exceeds limit of {investment_account.investment_limit}")
-
-# 🔄 3. Track old invested amount before updating UserInvestment
+# 🔄 2. Track the holding's old values before updating UserInvestment
 @receiver(pre_save, sender=UserInvestment)
 def track_old_invested_amount(sender, instance, **kwargs):
+    old_values = None
     if instance.pk:
-        try:
-            old_instance = UserInvestment.objects.get(pk=instance.pk)
-            instance._old_invested_amount = old_instance.invested_amount
-        except UserInvestment.DoesNotExist:
-            instance._old_invested_amount = Decimal("0.00")
+        old_values = UserInvestment.objects.filter(pk=instance.pk).values_list(
+            'account_id', 'investment_id', 'invested_amount'
+        ).first()
+    if old_values:
+        instance._old_account_id, instance._old_investment_id, instance._old_invested_amount = old_values
     else:
+        instance._old_account_id, instance._old_investment_id = None, None
         instance._old_invested_amount = Decimal("0.00")
 
-# 📈 4. Update total investment & profit/loss on UserInvestment create/update/delete
+def _contribution_deltas(instance, deleted=False):
+    """
+    Per-account change in (invested, profit_or_loss) that this write makes: the holding's new
+    contribution minus its old one.
+    """
+    deltas = {}
+
+    def shift(account_id, investment, amount, sign):
+        invested, profit_or_loss = UserInvestment.contribution(investment, amount)
+        current = deltas.get(account_id, (Decimal("0.00"), Decimal("0.00")))
+        deltas[account_id] = (current[0] + sign * invested, current[1] + sign * profit_or_loss)
+
+    if deleted:
+        shift(instance.account_id, instance.investment, instance.invested_amount, -1)
+        return deltas
+
+    old_account_id = getattr(instance, "_old_account_id", None)
+    if old_account_id is not None:
+        old_investment_id = instance._old_investment_id
+        old_investment = (
+            instance.investment if old_investment_id == instance.investment_id
+            else Investment.objects.get(pk=old_investment_id)
+        )
+        shift(old_account_id, old_investment, instance._old_invested_amount, -1)
+    shift(instance.account_id, instance.investment, instance.invested_amount, 1)
+    return deltas
+
+# 📊 3. Reserve investment capacity before saving
+@receiver(pre_save, sender=UserInvestment)
+def check_investment_limit(sender, instance, **kwargs):
+    """
+    total_investments is the account's used capacity. Growth is reserved with a conditional
+    UPDATE that only succeeds while the result stays within investment_limit, so concurrent
+    writes cannot overshoot. UserInvestment.save() runs in a transaction, so a failed insert
+    also undoes the reservation.
+    """
+    instance._contribution_deltas = _contribution_deltas(instance)
+    for account_id, (invested_delta, _) in instance._contribution_deltas.items():
+        InvestmentAccount.reserve_capacity(account_id, invested_delta)
+
+# 📈 4. Apply the holding's change to the account totals on UserInvestment create/update/delete
 @receiver(post_save, sender=UserInvestment)
 @receiver(post_delete, sender=UserInvestment)
 def update_investment_account_balance(sender, instance, **kwargs):
-    if getattr(_recursion_tracker, "account_update", False):
-        return  # Prevent recursion
-
-    _recursion_tracker.account_update = True  # Mark as processing
-
-    try:
-        investment_account = instance.account
-        total_investments = investment_account.user_investments.filter(investment__is_active=True).aggregate(
-            total=models.Sum('invested_amount')
-        )['total'] or Decimal('0.00')
-
-        total_profit_or_loss = sum(
-            user_investment.investment.profit_or_loss
-            for user_investment in investment_account.user_investments.all()
-        )
+    """
+    Totals move by the difference between the holding's old and new contribution, so a write
+    costs the same no matter how large the member's portfolio is. On save the invested part has
+    already been reserved by check_investment_limit. InvestmentAccount.verify_totals() catches any drift.
+    """
+    if kwargs.get("signal") is post_delete:
+        deltas = _contribution_deltas(instance, deleted=True)
+    else:
+        deltas = {
+            account_id: (Decimal("0.00"), profit_or_loss_delta)
+            for account_id, (_, profit_or_loss_delta) in getattr(instance, "_contribution_deltas", {}).items()
+        }
 
-        with transaction.atomic():
-            investment_account.total_investments = total_investments
-            investment_account.total_profit_or_loss = total_profit_or_loss
-            investment_account.save(update_fields=["total_investments", "total_profit_or_loss"])
-        
-    finally:
-        _recursion_tracker.account_update = False  # Reset flag
+    with transaction.atomic():
+        for account_id, (investments_delta, profit_or_loss_delta) in deltas.items():
+            InvestmentAccount.apply_deltas(account_id, investments_delta, profit_or_loss_delta)
 
-# 💰 5. Update dividend amount when a UserInvestment is created or updated
+# 💰 5. Keep the pending dividend estimate for the holding's type in step with the account's holdings
 @receiver(post_save, sender=UserInvestment)
 @receiver(post_delete, sender=UserInvestment)
 def update_dividend_distribution(sender, instance, **kwargs):
@@ -90,85 +107,70 @@ def update_dividend_distribution(sender, instance, **kwargs):
     _recursion_tracker.dividend_update = True  # Mark as processing
 
     try:
+        with transaction.atomic():
+            investment_type_id = instance.investment.investment_type_id
+            pending = Dividend.objects.filter(
+                investment_account_id=instance.account_id,
+                investment_type_id=investment_type_id,
+                is_distributed=False
+            )
 
-         with transaction.atomic():
-            dividend = Dividend.objects.filter(
-                investment_account=instance.account,
-                investment_type=instance.investment.investment_type
-            ).first()
-
-            if dividend:
-                # Recalculate dividend for each user investment in the same investment type
-                user_investments = UserInvestment.objects.filter(
-                    investment__investment_type=instance.investment.investment_type,
-                    account=instance.account
+            holds_type = UserInvestment.objects.filter(
+                account_id=instance.account_id,
+                investment__investment_type_id=investment_type_id
+            ).exists()
+            if not holds_type:
+                # Last holding of this type is gone, so is the estimate.
+                pending.delete()
+                return
+
+            dividend = pending.first()
+            if dividend is None:
+                dividend = Dividend(
+                    investment_account_id=instance.account_id,
+                    investment_type_id=investment_type_id,
+                    amount=Decimal('0.00'),
+                    is_distributed=False
                 )
-                
-                total_invested = user_investments.aggregate(
-                    total=Sum('invested_amount')
-                )['total'] or Decimal('0.00')
-
-                if total_invested > Decimal('0.00'):
-                    # Update the dividend amount for each user investment
-                    total_dividend = Decimal('0.00')
-                    for user_investment in user_investments:
-                        user_share = dividend.calculate_user_dividend_share(user_investment)
-                        total_dividend += user_share
-
-                    # Ensure total_dividend is Decimal and update the dividend amount
-                    dividend.amount = total_dividend
-                    dividend.save(update_fields=["amount"])
-                    logger.info(f"Dividend updated for {instance.account.account.user.username}")
-                else:
-                    logger.info(f"No investments to calculate dividend for {instance.account.account.user.username}")
-            else:
-                logger.info(f"No dividend found for {instance.account.account.user.username}")
+            dividend.amount = dividend.calculate_dividend
+            dividend.save()
+            logger.info(f"Dividend estimate updated for investment account {instance.account_id}")
 
     finally:
         _recursion_tracker.dividend_update = False  # Reset flag
 
-# 💹 6. Auto-update profit/loss & investment value when Investment changes
+# 💹 6. Revalue every holder's profit/loss when an Investment changes
 @receiver(post_save, sender=Investment)
 def update_investment_profit_loss(sender, instance, **kwargs):
-    if getattr(_recursion_tracker, "profit_loss_update", False):
-        return  # Prevent recursion
-
-    _recursion_tracker.profit_loss_update = True  # Mark as processing
-
-    try:
-        for user_investment in UserInvestment.objects.filter(investment=instance):
-            investment_account = user_investment.account
-
-            total_profit_or_loss = sum(
-                user_investment.investment.profit_or_loss
-                for user_investment in investment_account.user_investments.all()
-            )
+    """
+    Holdings only count toward total_investments while their investment is active, so an
+    activation change moves every holder's used capacity too.
+    """
+    old_values = getattr(instance, "_old_values", None)
+    with transaction.atomic():
+        if old_values and old_values["is_active"] != instance.is_active:
+            InvestmentAccount.apply_investment_status(instance.pk, instance.is_active)
+        InvestmentAccount.revalue(investment_ids=[instance.pk])
 
-            with transaction.atomic():
-                investment_account.total_profit_or_loss = total_profit_or_loss
-                investment_account.save(update_fields=["total_profit_or_loss"])
-    finally:
-        _recursion_tracker.profit_loss_update = False  # Reset flag
+# 📉 6b. Record today's NAV point whenever an Investment's value is saved
+@receiver(post_save, sender=Investment)
+def record_investment_valuation(sender, instance, **kwargs):
+    InvestmentValuation.record([instance])
 
-# 🔄 7. Automatically distribute dividends when marked as distributed
+# 🔄 7. Refresh the account's profit/loss when its dividend is marked as distributed
 @receiver(post_save, sender=Dividend)
 def update_investment_account_after_dividend(sender, instance, **kwargs):
     if instance.is_distributed:
-        for user_investment in instance.investment_account.user_investments.all():
-            investment_account = user_investment.account
-
-            total_profit_or_loss = sum(
-                user_investment.investment.profit_or_loss
-                for user_investment in investment_account.user_investments.all()
-            )
-
-            with transaction.atomic():
-                investment_account.total_profit_or_loss = total_profit_or_loss
-                investment_account.save(update_fields=["total_profit_or_loss"])
+        InvestmentAccount.revalue(account_ids=[instance.investment_account_id])
 
 # 🏦 8. Ensure total investment per Investment is updated when a new UserInvestment is made
 @receiver(post_save, sender=UserInvestment)
 def update_investment_total(sender, instance, created, **kwargs):
+    """
+    Written with an UPDATE rather than Investment.save(), so a new holding does not fire the
+    Investment signals (and a notification to every holder). Signal 6's revaluation and
+    signal 6b's NAV point are recorded here instead.
+    """
     if created:
         investment = instance.investment
 
@@ -178,10 +180,24 @@ def update_investment_total(sender, instance, created, **kwargs):
 
         with transaction.atomic():
             investment.amount_invested = total_invested
-            investment.save(update_fields=["amount_invested"])
+            investment.current_value = investment.calculate_current_value()
+            Investment.objects.filter(pk=investment.pk).update(
+                amount_invested=investment.amount_invested, current_value=investment.current_value
+            )
+            InvestmentAccount.revalue(investment_ids=[investment.pk])
+            InvestmentValuation.record([investment])
 
         logger.info(f"Updated total investment for {investment.investment_type.name} to {total_invested}")
 
+# 🔍 8b. Track the Investment's old values before updating it
+@receiver(pre_save, sender=Investment)
+def track_old_investment_values(sender, instance, **kwargs):
+    instance._old_values = None
+    if instance.pk:
+        instance._old_values = Investment.objects.filter(pk=instance.pk).values(
+            'amount_invested', *Investment.USER_VISIBLE_FIELDS
+        ).first()
+
 # 🔄 9. Update Investment current value based on ROI
 @receiver(pre_save, sender=Investment)
 def update_current_value(sender, instance, **kwargs):
@@ -189,11 +205,10 @@ def update_current_value(sender, instance, **kwargs):
     Before saving the Investment, update the current_value based on ROI.
     This ensures that current_value is always correct.
     """
-    if instance.pk:  # Check if the instance exists (not a new investment)
-        old_instance = Investment.objects.get(pk=instance.pk)
-        
+    old_values = getattr(instance, "_old_values", None)
+    if old_values:  # Not a new investment
         # Update only if ROI or amount_invested has changed
-        if old_instance.return_on_investment != instance.return_on_investment or old_instance.amount_invested != instance.amount_invested:
+        if old_values['return_on_investment'] != instance.return_on_investment or old_values['amount_invested'] != instance.amount_invested:
             instance.current_value = instance.calculate_current_value()
 
 # 🛠 10. Populate sample InvestmentTypes after migration
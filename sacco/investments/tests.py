@@ -1,3 +1,399 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from accounts.models import Account
+from accounts.testing import make_member, make_admin
+from notifications.models import UserNotification
+from .models import InvestmentType, Investment, InvestmentAccount, UserInvestment, Dividend, DividendRun, DividendRunResult, InvestmentValuation
 
-# Create your tests here.
+
+def make_investor(n):
+    return InvestmentAccount.objects.get(account=make_member(n))
+
+
+class InvestmentListQueryBudgetTests(APITestCase):
+    """
+    List endpoints must run the same number of queries however many rows they render.
+    """
+
+    def setUp(self):
+        self.client.force_authenticate(make_admin("budget-admin"))
+        self.investment_type = InvestmentType.objects.create(name="Budget Fund", description="")
+        self.investment = Investment.objects.create(
+            investment_type=self.investment_type, amount_invested=Decimal("100.00"),
+            current_value=Decimal("0.00"), return_on_investment=Decimal("10.00"), description="",
+        )
+        self.members = 0
+
+    def add_members(self, count):
+        for _ in range(count):
+            self.members += 1
+            UserInvestment.objects.create(
+                account=make_investor(self.members),
+                investment=self.investment, invested_amount=Decimal("100.00"),
+            )
+
+    def assertConstantQueries(self, url):
+        self.add_members(2)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.add_members(6)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(few), len(many), [query["sql"] for query in many.captured_queries])
+        return response
+
+    def test_investment_account_list(self):
+        response = self.assertConstantQueries("/investment-accounts/")
+        self.assertIn("has_reached_investment_limit", response.data["results"][0])
+
+    def test_dividend_list(self):
+        response = self.assertConstantQueries("/dividends/")
+        self.assertEqual(response.data["count"], 8)
+
+    def test_user_investment_list(self):
+        self.assertConstantQueries("/user-investments/")
+
+
+class InvestmentStatusTests(TestCase):
+
+    def setUp(self):
+        self.investment = Investment.objects.create(
+            investment_type=InvestmentType.objects.create(name="Status Fund", description=""),
+            amount_invested=Decimal("0.00"), current_value=Decimal("0.00"),
+            return_on_investment=Decimal("10.00"), description="",
+        )
+        self.holder, self.other = make_investor(1), make_investor(2)
+        UserInvestment.objects.create(account=self.holder, investment=self.investment, invested_amount=Decimal("5000.00"))
+        UserInvestment.objects.create(account=self.other, investment=self.investment, invested_amount=Decimal("1000.00"))
+
+    def total_investments(self, investment_account):
+        return InvestmentAccount.objects.get(pk=investment_account.pk).total_investments
+
+    def set_active(self, is_active):
+        investment = Investment.objects.get(pk=self.investment.pk)
+        investment.is_active = is_active
+        investment.save()
+
+    def test_deactivating_releases_capacity(self):
+        self.assertEqual(self.total_investments(self.holder), Decimal("5000.00"))
+
+        self.set_active(False)
+
+        self.assertEqual(self.total_investments(self.holder), Decimal("0.00"))
+        self.assertEqual(self.total_investments(self.other), Decimal("0.00"))
+        self.assertEqual(InvestmentAccount.verify_totals(fix=False), 0)
+
+    def test_reactivating_restores_capacity(self):
+        self.set_active(False)
+        self.set_active(True)
+
+        self.assertEqual(self.total_investments(self.holder), Decimal("5000.00"))
+        self.assertEqual(InvestmentAccount.verify_totals(fix=False), 0)
+
+    def test_saving_without_status_change_keeps_capacity(self):
+        investment = Investment.objects.get(pk=self.investment.pk)
+        investment.description = "Updated"
+        investment.save()
+
+        self.assertEqual(self.total_investments(self.holder), Decimal("5000.00"))
+
+    def test_new_holding_updates_fund_totals_and_holders(self):
+        investment = Investment.objects.get(pk=self.investment.pk)
+        self.assertEqual(investment.amount_invested, Decimal("6000.00"))
+        self.assertEqual(investment.current_value, Decimal("6600.00"))
+        self.assertEqual(InvestmentAccount.verify_totals(fix=False), 0)
+        self.assertEqual(investment.valuations.get().nav, Decimal("6600.00"))
+
+    def test_moving_a_holding_moves_its_totals(self):
+        holding = UserInvestment.objects.get(account=self.holder)
+        holding.account = self.other
+        holding.save()
+
+        self.assertEqual(self.total_investments(self.holder), Decimal("0.00"))
+        self.assertEqual(self.total_investments(self.other), Decimal("6000.00"))
+        self.assertEqual(InvestmentAccount.verify_totals(fix=False), 0)
+
+    def test_verify_totals_repairs_drift(self):
+        InvestmentAccount.objects.filter(pk=self.holder.pk).update(total_investments=Decimal("1.00"))
+
+        self.assertEqual(InvestmentAccount.verify_totals(fix=False), 1)
+        self.assertEqual(self.total_investments(self.holder), Decimal("1.00"))
+        self.assertEqual(InvestmentAccount.verify_totals(), 1)
+        self.assertEqual(self.total_investments(self.holder), Decimal("5000.00"))
+
+
+class RevaluationTests(TestCase):
+
+    def setUp(self):
+        self.investment = Investment.objects.create(
+            investment_type=InvestmentType.objects.create(name="Revalued Fund", description=""),
+            amount_invested=Decimal("0.00"), current_value=Decimal("0.00"),
+            return_on_investment=Decimal("10.00"), description="",
+        )
+        self.holder, self.other = make_investor(1), make_investor(2)
+        UserInvestment.objects.create(account=self.holder, investment=self.investment, invested_amount=Decimal("5000.00"))
+        UserInvestment.objects.create(account=self.other, investment=self.investment, invested_amount=Decimal("1000.00"))
+
+    def profit_or_loss(self, investment_account):
+        return InvestmentAccount.objects.get(pk=investment_account.pk).total_profit_or_loss
+
+    def test_repricing_revalues_every_holder(self):
+        investment = Investment.objects.get(pk=self.investment.pk)
+        investment.return_on_investment = Decimal("-10.00")
+        investment.save()
+
+        self.assertEqual(self.profit_or_loss(self.holder), Decimal("-600.00"))
+        self.assertEqual(self.profit_or_loss(self.other), Decimal("-600.00"))
+        self.assertEqual(InvestmentAccount.verify_totals(fix=False), 0)
+
+    def test_revalue_is_one_update(self):
+        Investment.objects.filter(pk=self.investment.pk).update(current_value=Decimal("6000.00"))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(InvestmentAccount.revalue(investment_ids=[self.investment.pk]), 2)
+        self.assertEqual(self.profit_or_loss(self.holder), Decimal("0.00"))
+
+    def test_revalue_can_be_limited_to_accounts(self):
+        Investment.objects.filter(pk=self.investment.pk).update(current_value=Decimal("6000.00"))
+
+        self.assertEqual(InvestmentAccount.revalue(account_ids=[self.other.pk]), 1)
+        self.assertEqual(self.profit_or_loss(self.other), Decimal("0.00"))
+        self.assertEqual(self.profit_or_loss(self.holder), Decimal("600.00"))
+
+
+class DividendRunTests(APITestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(make_admin("dividends-admin"))
+        investment_type = InvestmentType.objects.create(name="Dividend Fund", description="")
+        investment = Investment.objects.create(
+            investment_type=investment_type, amount_invested=Decimal("0.00"),
+            current_value=Decimal("0.00"), return_on_investment=Decimal("10.00"), description="",
+        )
+        self.holders = [make_investor(1), make_investor(2)]
+        for holder, amount in zip(self.holders, ("3000.00", "1000.00")):
+            UserInvestment.objects.create(account=holder, investment=investment, invested_amount=Decimal(amount))
+        self.run = DividendRun.objects.create(investment_type=investment_type, total_amount=Decimal("1000.00"))
+
+    def test_distribute_pays_holders_and_formats_amounts(self):
+        response = self.client.post(f"/dividend-runs/{self.run.pk}/distribute/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(DividendRunResult.objects.filter(run=self.run).values_list("amount", flat=True)),
+            [Decimal("250.00"), Decimal("750.00")],
+        )
+        self.assertEqual(Account.objects.get(pk=self.holders[0].pk).account_balance, 750)
+        self.assertTrue(UserNotification.objects.filter(
+            account_id=self.holders[0].pk, user_action="dividend_distribution", message__startswith="A dividend of 750.00 "
+        ).exists())
+
+    def test_pending_run_can_be_deleted(self):
+        response = self.client.delete(f"/dividend-runs/{self.run.pk}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(DividendRun.objects.filter(pk=self.run.pk).exists())
+
+    def test_distributed_run_cannot_be_deleted(self):
+        self.run.distribute()
+
+        response = self.client.delete(f"/dividend-runs/{self.run.pk}/")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DividendRunResult.objects.filter(run=self.run).count(), 2)
+
+    def test_customers_only_see_their_own_payouts(self):
+        self.run.distribute()
+        self.client.force_authenticate(self.holders[1].account.user)
+
+        response = self.client.get("/dividend-results/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["investment_account"] for row in response.data["results"]], [self.holders[1].pk])
+        self.assertEqual(response.data["results"][0]["amount"], "250.00")
+
+
+class DividendEstimateTests(TestCase):
+
+    def setUp(self):
+        self.investment_type = InvestmentType.objects.create(name="Estimated Fund", description="")
+        self.investment = Investment.objects.create(
+            investment_type=self.investment_type, amount_invested=Decimal("0.00"),
+            current_value=Decimal("0.00"), return_on_investment=Decimal("10.00"), description="",
+        )
+        self.holder = make_investor(1)
+
+    def test_opening_an_account_creates_no_dividend_rows(self):
+        self.assertFalse(Dividend.objects.filter(investment_account=self.holder).exists())
+
+    def test_estimate_follows_the_holdings_of_a_type(self):
+        first = UserInvestment.objects.create(account=self.holder, investment=self.investment, invested_amount=Decimal("1000.00"))
+        second = UserInvestment.objects.create(account=self.holder, investment=self.investment, invested_amount=Decimal("500.00"))
+        self.assertEqual(Dividend.objects.filter(investment_account=self.holder, is_distributed=False).count(), 1)
+
+        first.delete()
+        self.assertTrue(Dividend.objects.filter(investment_account=self.holder).exists())
+        second.delete()
+        self.assertFalse(Dividend.objects.filter(investment_account=self.holder).exists())
+
+    def test_estimates_are_not_announced(self):
+        UserInvestment.objects.create(account=self.holder, investment=self.investment, invested_amount=Decimal("1000.00"))
+
+        self.assertFalse(UserNotification.objects.filter(user_action="dividend_distribution").exists())
+
+
+class DividendAllocationTests(TestCase):
+
+    def setUp(self):
+        self.investment_type = InvestmentType.objects.create(name="Allocated Fund", description="")
+        self.investment = Investment.objects.create(
+            investment_type=self.investment_type, amount_invested=Decimal("0.00"),
+            current_value=Decimal("0.00"), return_on_investment=Decimal("10.00"), description="",
+        )
+
+    def hold(self, *amounts):
+        holders = []
+        for n, amount in enumerate(amounts, start=1):
+            holder = make_investor(n)
+            UserInvestment.objects.create(account=holder, investment=self.investment, invested_amount=Decimal(amount))
+            holders.append(holder.pk)
+        return holders
+
+    def test_leftover_units_go_to_the_largest_remainders(self):
+        holders = self.hold("1000.00", "2000.00", "4000.00")  # 14.29, 28.57 and 57.14 of 100
+        run = DividendRun(investment_type=self.investment_type, total_amount=Decimal("100.00"))
+
+        self.assertEqual(dict(run.allocate()), dict(zip(holders, [Decimal("14"), Decimal("29"), Decimal("57")])))
+
+    def test_fractional_pool_is_allocated_in_whole_units(self):
+        holders = self.hold("1000.00", "1000.00", "1000.00")
+        run = DividendRun(investment_type=self.investment_type, total_amount=Decimal("100.50"))
+
+        shares = run.allocate()
+        self.assertEqual(sum(amount for _, amount in shares), Decimal("100"))
+        # Equal remainders are broken by account id, so the lowest one gets the extra unit
+        self.assertEqual(shares, list(zip(sorted(holders), [Decimal("34"), Decimal("33"), Decimal("33")])))
+
+    def test_inactive_holdings_are_left_out(self):
+        self.hold("1000.00")
+        Investment.objects.filter(pk=self.investment.pk).update(is_active=False)
+
+        self.assertEqual(DividendRun(investment_type=self.investment_type, total_amount=Decimal("100.00")).allocate(), [])
+
+
+class InvestmentValuationTests(APITestCase):
+
+    def setUp(self):
+        self.investment_type = InvestmentType.objects.create(name="Valued Fund", description="")
+        self.investment = self.fund()
+
+    def fund(self):
+        return Investment.objects.create(
+            investment_type=self.investment_type, amount_invested=Decimal("0.00"),
+            current_value=Decimal("0.00"), return_on_investment=Decimal("10.00"), description="",
+        )
+
+    def point(self, on_date, nav, amount_invested):
+        investment = Investment(pk=self.investment.pk, current_value=Decimal(nav), amount_invested=Decimal(amount_invested))
+        return InvestmentValuation.record([investment], on_date)[0]
+
+    def test_flows_do_not_register_as_returns(self):
+        self.point(datetime.date(2025, 1, 1), "1100.00", "1000.00")
+        point = self.point(datetime.date(2025, 1, 2), "2200.00", "2000.00")  # Money in, same unit value
+
+        self.assertEqual(point.period_return, Decimal("0.0000"))
+
+    def test_weekly_series_keeps_the_last_point_of_each_week(self):
+        # 2025-01-06 and 2025-01-13 are Mondays
+        for day, nav in ((6, "1000.00"), (10, "1050.00"), (13, "1080.00"), (17, "1155.00")):
+            self.point(datetime.date(2025, 1, day), nav, "1000.00")
+
+        series = InvestmentValuation.series(self.investment.pk, interval="weekly", end=datetime.date(2025, 1, 31))
+
+        self.assertEqual([point["date"].day for point in series], [10, 17])
+        self.assertEqual([point["return"] for point in series], [None, Decimal("10.0000")])
+
+    def test_unknown_interval_is_rejected(self):
+        self.client.force_authenticate(make_admin("valuations-admin"))
+
+        response = self.client.get(f"/investments/{self.investment.pk}/valuations/", {"interval": "hourly"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_snapshot_counts_each_new_point_once(self):
+        # Holdings already recorded today's point for the first fund; the second has none yet.
+        for n in (1, 2):
+            UserInvestment.objects.create(account=make_investor(n), investment=self.investment, invested_amount=Decimal("500.00"))
+        InvestmentValuation.objects.filter(investment=self.fund()).delete()
+        today = timezone.now().date()
+
+        out = StringIO()
+        call_command("snapshot_investment_values", stdout=out)
+        call_command("snapshot_investment_values", stdout=out)
+
+        self.assertEqual(out.getvalue().splitlines(), [
+            f"Recorded 1 new NAV point(s) for {today}.",
+            f"Recorded 0 new NAV point(s) for {today}.",
+        ])
+        self.assertEqual(InvestmentValuation.objects.count(), 2)
+
+
+class InvestmentCapacityTests(TestCase):
+
+    def setUp(self):
+        self.investment = Investment.objects.create(
+            investment_type=InvestmentType.objects.create(name="Capped Fund", description=""),
+            amount_invested=Decimal("0.00"), current_value=Decimal("0.00"),
+            return_on_investment=Decimal("10.00"), description="",
+        )
+        self.holder = make_investor(1)  # investment_limit defaults to 10000.00
+
+    def invest(self, amount):
+        return UserInvestment.objects.create(account=self.holder, investment=self.investment, invested_amount=Decimal(amount))
+
+    def used(self):
+        return InvestmentAccount.objects.get(pk=self.holder.pk).total_investments
+
+    def test_holding_over_the_limit_is_rejected(self):
+        self.invest("6000.00")
+
+        with self.assertRaisesMessage(ValueError, "Investment exceeds limit of 10000.00"):
+            self.invest("5000.00")
+        self.assertEqual(self.used(), Decimal("6000.00"))
+        self.assertEqual(UserInvestment.objects.filter(account=self.holder).count(), 1)
+
+    def test_holding_up_to_the_limit_is_accepted(self):
+        self.invest("6000.00")
+        self.invest("4000.00")
+
+        self.assertEqual(self.used(), Decimal("10000.00"))
+        self.assertTrue(InvestmentAccount.objects.get(pk=self.holder.pk).has_reached_investment_limit)
+
+    def test_growing_a_holding_counts_only_the_difference(self):
+        holding = self.invest("6000.00")
+        holding.invested_amount = Decimal("9000.00")
+        holding.save()
+        self.assertEqual(self.used(), Decimal("9000.00"))
+
+        holding.invested_amount = Decimal("10500.00")
+        with self.assertRaises(ValueError):
+            holding.save()
+        self.assertEqual(self.used(), Decimal("9000.00"))
+
+    def test_reservations_are_checked_against_the_stored_total(self):
+        # The limit is checked by the UPDATE itself, so a second writer cannot overshoot.
+        InvestmentAccount.reserve_capacity(self.holder.pk, Decimal("6000.00"))
+
+        with self.assertRaises(ValueError):
+            InvestmentAccount.reserve_capacity(self.holder.pk, Decimal("6000.00"))
+        InvestmentAccount.reserve_capacity(self.holder.pk, Decimal("-6000.00"))
+        self.assertEqual(self.used(), Decimal("0.00"))
@@ -1,7 +1,7 @@
 # urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import InvestmentTypeViewSet, InvestmentViewSet, InvestmentAccountViewSet, UserInvestmentViewSet, DividendViewSet
+from .views import InvestmentTypeViewSet, InvestmentViewSet, InvestmentAccountViewSet, UserInvestmentViewSet, DividendViewSet, DividendRunViewSet, DividendRunResultViewSet
 
 router = DefaultRouter()
 router.register(r'investment-types', InvestmentTypeViewSet)
@@ -9,6 +9,8 @@ router.register(r'investments', InvestmentViewSet)
 router.register(r'investment-accounts', InvestmentAccountViewSet)
 router.register(r'user-investments', UserInvestmentViewSet)
 router.register(r'dividends', DividendViewSet)
+router.register(r'dividend-runs', DividendRunViewSet)
+router.register(r'dividend-results', DividendRunResultViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
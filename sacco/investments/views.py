@@ -1,9 +1,15 @@
 from rest_framework import viewsets,filters
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.decorators import action
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from django.db.models import Sum
-from .models import InvestmentType, Investment, InvestmentAccount, UserInvestment, Dividend
-from .serializers import InvestmentTypeSerializer, InvestmentSerializer, InvestmentAccountSerializer, UserInvestmentSerializer, DividendSerializer
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+from datetime import timedelta
+from .models import InvestmentType, Investment, InvestmentAccount, UserInvestment, Dividend, DividendRun, DividendRunResult, InvestmentValuation
+from .serializers import InvestmentTypeSerializer, InvestmentSerializer, InvestmentAccountSerializer, UserInvestmentSerializer, DividendSerializer, DividendRunSerializer, DividendRunResultSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import InvestmentFilter, DividendFilter, InvestmentAccountFilter , UserInvestmentFilter
 
@@ -23,15 +29,39 @@ class InvestmentViewSet(viewsets.ModelViewSet):
     ordering_fields = ["name", "date_invested"]  
     ordering = ["-date_invested"]  # Default ordering by newest users first
 
+    @action(detail=True, methods=["get"])
+    def valuations(self, request, pk=None):
+        """
+        NAV history for the investment. Query params: interval (daily, weekly, monthly),
+        start and end (YYYY-MM-DD). Daily history defaults to the last year.
+        """
+        investment = self.get_object()
+        interval = request.query_params.get("interval", "daily")
+        if interval not in InvestmentValuation.INTERVALS:
+            return Response({"interval": f"Choose one of {', '.join(InvestmentValuation.INTERVALS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = request.query_params.get("start")
+        end = request.query_params.get("end")
+        start, end = (parse_date(start) if start else None), (parse_date(end) if end else None)
+        if start is None and interval == "daily":
+            start = timezone.now().date() - timedelta(days=365)
+
+        return Response({
+            "investment": investment.pk,
+            "interval": interval,
+            "points": InvestmentValuation.series(investment.pk, interval=interval, start=start, end=end),
+        })
+
 
 class InvestmentAccountViewSet(viewsets.ModelViewSet):
+    # Every serialized field, has_reached_investment_limit included, is a column on the row.
     queryset = InvestmentAccount.objects.all()
     serializer_class = InvestmentAccountSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = InvestmentAccountFilter
-    search_fields = ['account', 'name']
-    ordering_fields = ['account', 'name', 'created_at', 'updated_at']
-    ordering = ['-created_at']
+    search_fields = ['account__account_number', 'account__user__username']
+    ordering_fields = ['account', 'total_investments', 'total_profit_or_loss', 'last_updated']
+    ordering = ['-last_updated']
 
     def get_queryset(self):
         """
@@ -47,9 +77,9 @@ class UserInvestmentViewSet(viewsets.ModelViewSet):
     serializer_class = UserInvestmentSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = UserInvestmentFilter
-    search_fields = ['account', 'investment']
-    ordering_fields = ['account', 'investment', 'created_at', 'updated_at']
-    ordering = ['-created_at']
+    search_fields = ['account__account__account_number', 'investment__investment_type__name']
+    ordering_fields = ['account', 'investment', 'invested_amount', 'date_added']
+    ordering = ['-date_added']
 
     def get_queryset(self):
         """
@@ -61,7 +91,8 @@ class UserInvestmentViewSet(viewsets.ModelViewSet):
         return self.queryset
 
 class DividendViewSet(viewsets.ModelViewSet):
-    queryset = Dividend.objects.all()
+    # The serializer nests the investment account and type; join them rather than fetch per row.
+    queryset = Dividend.objects.select_related('investment_account', 'investment_type').all()
     serializer_class = DividendSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = DividendFilter
@@ -73,8 +104,7 @@ class DividendViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if user.role == 'customer':
-            investment_account_ids = InvestmentAccount.objects.filter(account__user=user).values_list('id', flat=True)
-            return self.queryset.filter(investment_account__in=investment_account_ids)
+            return self.queryset.filter(investment_account__account__user=user)
         return self.queryset
 
     def create(self, request, *args, **kwargs):
@@ -87,3 +117,46 @@ class DividendViewSet(viewsets.ModelViewSet):
             dividend.calculate_dividend  # Calculate the dividend before saving
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
+
+
+class DividendRunViewSet(viewsets.ModelViewSet):
+    queryset = DividendRun.objects.select_related('investment_type').all()
+    serializer_class = DividendRunSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ["investment_type", "status"]
+    ordering = ["-created_at"]
+    http_method_names = ["get", "post", "delete"]
+
+    def perform_destroy(self, instance):
+        # Distributed runs keep their payout results; the conditional delete cannot race distribute().
+        deleted, _ = DividendRun.objects.filter(pk=instance.pk, status="pending").delete()
+        if not deleted:
+            raise ValidationError("Only pending dividend runs can be deleted.")
+
+    @action(detail=True, methods=["post"])
+    def distribute(self, request, pk=None):
+        """
+        Pay the run's pool out to every holder of its investment type.
+        """
+        run = self.get_object()
+        if not run.distribute():
+            return Response({"detail": "This dividend run has already been distributed."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(run).data)
+
+
+class DividendRunResultViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = DividendRunResult.objects.select_related('run').all()
+    serializer_class = DividendRunResultSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ["run", "investment_account", "run__investment_type"]
+    ordering = ["-run__distributed_at"]
+
+    def get_queryset(self):
+        """
+        Limit payouts to the user's own investment account if the user is a customer.
+        """
+        user = self.request.user
+        if user.role == 'customer':
+            return self.queryset.filter(investment_account__account__user=user)
+        return self.queryset
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LoanRequirement, UserLoanRequirement, LoanType, Loan, LoanPayment, LoanHistory
+from .models import LoanRequirement, UserLoanRequirement, LoanType, Loan, LoanPayment, LoanHistory, LoanGuarantor, GuarantorExposure
 from django.utils.timezone import now
 from django.core.exceptions import ValidationError
 
@@ -106,3 +106,24 @@ class LoanHistoryAdmin(admin.ModelAdmin):
     list_filter = ("change_type", "timestamp")
     search_fields = ("loan__id", "changed_by__username")
     ordering = ("-timestamp",)
+
+
+@admin.register(LoanGuarantor)
+class LoanGuarantorAdmin(admin.ModelAdmin):
+    """
+    Admin interface for LoanGuarantor.
+    """
+    list_display = ("loan", "guarantor", "borrower", "amount", "status", "created_at", "released_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("loan__id", "guarantor__user__username", "borrower__user__username")
+    ordering = ("-created_at",)
+
+
+@admin.register(GuarantorExposure)
+class GuarantorExposureAdmin(admin.ModelAdmin):
+    """
+    Admin interface for GuarantorExposure.
+    """
+    list_display = ("account", "total_guaranteed", "guarantee_limit", "last_updated")
+    search_fields = ("account__user__username",)
+    readonly_fields = ("total_guaranteed", "last_updated")
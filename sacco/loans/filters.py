@@ -1,6 +1,6 @@
 import django_filters
 from django.utils.timezone import now
-from .models import Loan, LoanPayment, LoanHistory
+from .models import Loan, LoanPayment, LoanHistory, LoanGuarantor
 
 class LoanFilter(django_filters.FilterSet):
     account = django_filters.NumberFilter(field_name="account__id")
@@ -40,3 +40,14 @@ class LoanHistoryFilter(django_filters.FilterSet):
     class Meta:
         model = LoanHistory
         fields = ["loan", "change_type", "changed_by", "min_timestamp", "max_timestamp"]
+
+
+class LoanGuarantorFilter(django_filters.FilterSet):
+    loan = django_filters.NumberFilter(field_name="loan__id")
+    guarantor = django_filters.CharFilter(field_name="guarantor__account_number")
+    borrower = django_filters.CharFilter(field_name="borrower__account_number")
+    status = django_filters.CharFilter(field_name="status", lookup_expr="iexact")
+
+    class Meta:
+        model = LoanGuarantor
+        fields = ["loan", "guarantor", "borrower", "status"]
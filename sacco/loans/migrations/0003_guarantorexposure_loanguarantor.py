@@ -0,0 +1,41 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_account_kyc'),
+        ('loans', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuarantorExposure',
+            fields=[
+                ('account', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='guarantor_exposure', serialize=False, to='accounts.account')),
+                ('total_guaranteed', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('guarantee_limit', models.DecimalField(decimal_places=2, default=100000.0, max_digits=15)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoanGuarantor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('released', 'Released')], default='active', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('borrower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guarantees_received', to='accounts.account')),
+                ('guarantor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guarantees_given', to='accounts.account')),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guarantors', to='loans.loan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['guarantor', 'status'], name='loans_loang_guarant_cc7152_idx'), models.Index(fields=['borrower', 'status'], name='loans_loang_borrowe_73a052_idx')],
+                'unique_together': {('loan', 'guarantor')},
+            },
+        ),
+    ]
@@ -1,11 +1,11 @@
 from datetime import timedelta
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 import logging
 from accounts.models import Account
 from django.conf import settings
-from django.db.models import Sum
+from django.db.models import Sum, F
 logger = logging.getLogger(__name__)
 
 class LoanRequirement(models.Model):
@@ -117,12 +117,34 @@ class Loan(models.Model):
             return False
         return True
 
+    def check_guarantors(self):
+        """
+        Check that guarantor commitments cover the loan and that no guarantor
+        is over their exposure limit. Only applies to loan types that carry
+        the "Guarantor" requirement.
+        """
+        if not self.loan_type.requirements.filter(name="Guarantor").exists():
+            return True
+
+        guarantees = self.guarantors.filter(status="active")
+        total_guaranteed = guarantees.aggregate(Sum("amount"))["amount__sum"] or 0
+        if total_guaranteed < (self.amount_approved or self.amount_requested):
+            return False
+
+        # Exposure is reserved atomically when a guarantee is recorded, so this only
+        # catches guarantors whose limit was lowered after they committed.
+        return not guarantees.filter(
+            guarantor__guarantor_exposure__total_guaranteed__gt=F("guarantor__guarantor_exposure__guarantee_limit")
+        ).exists()
+
     def approve_loan(self, approvee):
         """
         Approve the loan after validating requirements.
         """
         try:
             self.check_requirements()
+            if not self.check_guarantors():
+                raise ValidationError("Guarantor commitments do not cover this loan or a guarantor has exceeded their limit.")
             self.status = "approved"
             self.date_approved = timezone.now()
             self.approvee = approvee  # Track who approved the loan
@@ -203,4 +225,135 @@ class LoanHistory(models.Model):
     notes = models.TextField(blank=True, null=True)
 
     def __str__(self):
-        return f"{self.change_type} for Loan #{self.loan.id}"
\ No newline at end of file
+        return f"{self.change_type} for Loan #{self.loan.id}"
+
+
+class GuarantorExposure(models.Model):
+    """
+    Running total of the amounts a member has guaranteed on active loans.
+    Kept as a counter so limit checks are a single primary-key lookup.
+    """
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, primary_key=True, related_name="guarantor_exposure")
+    total_guaranteed = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    guarantee_limit = models.DecimalField(max_digits=15, decimal_places=2, default=100000.00)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Guarantor exposure for {self.account.user.username}"
+
+    @property
+    def available_capacity(self):
+        return self.guarantee_limit - self.total_guaranteed
+
+    @classmethod
+    def reserve(cls, account, amount):
+        """
+        Add amount to the guarantor's exposure, refusing it if the limit would be exceeded.
+        The check and increment are one conditional UPDATE, so concurrent guarantees can't overshoot.
+        """
+        cls.objects.get_or_create(account=account)
+        updated = cls.objects.filter(
+            pk=account.pk,
+            total_guaranteed__lte=F("guarantee_limit") - amount,
+        ).update(total_guaranteed=F("total_guaranteed") + amount)
+        if not updated:
+            raise ValidationError(f"Guarantee of {amount} exceeds the guarantor's available limit.")
+
+    @classmethod
+    def release(cls, account_id, amount):
+        cls.objects.filter(pk=account_id).update(total_guaranteed=F("total_guaranteed") - amount)
+
+
+class LoanGuarantor(models.Model):
+    """
+    A member's commitment to guarantee part of another member's loan.
+    Rows double as the guarantor -> borrower adjacency table for graph queries.
+    """
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name="guarantors")
+    guarantor = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="guarantees_given")
+    borrower = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="guarantees_received")
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ("active", "Active"),
+            ("released", "Released"),
+        ],
+        default="active",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("loan", "guarantor")
+        indexes = [
+            models.Index(fields=["guarantor", "status"]),
+            models.Index(fields=["borrower", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.guarantor.user.username} guarantees {self.amount} on Loan #{self.loan_id}"
+
+    def save(self, *args, **kwargs):
+        """
+        Reserve guarantor exposure when the commitment is first recorded.
+        """
+        creating = self.pk is None
+        if creating:
+            self.borrower_id = self.loan.account_id
+            if self.guarantor_id == self.borrower_id:
+                raise ValidationError("A member cannot guarantee their own loan.")
+            if self.loan.status not in ("pending", "approved"):
+                raise ValidationError("Guarantors can only be added to pending or approved loans.")
+
+        with transaction.atomic():
+            if creating:
+                GuarantorExposure.reserve(self.guarantor, self.amount)
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def release_for_loan(cls, loan):
+        """
+        Release all active guarantees on a loan and give the exposure back to the guarantors.
+        """
+        with transaction.atomic():
+            guarantees = list(cls.objects.select_for_update().filter(loan=loan, status="active").values_list("guarantor_id", "amount"))
+            for guarantor_id, amount in guarantees:
+                GuarantorExposure.release(guarantor_id, amount)
+            cls.objects.filter(loan=loan, status="active").update(status="released", released_at=timezone.now())
+        return len(guarantees)
+
+    @classmethod
+    def graph(cls, account_id, direction="guarantors", max_depth=3):
+        """
+        Walk the guarantee graph from an account, one query per level.
+        direction="guarantors" follows who guarantees the account (transitively),
+        direction="borrowers" follows whom the account guarantees.
+        """
+        source = "borrower_id" if direction == "guarantors" else "guarantor_id"
+        visited = {account_id}
+        frontier = {account_id}
+        edges = []
+
+        for depth in range(1, max_depth + 1):
+            if not frontier:
+                break
+            rows = cls.objects.filter(status="active", **{f"{source}__in": frontier}).values_list(
+                "guarantor_id", "borrower_id", "loan_id", "amount"
+            )
+            next_frontier = set()
+            for guarantor_id, borrower_id, loan_id, amount in rows:
+                edges.append({
+                    "guarantor": guarantor_id,
+                    "borrower": borrower_id,
+                    "loan": loan_id,
+                    "amount": amount,
+                    "depth": depth,
+                })
+                node = guarantor_id if direction == "guarantors" else borrower_id
+                if node not in visited:
+                    visited.add(node)
+                    next_frontier.add(node)
+            frontier = next_frontier
+
+        return {"account": account_id, "direction": direction, "nodes": sorted(visited), "edges": edges}
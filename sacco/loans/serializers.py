@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Loan, LoanType, LoanRequirement, LoanPayment, UserLoanRequirement,LoanHistory
+from .models import Loan, LoanType, LoanRequirement, LoanPayment, UserLoanRequirement, LoanHistory, LoanGuarantor, GuarantorExposure
 
 class LoanRequirementSerializer(serializers.ModelSerializer):
     class Meta:
@@ -100,4 +100,32 @@ class LoanHistorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LoanHistory
-        fields = ["id", "loan_id", "changed_by", "change_type", "timestamp", "notes"]
\ No newline at end of file
+        fields = ["id", "loan_id", "changed_by", "change_type", "timestamp", "notes"]
+
+
+class LoanGuarantorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LoanGuarantor
+        fields = "__all__"
+        read_only_fields = ["borrower", "status", "created_at", "released_at"]
+
+    def validate(self, data):
+        loan = data.get("loan")
+        guarantor = data.get("guarantor")
+
+        if data["amount"] <= 0:
+            raise serializers.ValidationError("The guaranteed amount must be greater than 0.")
+
+        if loan and guarantor and loan.account_id == guarantor.pk:
+            raise serializers.ValidationError("A member cannot guarantee their own loan.")
+
+        return data
+
+
+class GuarantorExposureSerializer(serializers.ModelSerializer):
+    available_capacity = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = GuarantorExposure
+        fields = "__all__"
+        read_only_fields = ["total_guaranteed", "last_updated"]
@@ -8,7 +8,7 @@ from django.db.models import Sum
 from django.core.exceptions import ValidationError
 from django.utils.timezone import now, timedelta
 
-from .models import Loan, UserLoanRequirement, LoanRequirement, LoanType, LoanPayment, LoanHistory
+from .models import Loan, UserLoanRequirement, LoanRequirement, LoanType, LoanPayment, LoanHistory, LoanGuarantor
 from accounts.models import Account
 
 # Configure logging
@@ -186,7 +186,7 @@ def check_fulfilled_requirements(sender, instance, **kwargs):
     Automatically approve loan if all requirements are met.
     """
     loan = Loan.objects.filter(account=instance.account, status="pending").first()
-    if loan and loan.check_requirements():
+    if loan and loan.check_requirements() and loan.check_guarantors():
         loan.status = "approved"
         loan.date_approved = now()
         loan.save()
@@ -205,6 +205,16 @@ def log_loan_status_change(sender, instance, created, **kwargs):
             )
             logger.info(f"Loan #{instance.id} marked as {instance.status}.")
 
+@receiver(post_save, sender=Loan)
+def release_loan_guarantors(sender, instance, created, **kwargs):
+    """
+    Give guarantor exposure back once a loan is repaid or rejected.
+    """
+    if not created and instance.status in ["rejected", "repaid"]:
+        released = LoanGuarantor.release_for_loan(instance)
+        if released:
+            logger.info(f"Released {released} guarantor commitment(s) for Loan #{instance.id}.")
+
 @receiver(post_save, sender=LoanPayment)
 def log_loan_payment(sender, instance, **kwargs):
     """
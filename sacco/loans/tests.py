@@ -1,3 +1,194 @@
-from django.test import TestCase
+import datetime
+import json
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from userManager.models import CustomUser
+from accounts.testing import make_member, make_admin
+from .models import Loan, LoanType, LoanGuarantor, GuarantorExposure
+from .views import LoanBookExportView
 
-# Create your tests here.
+
+def make_loan(account, amount="5000.00"):
+    loan_type, _ = LoanType.objects.get_or_create(name="Personal", defaults={"interest_rate": Decimal("12.00")})
+    return Loan.objects.create(
+        account=account, loan_type=loan_type, amount_requested=Decimal(amount),
+        due_date=datetime.date.today() + datetime.timedelta(days=90),
+    )
+
+
+def as_customer(account, *codenames):
+    user = account.user
+    user.user_permissions.add(*Permission.objects.filter(codename__in=codenames))
+    return CustomUser.objects.get(pk=user.pk)  # Fresh instance, so the permission cache is empty
+
+
+class GuarantorExposureTests(APITestCase):
+
+    def setUp(self):
+        self.borrower, self.guarantor = make_member(1), make_member(2)
+        self.loan = make_loan(self.borrower)
+
+    def test_customer_cannot_raise_own_guarantee_limit(self):
+        GuarantorExposure.objects.create(account=self.guarantor)
+        self.client.force_authenticate(as_customer(self.guarantor, "change_guarantorexposure"))
+
+        response = self.client.patch(
+            f"/guarantor-exposures/{self.guarantor.pk}/", {"guarantee_limit": "999999999.00"}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(GuarantorExposure.objects.get(pk=self.guarantor.pk).guarantee_limit, Decimal("100000.00"))
+
+    def test_admin_can_change_guarantee_limit(self):
+        GuarantorExposure.objects.create(account=self.guarantor)
+        self.client.force_authenticate(make_admin())
+
+        response = self.client.patch(
+            f"/guarantor-exposures/{self.guarantor.pk}/", {"guarantee_limit": "500.00"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(GuarantorExposure.objects.get(pk=self.guarantor.pk).guarantee_limit, Decimal("500.00"))
+
+    def test_failed_withdrawal_keeps_exposure(self):
+        guarantee = LoanGuarantor.objects.create(loan=self.loan, guarantor=self.guarantor, amount=Decimal("2000.00"))
+        self.client.force_authenticate(make_admin())
+        self.client.raise_request_exception = False
+
+        with mock.patch.object(LoanGuarantor, "delete", side_effect=RuntimeError("delete failed")):
+            response = self.client.delete(f"/loan-guarantors/{guarantee.pk}/")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(GuarantorExposure.objects.get(pk=self.guarantor.pk).total_guaranteed, Decimal("2000.00"))
+
+    def test_withdrawal_releases_exposure(self):
+        guarantee = LoanGuarantor.objects.create(loan=self.loan, guarantor=self.guarantor, amount=Decimal("2000.00"))
+        self.client.force_authenticate(make_admin())
+
+        response = self.client.delete(f"/loan-guarantors/{guarantee.pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(GuarantorExposure.objects.get(pk=self.guarantor.pk).total_guaranteed, Decimal("0.00"))
+
+
+class GuaranteeCreateTests(APITestCase):
+    """
+    Refusals raised while the guarantee is saved come back as 400s and reserve nothing.
+    """
+
+    def setUp(self):
+        self.borrower, self.guarantor = make_member(1), make_member(2)
+        self.loan = make_loan(self.borrower)
+
+    def guarantee(self, user, amount="2000.00"):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            "/loan-guarantors/",
+            {"loan": self.loan.pk, "guarantor": self.guarantor.pk, "amount": amount},
+            format="json",
+        )
+
+    def assertRefused(self, response, account):
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertFalse(LoanGuarantor.objects.exists())
+        self.assertFalse(GuarantorExposure.objects.filter(pk=account.pk, total_guaranteed__gt=0).exists())
+
+    def test_guarantee_within_limit_is_reserved(self):
+        response = self.guarantee(as_customer(self.guarantor, "add_loanguarantor"))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(GuarantorExposure.objects.get(pk=self.guarantor.pk).total_guaranteed, Decimal("2000.00"))
+
+    def test_guarantee_over_limit_is_refused(self):
+        GuarantorExposure.objects.create(account=self.guarantor, guarantee_limit=Decimal("1000.00"))
+
+        response = self.guarantee(as_customer(self.guarantor, "add_loanguarantor"))
+        self.assertRefused(response, self.guarantor)
+
+    def test_self_guarantee_is_refused(self):
+        # A customer always guarantees as themselves, whatever guarantor they post.
+        response = self.guarantee(as_customer(self.borrower, "add_loanguarantor"))
+        self.assertRefused(response, self.borrower)
+
+    def test_guarantee_on_closed_loan_is_refused(self):
+        Loan.objects.filter(pk=self.loan.pk).update(status="rejected")
+
+        response = self.guarantee(as_customer(self.guarantor, "add_loanguarantor"))
+        self.assertRefused(response, self.guarantor)
+
+
+class GuaranteeGraphTests(APITestCase):
+
+    def setUp(self):
+        self.borrower, self.guarantor, self.second = make_member(1), make_member(2), make_member(3)
+        LoanGuarantor.objects.create(loan=make_loan(self.borrower), guarantor=self.guarantor, amount=Decimal("1000.00"))
+        LoanGuarantor.objects.create(loan=make_loan(self.guarantor), guarantor=self.second, amount=Decimal("500.00"))
+
+    def graph(self, user, **params):
+        self.client.force_authenticate(user)
+        return self.client.get("/loan-guarantors/graph/", params)
+
+    def test_guarantors_are_followed_transitively(self):
+        response = self.graph(make_admin(), account=self.borrower.pk, depth=2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["nodes"], sorted([self.borrower.pk, self.guarantor.pk, self.second.pk]))
+        self.assertEqual([edge["depth"] for edge in response.data["edges"]], [1, 2])
+
+    def test_customer_gets_own_graph(self):
+        response = self.graph(as_customer(self.guarantor), account=self.borrower.pk, direction="borrowers")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["account"], self.guarantor.pk)
+        self.assertEqual(response.data["nodes"], sorted([self.guarantor.pk, self.borrower.pk]))
+
+    def test_admin_must_name_an_account(self):
+        response = self.graph(make_admin())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"error": "account is required."})
+
+
+class LoanBookExportTests(APITestCase):
+
+    def setUp(self):
+        account = make_member(1)
+        self.loans = [make_loan(account, amount * 100) for amount in range(1, 6)]
+        self.customer = account.user
+
+    def export(self, user, export_format="ndjson"):
+        self.client.force_authenticate(user)
+        response = self.client.get("/loan-book/export/", {"dataset": "loans", "export_format": export_format})
+        return response, b"".join(response.streaming_content).decode().splitlines()
+
+    def pages(self, queryset, chunk_size):
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(LoanBookExportView.keyset_rows(queryset, ["id", "amount_requested"], chunk_size))
+        return [row[0] for row in rows], len(queries)
+
+    def test_export_pages_through_every_row(self):
+        with mock.patch("loans.views.LoanBookExportView.chunk_size", 2):
+            response, lines = self.export(make_admin("auditor"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([json.loads(line)["id"] for line in lines], [loan.pk for loan in self.loans])
+
+    def test_csv_export_has_a_header_row(self):
+        response, lines = self.export(make_admin("auditor"), export_format="csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(lines[0].split(",")[:2], ["id", "account_id"])
+        self.assertEqual(len(lines), 6)
+
+    def test_partial_last_page_ends_the_export(self):
+        self.assertEqual(self.pages(Loan.objects.all(), 2), ([loan.pk for loan in self.loans], 3))
+
+    def test_full_last_page_takes_one_empty_read(self):
+        self.loans[2].delete()  # Gaps in the keys do not matter
+        expected = [loan.pk for loan in self.loans if loan.pk != self.loans[2].pk]
+        self.assertEqual(self.pages(Loan.objects.all(), 2), (expected, 3))
+
+    def test_empty_dataset_takes_one_read(self):
+        self.assertEqual(self.pages(Loan.objects.none(), 2), ([], 0))
+        self.assertEqual(self.pages(Loan.objects.filter(pk__lt=0), 2), ([], 1))
+
+    def test_export_requires_admin_role(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get("/loan-book/export/").status_code, 403)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import LoanViewSet, LoanTypeViewSet, LoanRequirementViewSet, LoanPaymentViewSet , UserLoanRequirementViewSet, LoanHistoryViewSet
+from .views import LoanViewSet, LoanTypeViewSet, LoanRequirementViewSet, LoanPaymentViewSet , UserLoanRequirementViewSet, LoanHistoryViewSet, LoanGuarantorViewSet, GuarantorExposureViewSet, LoanBookExportView
 
 router = DefaultRouter()
 router.register("loans", LoanViewSet, basename="loan")
@@ -9,7 +9,10 @@ router.register("loan-requirements", LoanRequirementViewSet, basename="loan-requ
 router.register("loan-payments", LoanPaymentViewSet, basename="loan-payment")
 router.register("user-requirements", UserLoanRequirementViewSet, basename="user-requirements")
 router.register(r"loan-history", LoanHistoryViewSet, basename="loan-history")
+router.register("loan-guarantors", LoanGuarantorViewSet, basename="loan-guarantor")
+router.register("guarantor-exposures", GuarantorExposureViewSet, basename="guarantor-exposure")
 
 urlpatterns = [
+    path("loan-book/export/", LoanBookExportView.as_view(), name="loan-book-export"),
     path("", include(router.urls)),
 ]
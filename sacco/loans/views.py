@@ -1,5 +1,5 @@
 from rest_framework import viewsets
-from .models import Loan, LoanType, LoanRequirement, LoanPayment, UserLoanRequirement, LoanHistory
+from .models import Loan, LoanType, LoanRequirement, LoanPayment, UserLoanRequirement, LoanHistory, LoanGuarantor, GuarantorExposure
 from .serializers import (
     LoanSerializer,
     LoanTypeSerializer,
@@ -7,6 +7,8 @@ from .serializers import (
     LoanPaymentSerializer,
     UserLoanRequirementSerializer,
     LoanHistorySerializer,
+    LoanGuarantorSerializer,
+    GuarantorExposureSerializer,
 )
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -15,11 +17,17 @@ from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
 from rest_framework import status,filters
 import logging
-from rest_framework.exceptions import ValidationError
-from django.db import models
+from rest_framework.exceptions import ValidationError, PermissionDenied
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
 from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from .filters import LoanFilter, LoanHistoryFilter, LoanPaymentFilter 
+from .filters import LoanFilter, LoanHistoryFilter, LoanPaymentFilter, LoanGuarantorFilter
+from rest_framework.permissions import BasePermission
+from django.http import StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+import csv
+import json
 
 logger = logging.getLogger(__name__)
 
@@ -78,8 +86,7 @@ class LoanViewSet(viewsets.ModelViewSet):
             return Response({"error": "Only Admins can approve loans."}, status=HTTP_400_BAD_REQUEST)
         loan = self.get_object()
         try:
-            loan.approvee = user
-            loan.approve_loan()
+            loan.approve_loan(user)
             return Response({"message": "Loan approved successfully."}, status=HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=HTTP_400_BAD_REQUEST)
@@ -191,3 +198,198 @@ class LoanHistoryViewSet(viewsets.ModelViewSet):
     filterset_class = LoanHistoryFilter
     ordering_fields = ["timestamp"]
     ordering = ["-timestamp"]
+
+
+
+class LoanGuarantorViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for managing guarantor commitments on loans.
+    """
+    queryset = LoanGuarantor.objects.select_related("loan", "guarantor", "borrower")
+    serializer_class = LoanGuarantorSerializer
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = LoanGuarantorFilter
+    ordering_fields = ["amount", "created_at"]
+    ordering = ["-created_at"]
+    http_method_names = ["get", "post", "delete"]
+
+    def get_queryset(self):
+        """
+        Customers only see guarantees they have given or received.
+        """
+        user = self.request.user
+        if user.role == "customer":
+            return self.queryset.filter(models.Q(guarantor=user.account) | models.Q(borrower=user.account))
+        return self.queryset
+
+    def perform_create(self, serializer):
+        """
+        The model refuses self-guarantees, loans that are closed and amounts over the guarantor's
+        limit while it reserves the exposure; those refusals are returned as 400s.
+        """
+        user = self.request.user
+        try:
+            if user.role == "customer":
+                serializer.save(guarantor=user.account)
+            else:
+                serializer.save()
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+
+    def perform_destroy(self, instance):
+        """
+        Withdrawing a guarantee is only possible while the loan is pending, and gives the exposure back.
+        """
+        if instance.loan.status != "pending":
+            raise ValidationError("Guarantees can only be withdrawn from pending loans.")
+        with transaction.atomic():
+            if instance.status == "active":
+                GuarantorExposure.release(instance.guarantor_id, instance.amount)
+            instance.delete()
+
+    @action(detail=False, methods=["get"])
+    def graph(self, request):
+        """
+        Return the guarantee graph around an account.
+        Query params: account (required for admins and staff; customers always get their own),
+        direction ("guarantors" or "borrowers"), depth (1-10).
+        """
+        user = request.user
+        if user.role == "customer":
+            account_id = user.account.pk
+        else:
+            account_id = request.query_params.get("account")
+            if not account_id:
+                return Response({"error": "account is required."}, status=HTTP_400_BAD_REQUEST)
+
+        direction = request.query_params.get("direction", "guarantors")
+        if direction not in ("guarantors", "borrowers"):
+            return Response({"error": "direction must be 'guarantors' or 'borrowers'."}, status=HTTP_400_BAD_REQUEST)
+
+        try:
+            depth = min(max(int(request.query_params.get("depth", 3)), 1), 10)
+        except ValueError:
+            return Response({"error": "depth must be an integer."}, status=HTTP_400_BAD_REQUEST)
+
+        return Response(LoanGuarantor.graph(account_id, direction=direction, max_depth=depth), status=HTTP_200_OK)
+
+
+class GuarantorExposureViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for viewing guarantor exposure and adjusting guarantee limits.
+    """
+    queryset = GuarantorExposure.objects.select_related("account")
+    serializer_class = GuarantorExposureSerializer
+    http_method_names = ["get", "patch"]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == "customer":
+            return self.queryset.filter(account=user.account)
+        return self.queryset
+
+    def perform_update(self, serializer):
+        """
+        Guarantee limits are set by admins; customers can only read their exposure.
+        """
+        if self.request.user.role != "admin":
+            raise PermissionDenied("Only admins can change guarantee limits.")
+        serializer.save()
+
+
+class _Echo:
+    """
+    File-like object that hands back whatever is written, so csv.writer can feed a streaming response.
+    """
+    def write(self, value):
+        return value
+
+
+class IsAdminRole(BasePermission):
+    """
+    Allows access only to users with the admin role.
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.role == "admin")
+
+
+class LoanBookExportView(APIView):
+    """
+    Streams the full loan book for auditors as CSV or NDJSON.
+    Rows are read with values_list projections one primary-key page at a time
+    (pk > last pk, LIMIT chunk_size), so memory stays flat regardless of how many
+    years of data are exported, on backends without server-side cursors too.
+
+    Query params: dataset (loans, payments, history), export_format (csv, ndjson).
+    """
+    permission_classes = [IsAdminRole]
+    chunk_size = 2000
+
+    DATASETS = {
+        "loans": (
+            Loan.objects.all(),
+            [
+                "id", "account_id", "loan_type__name", "amount_requested", "amount_approved",
+                "amount_disbursed", "interest_rate", "status", "is_active", "date_requested",
+                "date_approved", "date_disbursed", "due_date", "approvee__username",
+            ],
+        ),
+        "payments": (
+            LoanPayment.objects.all(),
+            ["id", "loan_id", "loan__account_id", "amount", "payment_date"],
+        ),
+        "history": (
+            LoanHistory.objects.all(),
+            ["id", "loan_id", "change_type", "changed_by__username", "timestamp", "notes"],
+        ),
+    }
+
+    def get(self, request, *args, **kwargs):
+        dataset = request.query_params.get("dataset", "loans")
+        export_format = request.query_params.get("export_format", "csv")
+
+        if dataset not in self.DATASETS:
+            return Response({"error": f"dataset must be one of {', '.join(self.DATASETS)}."}, status=HTTP_400_BAD_REQUEST)
+        if export_format not in ("csv", "ndjson"):
+            return Response({"error": "export_format must be 'csv' or 'ndjson'."}, status=HTTP_400_BAD_REQUEST)
+
+        queryset, columns = self.DATASETS[dataset]
+        rows = self.keyset_rows(queryset, columns, self.chunk_size)
+
+        if export_format == "csv":
+            content_type = "text/csv"
+            stream = self.stream_csv(columns, rows)
+        else:
+            content_type = "application/x-ndjson"
+            stream = self.stream_ndjson(columns, rows)
+
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="loan_{dataset}.{export_format}"'
+        return response
+
+    @staticmethod
+    def keyset_rows(queryset, columns, chunk_size):
+        """
+        Yield values_list rows in primary-key order, fetching one page of chunk_size at a time.
+        """
+        pk_index = columns.index("id")
+        page = queryset.order_by("pk").values_list(*columns)
+        last_pk = None
+        while True:
+            chunk = list((page if last_pk is None else page.filter(pk__gt=last_pk))[:chunk_size])
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            last_pk = chunk[-1][pk_index]
+
+    @staticmethod
+    def stream_csv(columns, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+
+    @staticmethod
+    def stream_ndjson(columns, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import Notification, UserNotification, AdminNotification
+from .models import Notification, UserNotification, AdminNotification, ArchivedNotification, OutgoingEmail
 
 
 class UserNotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'account', 'title', 'user_action', 'date_sent', 'is_read')
-    list_filter = ('user_action', 'is_read', 'date_sent')
+    list_filter = ('user_action', 'source_type', 'is_read', 'date_sent')
     search_fields = ('user__username', 'account__name', 'title', 'message')
     readonly_fields = ('date_sent',)
 
@@ -14,5 +14,19 @@ class AdminNotificationAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'title', 'message')
     readonly_fields = ('date_sent',)
 
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'source', 'title', 'action', 'date_sent', 'archived_at')
+    list_filter = ('source', 'action', 'date_sent')
+    search_fields = ('user__username', 'title', 'message')
+    readonly_fields = ('archived_at',)
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'subject', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
 admin.site.register(UserNotification, UserNotificationAdmin)
-admin.site.register(AdminNotification, AdminNotificationAdmin)
\ No newline at end of file
+admin.site.register(AdminNotification, AdminNotificationAdmin)
+admin.site.register(ArchivedNotification, ArchivedNotificationAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
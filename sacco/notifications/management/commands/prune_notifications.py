@@ -0,0 +1,25 @@
+import logging
+from django.core.management.base import BaseCommand
+from notifications import retention
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Delete or archive expired read notifications and compact repeated goal updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--archive", action="store_true", help="Copy expired notifications to the archive before deleting them.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Primary-key window handled per statement.")
+        parser.add_argument("--skip-compaction", action="store_true", help="Leave repeated goal update notices alone.")
+
+    def handle(self, *args, **options):
+        results = retention.run(
+            chunk_size=options["chunk_size"],
+            archive=options["archive"],
+            compact=not options["skip_compaction"],
+        )
+        self.stdout.write(
+            f"Compacted {results['compacted']} goal update(s); removed {results['user']} user and "
+            f"{results['admin']} admin notification(s)."
+        )
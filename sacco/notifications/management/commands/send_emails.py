@@ -0,0 +1,34 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from notifications.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send queued emails in batches, one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Emails sent per connection.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling for queued emails instead of exiting.")
+        parser.add_argument("--interval", type=int, default=10, help="Seconds to sleep between polls when --loop is set.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        while True:
+            total = 0
+            while True:
+                handled = OutgoingEmail.dispatch_due(batch_size=batch_size)
+                total += handled
+                if handled < batch_size:
+                    break
+
+            if total:
+                logger.info(f"Handled {total} queued email(s).")
+            self.stdout.write(f"Handled {total} queued email(s).")
+
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
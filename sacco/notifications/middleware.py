@@ -0,0 +1,14 @@
+from . import outbox
+
+
+class NotificationOutboxMiddleware:
+    """
+    Collect the notifications raised while handling a request and write them in one insert.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with outbox.collect():
+            return self.get_response(request)
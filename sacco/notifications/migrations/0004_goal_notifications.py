@@ -0,0 +1,126 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, When, Value
+
+# GoalNotification.notification_type -> (notification_type, user_action)
+GOAL_EVENTS = {
+    'Deposit Made': ('success', 'goal_deposit'),
+    'Milestone Reached': ('success', 'milestone_achieved'),
+    'Goal Completed': ('success', 'goal_completed'),
+    'Saving Reminder': ('warning', 'saving_reminder'),
+    'Goal Updated': ('info', 'goal_update'),
+}
+BATCH_SIZE = 1000
+
+
+def goal_twins(UserNotification, Goal, account_ids):
+    """
+    Existing UserNotification copies of goal events, keyed by (goal_id, user_action) in the
+    order they were sent. A copy belongs to a goal through its source or, for rows written
+    before sources existed, through the goal name its message quotes. Names shared by two goals
+    of one account are ambiguous and are not matched.
+    """
+    goals_by_name = {}
+    for pk, account_id, name in Goal.objects.filter(account_id__in=account_ids).values_list('pk', 'account_id', 'name'):
+        goals_by_name.setdefault(account_id, {}).setdefault(name, []).append(pk)
+
+    twins = {}
+    for pk, account_id, action, source_type, source_id, message in UserNotification.objects.filter(
+        account_id__in=account_ids,
+        user_action__in=[action for _, action in GOAL_EVENTS.values()],
+    ).filter(models.Q(source_type='goal') | models.Q(source_type__isnull=True)).order_by('date_sent', 'pk').values_list(
+        'pk', 'account_id', 'user_action', 'source_type', 'source_id', 'message'
+    ):
+        if source_type == 'goal':
+            goal_id = int(source_id)
+        else:
+            named = [goals[0] for name, goals in goals_by_name.get(account_id, {}).items()
+                     if len(goals) == 1 and f"'{name}'" in message]
+            if len(named) != 1:
+                continue
+            goal_id = named[0]
+        twins.setdefault((goal_id, action), []).append(pk)
+    return twins
+
+
+def fold_goal_notifications(apps, schema_editor):
+    """
+    Move savings.GoalNotification rows into UserNotification. Each goal event was also written
+    to UserNotification by the same save, so the n-th GoalNotification of a goal and action is
+    paired with the n-th UserNotification of that goal and action; the pair's UserNotification
+    is tagged with the goal instead of adding a second copy.
+    """
+    GoalNotification = apps.get_model('savings', 'GoalNotification')
+    Goal = apps.get_model('savings', 'Goal')
+    UserNotification = apps.get_model('notifications', 'UserNotification')
+    UnreadCounter = apps.get_model('notifications', 'UnreadCounter')
+
+    rows = list(GoalNotification.objects.order_by('date_sent', 'pk').values(
+        'account_id', 'account__user_id', 'goal_id', 'notification_type', 'message', 'date_sent', 'is_read'
+    ))
+    if not rows:
+        return
+
+    twins = goal_twins(UserNotification, Goal, {row['account_id'] for row in rows})
+    tagged, created, sent_dates, unread_users = [], [], [], set()
+    for row in rows:
+        notification_type, action = GOAL_EVENTS.get(row['notification_type'], ('info', None))
+        source = {
+            'source_type': 'goal',
+            'source_id': str(row['goal_id']),
+            'payload': {'event': row['notification_type']},
+        }
+        candidates = twins.get((row['goal_id'], action))
+        if candidates:
+            tagged.append(UserNotification(pk=candidates.pop(0), **source))
+            continue
+        created.append(UserNotification(
+            user_id=row['account__user_id'],
+            account_id=row['account_id'],
+            title=row['notification_type'],
+            message=row['message'],
+            notification_type=notification_type,
+            user_action=action,
+            is_read=row['is_read'],
+            **source,
+        ))
+        sent_dates.append(row['date_sent'])
+        if not row['is_read']:
+            unread_users.add(row['account__user_id'])
+
+    UserNotification.objects.bulk_update(tagged, ['source_type', 'source_id', 'payload'], batch_size=BATCH_SIZE)
+
+    # date_sent is auto_now_add, so the inserted rows are stamped now and their original send
+    # dates are restored afterwards. Ids are read back because MySQL does not return them.
+    last_pk = UserNotification.objects.aggregate(last=models.Max('pk'))['last'] or 0
+    UserNotification.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    new_ids = list(UserNotification.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True))
+    dates = dict(zip(new_ids, sent_dates))
+    for start in range(0, len(new_ids), BATCH_SIZE):
+        batch = new_ids[start:start + BATCH_SIZE]
+        UserNotification.objects.filter(pk__in=batch).update(
+            date_sent=Case(*[When(pk=pk, then=Value(dates[pk])) for pk in batch])
+        )
+    # Counters of users who gained unread rows are rebuilt on their next read.
+    UnreadCounter.objects.filter(user_id__in=unread_users).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_account_kyc'),
+        ('notifications', '0003_retention'),
+        ('savings', '0004_interestrun_interestaccrual'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usernotification',
+            name='payload',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(fold_goal_notifications, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import models, transaction
+from django.db.models import F, Count, Case, When, Value
 from django.utils import timezone
 from accounts.models import Account
 from django.contrib.auth import get_user_model
+import logging
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
@@ -28,10 +34,30 @@ class Notification(models.Model):
         abstract = True
         ordering = ['-date_sent']
 
+class UserNotificationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Bulk inserts skip post_save, so bump the recipients' unread counters and push the
+        new rows to their streams here.
+        """
+        from . import push  # Avoid circular import
+
+        created = super().bulk_create(objs, *args, **kwargs)
+        unread = {}
+        for notification in created:
+            if not notification.is_read:
+                unread[notification.user_id] = unread.get(notification.user_id, 0) + 1
+            push.publish_to_user(notification.user_id, 'notification', push.notification_event(notification))
+        UnreadCounter.increment(unread)
+        return created
+
+
 class UserNotification(Notification):
     """
     Model for user-specific notifications.
     """
+    objects = UserNotificationQuerySet.as_manager()
+
     NOTIFICATION_TYPES = (
     ('info', 'Info'),
     ('warning', 'Warning'),
@@ -40,10 +66,33 @@ class UserNotification(Notification):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_notifications', limit_choices_to={'role': 'customer'})
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='user_notifications')
     user_action = models.CharField(max_length=100, blank=True, null=True)  # E.g., 'deposit', 'withdrawal'
+    source_type = models.CharField(max_length=50, blank=True, null=True)  # Model the notification is about, e.g. 'goal'
+    source_id = models.CharField(max_length=64, blank=True, null=True)
+    payload = models.JSONField(blank=True, null=True)  # Event details, e.g. {'event': 'Milestone Reached', 'amount': '500.00'}
+
+    class Meta(Notification.Meta):
+        indexes = [
+            models.Index(fields=['user', '-date_sent']),
+            models.Index(fields=['user', 'user_action']),
+            models.Index(fields=['source_type', 'source_id']),
+        ]
 
     def __str__(self):
         return f"User Notification for {self.user.username} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_read = instance.__dict__.get('is_read')
+        return instance
+
+    @staticmethod
+    def source_of(obj):
+        """
+        source_type/source_id kwargs referencing obj.
+        """
+        return {'source_type': obj._meta.model_name, 'source_id': str(obj.pk)}
+
 class AdminNotification(Notification):
     """
     Model for admin-specific notifications.
@@ -57,4 +106,189 @@ class AdminNotification(Notification):
     admin_action = models.CharField(max_length=100, blank=True, null=True)  # E.g., 'user_registration', 'loan_approval'
 
     def __str__(self):
-        return f"Admin Notification for {self.user.username} - {self.title}"
\ No newline at end of file
+        return f"Admin Notification for {self.user.username} - {self.title}"
+
+
+class ArchivedNotification(models.Model):
+    """
+    A user or admin notification moved out of the hot tables by retention.
+    """
+    SOURCES = (
+        ('user', 'User'),
+        ('admin', 'Admin'),
+    )
+    source = models.CharField(max_length=10, choices=SOURCES)
+    original_id = models.PositiveBigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_notifications')
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES, default='info')
+    action = models.CharField(max_length=100, blank=True, null=True)
+    date_sent = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date_sent']
+        indexes = [models.Index(fields=['user', '-date_sent'])]
+
+    def __str__(self):
+        return f"Archived {self.source} notification for {self.user_id} - {self.title}"
+
+
+class UnreadCounter(models.Model):
+    """
+    Running count of a user's unread UserNotifications, so badge polling is a primary-key read.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    unread_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.unread_count} unread for {self.user_id}"
+
+    @property
+    def etag(self):
+        return f'"unread-{self.unread_count}"'
+
+    @classmethod
+    def for_user(cls, user_id):
+        """
+        The user's counter, created from a count of their unread notifications the first time.
+        """
+        counter = cls.objects.filter(pk=user_id).first()
+        if counter is None:
+            unread = UserNotification.objects.filter(user_id=user_id, is_read=False).count()
+            counter, _ = cls.objects.get_or_create(pk=user_id, defaults={'unread_count': unread})
+        return counter
+
+    @classmethod
+    def increment(cls, counts):
+        """
+        Add {user_id: n} to the counters, with one UPDATE per distinct n. Missing counters are
+        created from a grouped count, which already includes the new rows.
+        """
+        if not counts:
+            return
+        existing = set(cls.objects.filter(pk__in=counts).values_list('pk', flat=True))
+        by_amount = {}
+        for user_id, amount in counts.items():
+            if user_id in existing:
+                by_amount.setdefault(amount, []).append(user_id)
+        for amount, user_ids in by_amount.items():
+            cls.objects.filter(pk__in=user_ids).update(unread_count=F('unread_count') + amount)
+
+        missing = [user_id for user_id in counts if user_id not in existing]
+        if missing:
+            unread = UserNotification.objects.filter(user_id__in=missing, is_read=False).values_list('user_id').annotate(n=Count('pk')).order_by()
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, unread_count=n) for user_id, n in unread],
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def decrement(cls, user_id, amount=1):
+        """
+        Subtract amount, never going below zero, in one UPDATE.
+        """
+        if amount:
+            cls.objects.filter(pk=user_id).update(unread_count=Case(
+                When(unread_count__gte=amount, then=F('unread_count') - amount),
+                default=Value(0),
+            ))
+
+    @classmethod
+    def reset(cls, user_id):
+        cls.objects.filter(pk=user_id).update(unread_count=0)
+
+
+class OutgoingEmail(models.Model):
+    """
+    An email waiting to be sent. Rows are written in the same transaction as the change they
+    announce and sent later by the send_emails command, so no request waits on the mail server.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)  # Blank means DEFAULT_FROM_EMAIL
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)  # Not sent before this; pushed back after a failure
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'available_at'])]
+
+    def __str__(self):
+        return f"{self.subject} to {self.recipient} ({self.status})"
+
+    @classmethod
+    def queue(cls, recipients, subject, body, from_email=''):
+        """
+        Queue one email per recipient with a single insert.
+        """
+        return cls.objects.bulk_create([
+            cls(recipient=recipient, subject=subject, body=body, from_email=from_email)
+            for recipient in recipients
+        ])
+
+    def message(self, connection):
+        return EmailMessage(
+            self.subject, self.body, self.from_email or settings.DEFAULT_FROM_EMAIL, [self.recipient], connection=connection
+        )
+
+    @classmethod
+    def dispatch_due(cls, now=None, batch_size=100):
+        """
+        Send one batch of pending emails over a single SMTP connection. Rows are locked with
+        SKIP LOCKED so several workers can run side by side. Sent rows are marked with one
+        UPDATE; failed ones are retried with exponential backoff until
+        EMAIL_OUTBOX_MAX_ATTEMPTS, then marked failed. Returns the number of emails handled.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            due = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', available_at__lte=now)
+                .order_by('available_at', 'pk')[:batch_size]
+            )
+            if not due:
+                return 0
+
+            sent, failed = [], []
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+            except Exception as exc:
+                failed = [(email, exc) for email in due]
+            else:
+                try:
+                    for email in due:
+                        try:
+                            connection.send_messages([email.message(connection)])
+                            sent.append(email.pk)
+                        except Exception as exc:
+                            failed.append((email, exc))
+                finally:
+                    connection.close()
+
+            if sent:
+                cls.objects.filter(pk__in=sent).update(status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1, last_error='')
+            for email, exc in failed:
+                email.attempts += 1
+                email.last_error = str(exc)
+                if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    email.status = 'failed'
+                else:
+                    email.available_at = now + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1))
+            cls.objects.bulk_update([email for email, _ in failed], ['attempts', 'last_error', 'status', 'available_at'])
+
+        if failed:
+            logger.warning(f"{len(failed)} of {len(due)} email(s) could not be sent: {failed[0][1]}")
+        return len(due)
@@ -0,0 +1,109 @@
+"""
+Notification outbox.
+
+Signal handlers call notify() instead of inserting a UserNotification themselves. Events are
+queued once their transaction commits and, inside a collect() block (every request is wrapped
+in one by NotificationOutboxMiddleware), held until the block ends. Recipients are then
+resolved with one query and all rows are written with one bulk insert. Outside a collect()
+block an event is written as soon as its transaction commits.
+"""
+from contextlib import contextmanager
+from threading import local
+from django.db import transaction
+from accounts.models import Account
+import logging
+logger = logging.getLogger(__name__)
+
+_state = local()
+
+
+def _buffer():
+    return getattr(_state, "buffer", None)
+
+
+@contextmanager
+def collect():
+    """
+    Hold notifications raised inside the block and write them together when it exits.
+    Nested blocks join the outermost one.
+    """
+    if _buffer() is not None:
+        yield
+        return
+
+    _state.buffer = []
+    try:
+        yield
+    finally:
+        pending, _state.buffer = _state.buffer, None
+        flush(pending)
+
+
+def notify(*, title, message, notification_type="info", user_action=None, account=None, account_id=None, user_id=None,
+           source=None, payload=None):
+    """
+    Queue a UserNotification. Pass the recipient as an Account instance, an account_id or a
+    user_id; whatever is missing is resolved in bulk at flush time. source is the object the
+    notification is about and payload its event details. Nothing is written if the
+    surrounding transaction rolls back.
+    """
+    if account is not None:
+        account_id, user_id = account.pk, account.user_id
+    entry = {
+        "account_id": account_id,
+        "user_id": user_id,
+        "title": title,
+        "message": message,
+        "notification_type": notification_type,
+        "user_action": user_action,
+        "source_type": source._meta.model_name if source is not None else None,
+        "source_id": str(source.pk) if source is not None else None,
+        "payload": payload,
+    }
+
+    def enqueue():
+        buffer = _buffer()
+        if buffer is None:
+            flush([entry])
+        else:
+            buffer.append(entry)
+
+    transaction.on_commit(enqueue)
+
+
+def flush(entries):
+    """
+    Resolve missing recipients with one Account query and bulk insert the notifications.
+    """
+    from .models import UserNotification  # Avoid circular import
+
+    if not entries:
+        return []
+
+    account_ids = {entry["account_id"] for entry in entries if entry["user_id"] is None}
+    user_ids = {entry["user_id"] for entry in entries if entry["account_id"] is None}
+    by_account, by_user = {}, {}
+    if account_ids or user_ids:
+        recipients = Account.objects.filter(pk__in=account_ids) | Account.objects.filter(user_id__in=user_ids)
+        for pk, user_id in recipients.values_list("pk", "user_id"):
+            by_account[pk], by_user[user_id] = user_id, pk
+
+    notifications = []
+    for entry in entries:
+        account_id = entry["account_id"] or by_user.get(entry["user_id"])
+        user_id = entry["user_id"] or by_account.get(entry["account_id"])
+        if account_id is None or user_id is None:
+            logger.warning(f"Dropping notification '{entry['title']}': no account for recipient {entry['account_id'] or entry['user_id']}")
+            continue
+        notifications.append(UserNotification(
+            user_id=user_id,
+            account_id=account_id,
+            title=entry["title"],
+            message=entry["message"],
+            notification_type=entry["notification_type"],
+            user_action=entry["user_action"],
+            source_type=entry["source_type"],
+            source_id=entry["source_id"],
+            payload=entry["payload"],
+        ))
+    return UserNotification.objects.bulk_create(notifications)
@@ -0,0 +1,133 @@
+"""
+Push channel for server-sent events.
+
+Code that changes something a user is watching calls publish_to_user(). Once the transaction
+commits, the event goes to the configured broker (NOTIFICATION_PUSH_BROKER). The broker fans it
+out to every open /notifications/stream/ connection of that user. LocalBroker only reaches
+connections served by the same process; a broker backed by a shared store only has to provide
+publish() and subscribe().
+"""
+import asyncio
+import json
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One stream's queue of events, read from the event loop that created it.
+    """
+
+    def __init__(self, broker, channel, maxsize=100):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        # Runs on self.loop; a slow reader loses its oldest events rather than growing without bound.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """
+        Next event, or None if nothing arrived within timeout seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    In-process pub/sub. publish() may be called from any thread; events are handed to each
+    subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The stream's loop has shut down; it will unsubscribe itself.
+                pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.NOTIFICATION_PUSH_BROKER)()
+    return _broker
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def publish_to_user(user_id, event_type, data):
+    """
+    Send an event to the user's open streams once the current transaction commits.
+    """
+    if user_id is None:
+        return
+    event = {"event": event_type, "data": data}
+    transaction.on_commit(lambda: get_broker().publish(user_channel(user_id), event))
+
+
+def notification_event(notification):
+    return {
+        "id": notification.pk,
+        "title": notification.title,
+        "message": notification.message,
+        "notification_type": notification.notification_type,
+        "user_action": notification.user_action,
+        "source_type": notification.source_type,
+        "source_id": notification.source_id,
+        "payload": notification.payload,
+        "date_sent": notification.date_sent,
+        "is_read": notification.is_read,
+    }
+
+
+def format_sse(event):
+    """
+    Encode an event in the text/event-stream wire format.
+    """
+    data = json.dumps(event["data"], cls=DjangoJSONEncoder)
+    return f"event: {event['event']}\ndata: {data}\n\n"
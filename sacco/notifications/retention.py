@@ -0,0 +1,128 @@
+"""
+Notification retention.
+
+Read notifications expire after a TTL chosen by their action (NOTIFICATION_RETENTION_DAYS and
+ADMIN_NOTIFICATION_RETENTION_DAYS, with a 'default' entry for everything else). Expired rows
+are deleted, or archived and then deleted, one primary-key window at a time, so each statement
+touches a bounded number of rows. Repeated "Goal Updated" notices are compacted to the latest
+one per goal.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Min, Max, Exists, OuterRef
+from django.utils import timezone
+from .models import UserNotification, AdminNotification, ArchivedNotification, UnreadCounter
+import logging
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = ('pk', 'user_id', 'title', 'message', 'notification_type', 'date_sent')
+
+
+def _expired(model, action_field, retention, now):
+    """
+    Read rows of model older than the TTL for their action.
+    """
+    condition = Q()
+    overridden = [action for action in retention if action != 'default']
+    for action in overridden:
+        condition |= Q(**{action_field: action}, date_sent__lt=now - timedelta(days=retention[action]))
+    if retention.get('default') is not None:
+        # NOT IN is never true for NULL, so rows without an action are matched explicitly.
+        other_actions = ~Q(**{f'{action_field}__in': overridden}) | Q(**{f'{action_field}__isnull': True})
+        condition |= other_actions & Q(date_sent__lt=now - timedelta(days=retention['default']))
+    if not condition:
+        return model.objects.none()
+    return model.objects.filter(condition, is_read=True)
+
+
+def _windows(queryset, chunk_size):
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        yield queryset.filter(pk__gte=start, pk__lt=start + chunk_size)
+
+
+def purge(model, action_field, retention, now=None, chunk_size=1000, archive=False):
+    """
+    Delete (or archive and delete) expired read rows of model. Returns the number removed.
+    Only read rows expire, so unread counters are unaffected.
+    """
+    now = now or timezone.now()
+    source = 'user' if model is UserNotification else 'admin'
+    removed = 0
+    for window in _windows(_expired(model, action_field, retention, now), chunk_size):
+        with transaction.atomic():
+            if archive:
+                fields = ARCHIVE_FIELDS + (action_field,) + (('account_id',) if model is UserNotification else ())
+                rows = list(window.values(*fields))
+                if not rows:
+                    continue
+                ArchivedNotification.objects.bulk_create([
+                    ArchivedNotification(
+                        source=source,
+                        original_id=row['pk'],
+                        user_id=row['user_id'],
+                        account_id=row.get('account_id'),
+                        title=row['title'],
+                        message=row['message'],
+                        notification_type=row['notification_type'],
+                        action=row[action_field],
+                        date_sent=row['date_sent'],
+                    )
+                    for row in rows
+                ])
+                window = model.objects.filter(pk__in=[row['pk'] for row in rows])
+            deleted, _ = window.delete()
+            removed += deleted
+    logger.info(f"Removed {removed} expired {source} notification(s){' to the archive' if archive else ''}.")
+    return removed
+
+
+def compact_goal_updates(chunk_size=1000):
+    """
+    Keep only the newest "Goal Updated" notice per user and goal. Notices are matched on their
+    source, since the message carries the amount and progress at the time. Notices without a
+    source are kept. Unread notices that are dropped are marked read first and taken off the
+    users' unread counters with one UPDATE per user. Returns the number removed.
+    """
+    newer = UserNotification.objects.filter(
+        user_action='goal_update', user=OuterRef('user'), source_type=OuterRef('source_type'),
+        source_id=OuterRef('source_id'), pk__gt=OuterRef('pk'),
+    )
+    superseded = UserNotification.objects.filter(
+        user_action='goal_update', source_id__isnull=False
+    ).filter(Exists(newer))
+
+    removed = 0
+    for window in _windows(superseded, chunk_size):
+        with transaction.atomic():
+            rows = list(window.values_list('pk', 'user_id', 'is_read'))
+            if not rows:
+                continue
+            # Fetched ids rather than the window itself: MySQL cannot delete from a table it subqueries.
+            doomed = UserNotification.objects.filter(pk__in=[pk for pk, _, _ in rows])
+            doomed.filter(is_read=False).update(is_read=True)
+            deleted, _ = doomed.delete()
+            removed += deleted
+            unread = {}
+            for _, user_id, is_read in rows:
+                if not is_read:
+                    unread[user_id] = unread.get(user_id, 0) + 1
+            for user_id, count in unread.items():
+                UnreadCounter.decrement(user_id, count)
+    logger.info(f"Compacted {removed} superseded goal update notification(s).")
+    return removed
+
+
+def run(now=None, chunk_size=1000, archive=False, compact=True):
+    """
+    Apply retention to both notification tables and compact goal updates.
+    """
+    results = {
+        'compacted': compact_goal_updates(chunk_size) if compact else 0,
+        'user': purge(UserNotification, 'user_action', settings.NOTIFICATION_RETENTION_DAYS, now, chunk_size, archive),
+        'admin': purge(AdminNotification, 'admin_action', settings.ADMIN_NOTIFICATION_RETENTION_DAYS, now, chunk_size, archive),
+    }
+    return results
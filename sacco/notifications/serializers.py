@@ -4,9 +4,27 @@ from .models import  UserNotification, AdminNotification
 class UserNotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserNotification
-        fields = ['id', 'user', 'account', 'title', 'message', 'notification_type', 'user_action', 'date_sent', 'is_read']
+        fields = ['id', 'user', 'account', 'title', 'message', 'notification_type', 'user_action', 'source_type', 'source_id', 'payload', 'date_sent', 'is_read']
 
 class AdminNotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = AdminNotification
-        fields = ['id', 'user', 'title', 'message', 'notification_type', 'admin_action', 'date_sent', 'is_read']
\ No newline at end of file
+        fields = ['id', 'user', 'title', 'message', 'notification_type', 'admin_action', 'date_sent', 'is_read']
+
+class NotificationSelectionSerializer(serializers.Serializer):
+    """
+    Notifications picked for a bulk action: a list of ids, or every notification up to and
+    including the id given as up_to (the newest one the client has seen).
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000, required=False)
+    up_to = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('up_to' in data):
+            raise serializers.ValidationError("Provide either 'ids' or 'up_to'.")
+        return data
+
+    def filter(self, queryset):
+        if 'ids' in self.validated_data:
+            return queryset.filter(pk__in=self.validated_data['ids'])
+        return queryset.filter(pk__lte=self.validated_data['up_to'])
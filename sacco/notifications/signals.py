@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import UserNotification, AdminNotification
+from .models import AdminNotification, UserNotification, UnreadCounter
+from . import outbox, push
 from accounts.models import Account, KYC, NextOfKin
 from savings.models import Goal, SavingMilestone, SavingReminder
 from investments.models import Investment, UserInvestment, Dividend
@@ -9,11 +10,29 @@ from loans.models import Loan, LoanPayment
 
 User = get_user_model()
 
+@receiver(post_save, sender=UserNotification)
+def update_unread_counter(sender, instance, created, **kwargs):
+    was_read = getattr(instance, "_loaded_is_read", None)
+    if created:
+        if not instance.is_read:
+            UnreadCounter.increment({instance.user_id: 1})
+        push.publish_to_user(instance.user_id, "notification", push.notification_event(instance))
+    elif was_read is not None and was_read != instance.is_read:
+        if instance.is_read:
+            UnreadCounter.decrement(instance.user_id)
+        else:
+            UnreadCounter.increment({instance.user_id: 1})
+    instance._loaded_is_read = instance.is_read
+
+@receiver(post_delete, sender=UserNotification)
+def release_unread_counter(sender, instance, **kwargs):
+    if not instance.is_read:
+        UnreadCounter.decrement(instance.user_id)
+
 @receiver(post_save, sender=Account)
 def create_account_notification(sender, instance, created, **kwargs):
     if created:
-        UserNotification.objects.create(
-            user=instance.user,
+        outbox.notify(
             account=instance,
             title="Account Created",
             message="Your account has been successfully created.",
@@ -24,9 +43,8 @@ def create_account_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=KYC)
 def create_kyc_notification(sender, instance, created, **kwargs):
     if created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            user_id=instance.user_id,
             title="KYC Submitted",
             message="Your KYC information has been submitted.",
             notification_type="info",
@@ -36,60 +54,14 @@ def create_kyc_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=NextOfKin)
 def create_next_of_kin_notification(sender, instance, created, **kwargs):
     if created:
-        UserNotification.objects.create(
-            user=instance.kyc.user,
-            account=instance.kyc.account,
+        outbox.notify(
+            user_id=instance.kyc.user_id,
             title="Next of Kin Added",
             message="A new next of kin has been added to your account.",
             notification_type="info",
             user_action="next_of_kin_added"
         )
 
-@receiver(post_save, sender=Goal)
-def create_goal_notification(sender, instance, created, **kwargs):
-    if created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
-            title="New Goal Created",
-            message=f"A new goal '{instance.name}' has been created.",
-            notification_type="info",
-            user_action="goal_creation"
-        )
-
-@receiver(post_save, sender=SavingMilestone)
-def create_milestone_notification(sender, instance, created, **kwargs):
-    if created:
-        UserNotification.objects.create(
-            user=instance.goal.account.user,
-            account=instance.goal.account,
-            title="Milestone Created",
-            message=f"A new milestone of {instance.milestone_amount} has been set for your goal '{instance.goal.name}'.",
-            notification_type="info",
-            user_action="milestone_creation"
-        )
-    elif instance.achieved:
-        UserNotification.objects.create(
-            user=instance.goal.account.user,
-            account=instance.goal.account,
-            title="Milestone Achieved",
-            message=f"Congratulations! You have achieved the milestone of {instance.milestone_amount} for your goal '{instance.goal.name}'.",
-            notification_type="success",
-            user_action="milestone_achieved"
-        )
-
-@receiver(post_save, sender=SavingReminder)
-def create_reminder_notification(sender, instance, created, **kwargs):
-    if created:
-        UserNotification.objects.create(
-            user=instance.goal.account.user,
-            account=instance.goal.account,
-            title="Saving Reminder",
-            message=f"Reminder: {instance.reminder_type} for your goal '{instance.goal.name}'.",
-            notification_type="warning",
-            user_action="saving_reminder"
-        )
-
 @receiver(post_save, sender=User)
 def create_admin_notification(sender, instance, created, **kwargs):
     if created and instance.role == 'admin':
@@ -105,9 +77,8 @@ def create_admin_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=UserInvestment)
 def create_user_investment_notification(sender, instance, created, **kwargs):
     if created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="User Investment Created",
             message=f"You have invested in '{instance.investment.investment_type.name}'.",
             notification_type="info",
@@ -116,10 +87,10 @@ def create_user_investment_notification(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=Dividend)
 def create_dividend_notification(sender, instance, created, **kwargs):
-    if created:
-        UserNotification.objects.create(
-            user=instance.investment_account.account.user,
-            account=instance.investment_account.account,
+    # Pending rows are estimates; only a paid dividend is announced.
+    if created and instance.is_distributed:
+        outbox.notify(
+            account_id=instance.investment_account_id,
             title="Dividend Distributed",
             message=f"A dividend of {instance.amount} has been distributed for your investment in '{instance.investment_type.name}'.",
             notification_type="success",
@@ -128,22 +99,26 @@ def create_dividend_notification(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=Investment)
 def update_investment_notification(sender, instance, created, **kwargs):
-    if not created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
-            title="Investment Updated",
-            message=f"Your investment '{instance.investment_type.name}' has been updated.",
-            notification_type="info",
-            user_action="investment_update"
-        )
+    if not created and instance.has_user_visible_changes():
+        # An Investment has no owner of its own; notify every account holding it.
+        holders = Account.objects.filter(
+            investmentaccount__user_investments__investment=instance
+        ).distinct().values_list('pk', 'user_id')
+        for account_id, user_id in holders:
+            outbox.notify(
+                account_id=account_id,
+                user_id=user_id,
+                title="Investment Updated",
+                message=f"Your investment '{instance.investment_type.name}' has been updated.",
+                notification_type="info",
+                user_action="investment_update"
+            )
 
 @receiver(post_save, sender=UserInvestment)
 def update_user_investment_notification(sender, instance, created, **kwargs):
     if not created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="User Investment Updated",
             message=f"Your investment in '{instance.investment.investment_type.name}' has been updated.",
             notification_type="info",
@@ -153,9 +128,8 @@ def update_user_investment_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Dividend)
 def update_dividend_notification(sender, instance, created, **kwargs):
     if not created:
-        UserNotification.objects.create(
-            user=instance.investment_account.account.user,
-            account=instance.investment_account.account,
+        outbox.notify(
+            account_id=instance.investment_account_id,
             title="Dividend Updated",
             message=f"The dividend of {instance.amount} for your investment in '{instance.investment_type.name}' has been updated.",
             notification_type="info",
@@ -164,27 +138,24 @@ def update_dividend_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Loan)
 def create_loan_notification(sender, instance, created, **kwargs):
     if created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="Loan Application Submitted",
             message=f"Your loan application for {instance.amount_requested} has been submitted.",
             notification_type="info",
             user_action="loan_application"
         )
     elif instance.status == "approved":
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="Loan Approved",
             message=f"Your loan application for {instance.amount_requested} has been approved.",
             notification_type="success",
             user_action="loan_approved"
         )
     elif instance.status == "rejected":
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="Loan Rejected",
             message=f"Your loan application for {instance.amount_requested} has been rejected.",
             notification_type="warning",
@@ -194,9 +165,8 @@ def create_loan_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=LoanPayment)
 def create_loan_payment_notification(sender, instance, created, **kwargs):
     if created:
-        UserNotification.objects.create(
-            user=instance.loan.account.user,
-            account=instance.loan.account,
+        outbox.notify(
+            account_id=instance.loan.account_id,
             title="Loan Payment Made",
             message=f"A payment of {instance.amount} has been made for Loan #{instance.loan.id}.",
             notification_type="info",
@@ -206,9 +176,8 @@ def create_loan_payment_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Loan)
 def update_loan_notification(sender, instance, created, **kwargs):
     if not created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="Loan Updated",
             message=f"Your loan application for {instance.amount_requested} has been updated.",
             notification_type="info",
@@ -220,62 +189,56 @@ from savings.models import Goal, SavingMilestone, SavingReminder
 @receiver(post_save, sender=Goal)
 def create_goal_notification(sender, instance, created, **kwargs):
     if created:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="New Goal Created",
             message=f"A new goal '{instance.name}' has been created.",
             notification_type="info",
-            user_action="goal_creation"
+            user_action="goal_creation",
+            source=instance,
+            payload={"event": "Goal Created"},
         )
     else:
-        UserNotification.objects.create(
-            user=instance.account.user,
-            account=instance.account,
+        outbox.notify(
+            account_id=instance.account_id,
             title="Goal Updated",
-            message=f"Your goal '{instance.name}' has been updated.",
+            message=f"Your goal '{instance.name}' has been updated. Current amount: {instance.current_amount}, Progress: {instance.progress_percentage}%",
             notification_type="info",
-            user_action="goal_update"
+            user_action="goal_update",
+            source=instance,
+            payload={"event": "Goal Updated", "current_amount": str(instance.current_amount),
+                     "progress_percentage": str(instance.progress_percentage)},
         )
 
 @receiver(post_save, sender=SavingMilestone)
 def create_milestone_notification(sender, instance, created, **kwargs):
-    if created:
-        UserNotification.objects.create(
-            user=instance.goal.account.user,
-            account=instance.goal.account,
+    if created and not instance.achieved:
+        outbox.notify(
+            account_id=instance.goal.account_id,
             title="Milestone Created",
             message=f"A new milestone of {instance.milestone_amount} has been set for your goal '{instance.goal.name}'.",
             notification_type="info",
-            user_action="milestone_creation"
+            user_action="milestone_creation",
+            source=instance.goal,
+            payload={"event": "Milestone Created", "amount": str(instance.milestone_amount)},
         )
     elif instance.achieved:
-        UserNotification.objects.create(
-            user=instance.goal.account.user,
-            account=instance.goal.account,
+        outbox.notify(
+            account_id=instance.goal.account_id,
             title="Milestone Achieved",
             message=f"Congratulations! You have achieved the milestone of {instance.milestone_amount} for your goal '{instance.goal.name}'.",
             notification_type="success",
-            user_action="milestone_achieved"
+            user_action="milestone_achieved",
+            source=instance.goal,
+            payload={"event": "Milestone Reached", "amount": str(instance.milestone_amount)},
         )
 
-@receiver(post_save, sender=SavingReminder)
-def create_reminder_notification(sender, instance, created, **kwargs):
-    if created:
-        UserNotification.objects.create(
-            user=instance.goal.account.user,
-            account=instance.goal.account,
-            title="Saving Reminder",
-            message=f"Reminder: {instance.reminder_type} for your goal '{instance.goal.name}'.",
-            notification_type="warning",
-            user_action="saving_reminder"
-        )
 from userManager.models import CustomUser
 
 # @receiver(post_save, sender=CustomUser)
 # def update_user_profile_notification(sender, instance, created, **kwargs):
 #     if not created:
-#         UserNotification.objects.create(
+#         outbox.notify(
 #             user=instance,
 #             title="Profile Updated",
 #             message=f"Your profile has been successfully updated.",
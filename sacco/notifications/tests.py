@@ -1,3 +1,468 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.testing import make_member, make_admin
+from investments.models import InvestmentType, Investment, InvestmentAccount, UserInvestment
+from . import outbox, push
+from django.utils import timezone
+from savings.models import Goal
+from .models import UserNotification, AdminNotification, ArchivedNotification, UnreadCounter, OutgoingEmail
+from .views import BulkNotificationMixin
+from .retention import compact_goal_updates, purge
 
-# Create your tests here.
+
+class InvestmentUpdateNotificationTests(TestCase):
+
+    def setUp(self):
+        self.investment = Investment.objects.create(
+            investment_type=InvestmentType.objects.create(name="Notified Fund", description=""),
+            amount_invested=Decimal("0.00"), current_value=Decimal("0.00"),
+            return_on_investment=Decimal("10.00"), description="",
+        )
+        self.holder = make_member(1)
+        self.invest(self.holder, Decimal("1000.00"))
+
+    def invest(self, account, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserInvestment.objects.create(
+                account=InvestmentAccount.objects.get(account=account), investment=self.investment, invested_amount=amount
+            )
+
+    def updates(self):
+        return UserNotification.objects.filter(user_action="investment_update").count()
+
+    def test_new_holding_does_not_notify_existing_holders(self):
+        for n in range(2, 5):
+            self.invest(make_member(n), Decimal("500.00"))
+
+        self.assertEqual(self.updates(), 0)
+
+    def test_visible_change_notifies_each_holder(self):
+        self.invest(make_member(2), Decimal("500.00"))
+        investment = Investment.objects.get(pk=self.investment.pk)
+        investment.return_on_investment = Decimal("12.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            investment.save()
+
+        self.assertEqual(self.updates(), 2)
+
+    def test_unchanged_save_does_not_notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Investment.objects.get(pk=self.investment.pk).save()
+
+        self.assertEqual(self.updates(), 0)
+
+
+class NotificationOutboxTests(TestCase):
+
+    def setUp(self):
+        self.first, self.second = make_member(1), make_member(2)
+
+    def titles(self):
+        return sorted(UserNotification.objects.values_list("title", flat=True))
+
+    def test_rolled_back_work_notifies_no_one(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    outbox.notify(account=self.first, title="Lost", message="")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            outbox.notify(account=self.first, title="Kept", message="")
+
+        self.assertEqual(self.titles(), ["Kept"])
+
+    def test_collect_writes_once_when_the_block_exits(self):
+        with outbox.collect():
+            with self.captureOnCommitCallbacks(execute=True):
+                outbox.notify(account=self.first, title="One", message="")
+                outbox.notify(account=self.second, title="Two", message="")
+            self.assertEqual(self.titles(), [])
+
+        self.assertEqual(self.titles(), ["One", "Two"])
+
+    def test_recipients_are_resolved_in_one_query(self):
+        entries = [
+            {"account_id": self.first.pk, "user_id": None},
+            {"account_id": None, "user_id": self.second.user_id},
+        ]
+        entries = [dict(entry, title="Hi", message="", notification_type="info", user_action=None,
+                        source_type=None, source_id=None, payload=None) for entry in entries]
+
+        with CaptureQueriesContext(connection) as queries:
+            outbox.flush(entries)
+
+        self.assertEqual(len([query for query in queries if '"accounts_account"' in query["sql"]]), 1)
+
+        self.assertEqual(
+            set(UserNotification.objects.values_list("account_id", "user_id")),
+            {(self.first.pk, self.first.user_id), (self.second.pk, self.second.user_id)},
+        )
+
+    def test_unknown_recipient_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.notify(account_id="ACC-missing", title="Nobody", message="")
+            outbox.notify(account=self.first, title="Somebody", message="")
+
+        self.assertEqual(self.titles(), ["Somebody"])
+
+
+class UnreadCounterTests(TestCase):
+
+    def setUp(self):
+        self.user = make_member(1).user
+        UnreadCounter.objects.update_or_create(user=self.user, defaults={"unread_count": 5})
+
+    def unread(self):
+        return UnreadCounter.objects.get(user=self.user).unread_count
+
+    def test_decrement_subtracts(self):
+        UnreadCounter.decrement(self.user.pk, 3)
+        self.assertEqual(self.unread(), 2)
+
+    def test_decrement_stops_at_zero(self):
+        UnreadCounter.decrement(self.user.pk, 7)
+        self.assertEqual(self.unread(), 0)
+
+    def test_bulk_inserted_notifications_are_counted(self):
+        UserNotification.objects.bulk_create([
+            UserNotification(user=self.user, account_id=self.user.account.pk, title=title, message="")
+            for title in ("One", "Two")
+        ])
+        self.assertEqual(self.unread(), 7)
+
+    def test_reading_or_deleting_an_unread_notification_releases_it(self):
+        notification = UserNotification.objects.create(user=self.user, account_id=self.user.account.pk, title="Hi", message="")
+        self.assertEqual(self.unread(), 6)
+
+        notification.is_read = True
+        notification.save()
+        notification.delete()
+        UserNotification.objects.create(user=self.user, account_id=self.user.account.pk, title="Bye", message="").delete()
+
+        self.assertEqual(self.unread(), 5)
+
+    def test_marking_read_twice_decrements_once(self):
+        notification = UserNotification.objects.create(user=self.user, account_id=self.user.account.pk, title="Hi", message="")
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        for _ in range(2):
+            response = client.post(f"/user-notifications/{notification.pk}/mark_as_read/")
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.unread(), 5)
+
+    def test_badge_answers_not_modified_for_a_matching_etag(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get("/notifications/unread_count/")
+        self.assertEqual(response.data, {"unread_count": 5})
+
+        response = client.get("/notifications/unread_count/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+
+class NotificationStreamTests(TestCase):
+
+    def setUp(self):
+        self.user = make_member(1).user
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def test_stream_delivers_the_users_events(self):
+        response = await self.async_client.get("/notifications/stream/", {"access_token": self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        push.get_broker().publish(push.user_channel(self.user.pk), {"event": "deposit.status", "data": {"status": "completed"}})
+        self.assertEqual(await anext(stream), b'event: deposit.status\ndata: {"status": "completed"}\n\n')
+        await stream.aclose()
+
+    async def test_stream_requires_authentication(self):
+        response = await self.async_client.get("/notifications/stream/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.get("/notifications/stream/", {"access_token": self.token})
+        self.assertEqual(response.status_code, 501)
+
+
+class CompactGoalUpdatesTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1)
+        deadline = datetime.date.today() + datetime.timedelta(days=60)
+        self.goals = [
+            Goal.objects.create(account=self.account, name=name, target_amount=Decimal("1000.00"), deadline=deadline)
+            for name in ("Rent", "School fees")
+        ]
+        UserNotification.objects.filter(user=self.account.user).delete()
+        UnreadCounter.objects.filter(user=self.account.user).delete()
+
+    def update(self, goal, amount):
+        return UserNotification.objects.create(
+            user=self.account.user, account=self.account, title="Goal Updated",
+            message=f"Your goal '{goal.name}' has been updated. Current amount: {amount}, Progress: 0.00%",
+            notification_type="info", user_action="goal_update", **UserNotification.source_of(goal),
+        )
+
+    def test_keeps_newest_update_per_goal(self):
+        for amount in (100, 200, 300):
+            self.update(self.goals[0], amount)
+        latest = self.update(self.goals[0], 400)
+        other = self.update(self.goals[1], 100)
+
+        self.assertEqual(compact_goal_updates(), 3)
+
+        remaining = UserNotification.objects.filter(user_action="goal_update")
+        self.assertEqual(set(remaining.values_list("pk", flat=True)), {latest.pk, other.pk})
+        self.assertEqual(UnreadCounter.for_user(self.account.user_id).unread_count, 2)
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS={"default": 30, "goal_update": 7})
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1)
+        UserNotification.objects.filter(user=self.account.user).delete()
+        self.now = timezone.now()
+
+    def notice(self, days_old, action=None, is_read=True):
+        notification = UserNotification.objects.create(
+            user=self.account.user, account=self.account, title="Notice", message="Old news",
+            user_action=action, is_read=is_read,
+        )
+        UserNotification.objects.filter(pk=notification.pk).update(date_sent=self.now - datetime.timedelta(days=days_old))
+        return notification
+
+    def purge(self, **kwargs):
+        return purge(UserNotification, "user_action", settings.NOTIFICATION_RETENTION_DAYS, self.now, **kwargs)
+
+    def remaining(self):
+        return set(UserNotification.objects.filter(user=self.account.user).values_list("pk", flat=True))
+
+    def test_each_action_expires_after_its_own_ttl(self):
+        expired = [self.notice(8, "goal_update"), self.notice(31, "deposit"), self.notice(31)]
+        kept = [self.notice(6, "goal_update"), self.notice(29, "deposit"), self.notice(29)]
+
+        self.assertEqual(self.purge(), len(expired))
+        self.assertEqual(self.remaining(), {notification.pk for notification in kept})
+
+    def test_unread_notifications_never_expire(self):
+        unread = self.notice(365, "goal_update", is_read=False)
+        count = UnreadCounter.for_user(self.account.user_id).unread_count
+
+        self.assertEqual(self.purge(), 0)
+        self.assertEqual(self.remaining(), {unread.pk})
+        self.assertEqual(UnreadCounter.for_user(self.account.user_id).unread_count, count)
+
+    def test_windows_cover_gaps_in_the_keys(self):
+        notices = [self.notice(31) for _ in range(5)]
+        kept = self.notice(1)
+        notices[1].delete()
+
+        self.assertEqual(self.purge(chunk_size=2), 4)
+        self.assertEqual(self.remaining(), {kept.pk})
+
+    def test_archive_copies_rows_before_deleting(self):
+        expired = self.notice(31, "deposit")
+
+        self.assertEqual(self.purge(archive=True), 1)
+        self.assertEqual(self.remaining(), set())
+        archived = ArchivedNotification.objects.get(original_id=expired.pk)
+        self.assertEqual((archived.source, archived.action, archived.account_id), ("user", "deposit", self.account.pk))
+
+
+class FoldGoalNotificationsMigrationTests(TransactionTestCase):
+    before = [("notifications", "0003_retention"), ("savings", "0004_interestrun_interestaccrual")]
+    after = [("notifications", "0004_goal_notifications"), ("savings", "0005_goal_notifications")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_goal_notifications_are_folded_once(self):
+        account = make_member(1)
+        deadline = datetime.date.today() + datetime.timedelta(days=60)
+        rent, fees = [
+            Goal.objects.create(account=account, name=name, target_amount=Decimal("1000.00"), deadline=deadline)
+            for name in ("Rent", "School fees")
+        ]
+        UserNotification.objects.all().delete()
+        UnreadCounter.objects.all().delete()
+
+        apps = self.migrate(self.before)
+        GoalNotification = apps.get_model("savings", "GoalNotification")
+        HistoricalUserNotification = apps.get_model("notifications", "UserNotification")
+        sent = timezone.now() - datetime.timedelta(days=30)
+        for goal in (rent, fees):
+            GoalNotification.objects.create(
+                account_id=account.pk, goal_id=goal.pk, notification_type="Goal Updated",
+                message=f"Your goal '{goal.name}' has been updated. Current amount: 0.00, Progress: 0.00%",
+            )
+        # Rows written before sources existed name their goal rather than reference it.
+        twin = HistoricalUserNotification.objects.create(
+            user_id=account.user_id, account_id=account.pk, title="Goal Updated", user_action="goal_update",
+            message="Your goal 'School fees' has been updated.",
+        )
+        deposit = GoalNotification.objects.create(
+            account_id=account.pk, goal_id=rent.pk, notification_type="Deposit Made", message="Deposited 100.00",
+        )
+        GoalNotification.objects.filter(pk=deposit.pk).update(date_sent=sent)
+
+        self.migrate(self.after)
+
+        folded = UserNotification.objects.filter(source_type="goal")
+        self.assertEqual(UserNotification.objects.count(), 3)
+        self.assertEqual(
+            sorted(folded.values_list("source_id", "user_action")),
+            sorted([(str(rent.pk), "goal_update"), (str(fees.pk), "goal_update"), (str(rent.pk), "goal_deposit")]),
+        )
+        self.assertEqual(folded.get(pk=twin.pk).source_id, str(fees.pk))
+        self.assertEqual(folded.get(user_action="goal_deposit").date_sent, sent)
+
+
+class BulkNotificationTests(TestCase):
+
+    def setUp(self):
+        self.account, self.other = make_member(1), make_member(2)
+        UserNotification.objects.all().delete()
+        self.notices = [
+            UserNotification.objects.create(
+                user=self.account.user, account=self.account, title=f"Notice {n}", message="", is_read=n % 2 == 0,
+            )
+            for n in range(5)
+        ]
+        self.foreign = UserNotification.objects.create(user=self.other.user, account=self.other, title="Not yours", message="")
+        self.client = APIClient()
+        self.client.force_authenticate(self.account.user)
+
+    def unread(self):
+        return UnreadCounter.for_user(self.account.user_id).unread_count
+
+    def remaining(self):
+        return set(UserNotification.objects.values_list("pk", flat=True))
+
+    def test_bulk_delete_honours_list_filters_in_windows(self):
+        with mock.patch.object(BulkNotificationMixin, "delete_chunk_size", 1):
+            response = self.client.post(
+                "/user-notifications/bulk_delete/?is_read=false", {"up_to": self.foreign.pk}, format="json"
+            )
+
+        self.assertEqual(response.data["deleted"], 2)
+        self.assertEqual(self.remaining(), {self.notices[0].pk, self.notices[2].pk, self.notices[4].pk, self.foreign.pk})
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(UnreadCounter.for_user(self.other.user_id).unread_count, 1)
+
+    def test_bulk_mark_as_read_counts_only_flipped_rows(self):
+        ids = [notice.pk for notice in self.notices[:2]] + [self.foreign.pk]
+
+        response = self.client.post("/user-notifications/bulk_mark_as_read/", {"ids": ids}, format="json")
+
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(self.unread(), 1)
+        self.assertFalse(UserNotification.objects.get(pk=self.foreign.pk).is_read)
+
+    def test_selection_needs_ids_or_up_to(self):
+        response = self.client.post(
+            "/user-notifications/bulk_delete/", {"ids": [self.notices[0].pk], "up_to": self.foreign.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.remaining()), 6)
+
+    def test_admin_cannot_mark_another_admins_notification(self):
+        notice = AdminNotification.objects.create(user=make_admin("first-admin"), title="Hi", message="")
+        self.client.force_authenticate(make_admin("second-admin"))
+
+        response = self.client.post(f"/admin-notifications/{notice.pk}/mark_as_read/")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(AdminNotification.objects.get(pk=notice.pk).is_read)
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_DELAY=60)
+class EmailOutboxTests(TestCase):
+
+    def setUp(self):
+        OutgoingEmail.objects.all().delete()
+
+    def queue(self, *recipients):
+        OutgoingEmail.queue(recipients, "Hi", "Hello")
+        self.now = timezone.now()
+
+    def dispatch(self, seconds=0, **kwargs):
+        return OutgoingEmail.dispatch_due(now=self.now + datetime.timedelta(seconds=seconds), **kwargs)
+
+    def refuse(self, recipient):
+        send_messages = EmailBackend.send_messages
+
+        def send(backend, messages):
+            if recipient in messages[0].to:
+                raise ConnectionError(f"Mailbox {recipient} unavailable")
+            return send_messages(backend, messages)
+
+        return mock.patch.object(EmailBackend, "send_messages", send)
+
+    def test_account_email_is_queued_not_sent(self):
+        account = make_member(1)
+
+        self.assertEqual(mail.outbox, [])
+        email = OutgoingEmail.objects.get(recipient=account.user.email)
+        self.assertEqual((email.status, email.subject), ("pending", "Account Created Successfully"))
+
+    def test_batch_is_sent_and_marked_together(self):
+        self.queue("a@example.com", "b@example.com", "c@example.com")
+
+        self.assertEqual(self.dispatch(batch_size=2), 2)
+        self.assertEqual(self.dispatch(batch_size=2), 1)
+        self.assertEqual(self.dispatch(batch_size=2), 0)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["a@example.com", "b@example.com", "c@example.com"])
+        self.assertEqual(set(OutgoingEmail.objects.values_list("status", "attempts")), {("sent", 1)})
+
+    def test_failed_email_backs_off_exponentially_then_fails(self):
+        self.queue("ok@example.com", "bad@example.com")
+
+        with self.refuse("bad@example.com"):
+            self.assertEqual(self.dispatch(), 2)
+            bad = OutgoingEmail.objects.get(recipient="bad@example.com")
+            self.assertEqual((bad.status, bad.attempts), ("pending", 1))
+            self.assertEqual(bad.available_at, self.now + datetime.timedelta(seconds=60))
+            self.assertIn("unavailable", bad.last_error)
+
+            self.assertEqual(self.dispatch(59), 0)
+            self.assertEqual(self.dispatch(60), 1)
+            bad.refresh_from_db()
+            self.assertEqual(bad.available_at, self.now + datetime.timedelta(seconds=60 + 120))
+
+            self.assertEqual(self.dispatch(180), 1)
+            bad.refresh_from_db()
+            self.assertEqual((bad.status, bad.attempts), ("failed", 3))
+            self.assertEqual(self.dispatch(10 ** 6), 0)
+
+        self.assertEqual(OutgoingEmail.objects.get(recipient="ok@example.com").status, "sent")
+
+    def test_connection_failure_retries_the_whole_batch(self):
+        self.queue("a@example.com", "b@example.com")
+
+        with mock.patch.object(EmailBackend, "open", side_effect=OSError("SMTP down")):
+            self.assertEqual(self.dispatch(), 2)
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(set(OutgoingEmail.objects.values_list("status", "attempts", "last_error")), {("pending", 1, "SMTP down")})
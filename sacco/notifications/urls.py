@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserNotificationViewSet, AdminNotificationViewSet
+from .views import UserNotificationViewSet, AdminNotificationViewSet, UnreadCountView, notification_stream
 
 router = DefaultRouter()
 router.register(r'user-notifications', UserNotificationViewSet, basename='user-notifications')
 router.register(r'admin-notifications', AdminNotificationViewSet, basename='admin-notifications')
 
 urlpatterns = [
+    path('notifications/stream/', notification_stream, name='notifications-stream'),
+    path('notifications/unread_count/', UnreadCountView.as_view(), name='notifications-unread-count'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,12 +1,66 @@
-from rest_framework import viewsets, permissions, filters
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import viewsets, permissions, filters, exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.views import APIView
+from rest_framework import status
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Notification, UserNotification, AdminNotification
-from .serializers import UserNotificationSerializer, AdminNotificationSerializer
+from .models import Notification, UserNotification, AdminNotification, UnreadCounter
+from .serializers import UserNotificationSerializer, AdminNotificationSerializer, NotificationSelectionSerializer
 from .filters import UserNotificationFilter, AdminNotificationFilter
+from . import push
 
-class UserNotificationViewSet(viewsets.ModelViewSet):
+class BulkNotificationMixin:
+    """
+    bulk_mark_as_read and bulk_delete actions. The body selects notifications by 'ids' or
+    'up_to'; the list's query parameters narrow the selection further. Each action is applied
+    with one UPDATE scoped to the requesting user, or with DELETEs of at most delete_chunk_size rows.
+    """
+    delete_chunk_size = 1000
+
+    def selected(self, request):
+        selection = NotificationSelectionSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+        return selection.filter(self.filter_queryset(self.get_queryset())).order_by()
+
+    def mark_selected_as_read(self, queryset):
+        return queryset.filter(is_read=False).update(is_read=True)
+
+    def delete_selected(self, queryset):
+        # Ids are fetched first and deleted one window at a time, which bounds each DELETE and
+        # keeps it off a self-referencing subquery, which MySQL rejects.
+        ids = list(queryset.values_list('pk', flat=True))
+        deleted = 0
+        for start in range(0, len(ids), self.delete_chunk_size):
+            deleted += self.delete_window(queryset.model.objects.filter(pk__in=ids[start:start + self.delete_chunk_size]))
+        return deleted
+
+    def delete_window(self, window):
+        return window.delete()[0]
+
+    @action(detail=False, methods=['post'])
+    def bulk_mark_as_read(self, request):
+        """
+        Mark the selected notifications as read.
+        """
+        updated = self.mark_selected_as_read(self.selected(request))
+        return Response({'status': 'notifications marked as read', 'updated': updated})
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """
+        Delete the selected notifications.
+        """
+        deleted = self.delete_selected(self.selected(request))
+        return Response({'status': 'notifications deleted', 'deleted': deleted})
+
+class UserNotificationViewSet(BulkNotificationMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing user-specific notifications.
     """
@@ -34,6 +88,7 @@ class UserNotificationViewSet(viewsets.ModelViewSet):
         """
         user = request.user
         UserNotification.objects.filter(user=user, is_read=False).update(is_read=True)
+        UnreadCounter.reset(user.pk)
         return Response({'status': 'all notifications marked as read'})
 
     @action(detail=True, methods=['post'])
@@ -42,16 +97,89 @@ class UserNotificationViewSet(viewsets.ModelViewSet):
         Custom action to mark a specific notification as read.
         """
         user = request.user
-        try:
-            notification = UserNotification.objects.get(pk=pk, user=user)
-        except UserNotification.DoesNotExist:
+        if not UserNotification.objects.filter(pk=pk, user=user).exists():
             return Response({'status': 'notification not found'}, status=404)
 
-        notification.is_read = True
-        notification.save()
+        # Only the request that flips the flag moves the counter.
+        if UserNotification.objects.filter(pk=pk, user=user, is_read=False).update(is_read=True):
+            UnreadCounter.decrement(user.pk)
         return Response({'status': 'notification marked as read'})
 
-class AdminNotificationViewSet(viewsets.ModelViewSet):
+    def mark_selected_as_read(self, queryset):
+        updated = super().mark_selected_as_read(queryset)
+        UnreadCounter.decrement(self.request.user.pk, updated)
+        return updated
+
+    def delete_window(self, window):
+        # Flipping the unread rows first counts them for the badge in one UPDATE, so the
+        # post_delete signal finds only read rows and leaves the counter alone.
+        with transaction.atomic():
+            unread = window.filter(is_read=False).update(is_read=True)
+            deleted = super().delete_window(window)
+        UnreadCounter.decrement(self.request.user.pk, unread)
+        return deleted
+
+class UnreadCountView(APIView):
+    """
+    Unread notification count for the badge. Answers 304 when If-None-Match matches the ETag.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        counter = UnreadCounter.for_user(request.user.pk)
+        if request.headers.get('If-None-Match') == counter.etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({'unread_count': counter.unread_count})
+        response['ETag'] = counter.etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+def _stream_user(request):
+    """
+    Authenticate a stream request with the API's authentication classes. EventSource cannot
+    set headers, so a JWT may also be passed as ?access_token=.
+    """
+    token = request.GET.get('access_token')
+    if token and 'HTTP_AUTHORIZATION' not in request.META:
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    api_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = api_request.user
+    except exceptions.APIException:
+        return None
+    return user if user and user.is_authenticated else None
+
+async def notification_stream(request):
+    """
+    Server-sent events for the authenticated user: new notifications ("notification") and
+    deposit status changes ("deposit.status"). Only served by the ASGI application in
+    sacco/asgi.py; under WSGI every open stream would hold a worker, so WSGI requests get a 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The notification stream is only available over ASGI.'}, status=501)
+
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    subscription = push.get_broker().subscribe(push.user_channel(user.pk))
+
+    async def events():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = await subscription.get(timeout=settings.NOTIFICATION_PUSH_HEARTBEAT)
+                yield ': keepalive\n\n' if event is None else push.format_sse(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+class AdminNotificationViewSet(BulkNotificationMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing admin-specific notifications.
     """
@@ -87,7 +215,8 @@ class AdminNotificationViewSet(viewsets.ModelViewSet):
         Custom action to mark a specific notification as read.
         """
         user = request.user
-        notification = AdminNotification.objects.get(pk=pk)
-        notification.is_read = True
-        notification.save()
-        return Response({'status': 'notification marked as read'})
\ No newline at end of file
+        if not AdminNotification.objects.filter(pk=pk, user=user).exists():
+            return Response({'status': 'notification not found'}, status=404)
+
+        AdminNotification.objects.filter(pk=pk, user=user, is_read=False).update(is_read=True)
+        return Response({'status': 'notification marked as read'})
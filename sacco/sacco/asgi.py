@@ -2,6 +2,8 @@
 ASGI config for sacco project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it (e.g. ``uvicorn sacco.asgi:application``) to hold /notifications/stream/
+server-sent event connections without tying up a worker each.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -71,6 +71,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "allauth.account.middleware.AccountMiddleware",
+    'notifications.middleware.NotificationOutboxMiddleware',
 ]
 
 ROOT_URLCONF = 'sacco.urls'
@@ -155,6 +156,28 @@ SITE_DOMAIN = config('SITE_DOMAIN', default="admin.com")
 # Default admin password
 ADMIN_PASSWORD = config('ADMIN_PASSWORD', default='user@12345')
 
+# Days a read notification is kept, by action; 'default' covers every other action
+NOTIFICATION_RETENTION_DAYS = {
+    'default': 180,
+    'goal_update': 14,
+    'saving_reminder': 30,
+    'investment_update': 60,
+    'user_investment_update': 60,
+    'dividend_update': 60,
+    'loan_update': 90,
+}
+ADMIN_NOTIFICATION_RETENTION_DAYS = {
+    'default': 180,
+}
+
+# Server-sent events push channel (/notifications/stream/)
+NOTIFICATION_PUSH_BROKER = config('NOTIFICATION_PUSH_BROKER', default='notifications.push.LocalBroker')
+NOTIFICATION_PUSH_HEARTBEAT = config('NOTIFICATION_PUSH_HEARTBEAT', default=15, cast=int)  # Seconds between keepalives
+
+# Annual interest rates (%) accrued daily on savings goals and account balances
+GOAL_INTEREST_RATE = config('GOAL_INTEREST_RATE', default='0')
+ACCOUNT_INTEREST_RATE = config('ACCOUNT_INTEREST_RATE', default='0')
+
 # Django Allauth settings
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
@@ -207,6 +230,10 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 ACCOUNT_EMAIL_SUBJECT_PREFIX = 'Tovu Sacco'
 
+# Email outbox (sent by the send_emails command)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)  # Seconds before the first retry; doubles per attempt
+
 # Mpesa credentials
 MPESA_CONSUMER_KEY = config('MPESA_CONSUMER_KEY')
 MPESA_CONSUMER_SECRET = config('MPESA_CONSUMER_SECRET')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Goal, Deposit, SavingMilestone, SavingReminder, TransactionHistory, GoalNotification
+from .models import Goal, Deposit, SavingMilestone, SavingReminder, TransactionHistory, InterestRun, InterestAccrual
 
 
 @admin.register(Goal)
@@ -51,9 +51,16 @@ class TransactionHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ('reference_number', 'date')
 
 
-@admin.register(GoalNotification)
-class GoalNotificationAdmin(admin.ModelAdmin):
-    list_display = ('account', 'goal', 'notification_type', 'message', 'date_sent', 'is_read')
-    search_fields = ('goal__name', 'account__user__username', 'notification_type')
-    list_filter = ('is_read', 'date_sent')
-    list_editable = ('is_read',)
+@admin.register(InterestRun)
+class InterestRunAdmin(admin.ModelAdmin):
+    list_display = ('run_date', 'run_type', 'goal_rate', 'account_rate', 'entry_count', 'total_amount', 'created_at')
+    list_filter = ('run_type', 'run_date')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(InterestAccrual)
+class InterestAccrualAdmin(admin.ModelAdmin):
+    list_display = ('run', 'goal', 'account', 'balance', 'amount', 'capitalisation')
+    search_fields = ('goal__name', 'account__account_number')
+    list_filter = ('run__run_type', 'run__run_date')
+    raw_id_fields = ('run', 'goal', 'account', 'capitalisation')
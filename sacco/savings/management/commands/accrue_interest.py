@@ -0,0 +1,36 @@
+import logging
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from savings.models import InterestRun
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Accrue a day's interest on goals and account balances, capitalising on the first of the month. Safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, default=None, help="Accrual date (YYYY-MM-DD), defaults to today.")
+        parser.add_argument("--capitalise", action="store_true", help="Capitalise pending accruals even if it is not the first of the month.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows read and written per batch.")
+
+    def handle(self, *args, **options):
+        run_date = options["date"] or timezone.now().date()
+        chunk_size = options["chunk_size"]
+
+        # Capitalise last month's accruals before accruing today, so today's interest lands in the new month.
+        if options["capitalise"] or run_date.day == 1:
+            run = InterestRun.capitalise(run_date, chunk_size=chunk_size)
+            if run is None:
+                self.stdout.write(f"Interest for {run_date} was already capitalised.")
+            else:
+                logger.info(f"Capitalised {run.total_amount} across {run.entry_count} balance(s) on {run_date}.")
+                self.stdout.write(f"Capitalised {run.total_amount} across {run.entry_count} balance(s).")
+
+        run = InterestRun.accrue(run_date, chunk_size=chunk_size)
+        if run is None:
+            self.stdout.write(f"Interest for {run_date} was already accrued.")
+        else:
+            logger.info(f"Accrued {run.total_amount} interest on {run.entry_count} balance(s) for {run_date}.")
+            self.stdout.write(f"Accrued {run.total_amount} interest on {run.entry_count} balance(s).")
@@ -0,0 +1,19 @@
+import logging
+from datetime import date
+from django.core.management.base import BaseCommand
+from savings.models import Goal
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run due standing orders, moving each goal's auto-save amount from its account in batched chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Goals processed per transaction.")
+        parser.add_argument("--date", type=date.fromisoformat, default=None, help="Run date (YYYY-MM-DD), defaults to today.")
+
+    def handle(self, *args, **options):
+        stats = Goal.run_standing_orders(run_date=options["date"], chunk_size=options["chunk_size"])
+        logger.info(f"Standing orders run: {stats['completed']} completed, {stats['failed']} failed.")
+        self.stdout.write(f"Standing orders: {stats['completed']} completed, {stats['failed']} failed.")
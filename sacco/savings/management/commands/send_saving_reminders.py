@@ -0,0 +1,34 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from savings.models import SavingReminder
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send due saving reminders in bounded batches and schedule the next recurring ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Reminders sent per transaction.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling for due reminders instead of exiting.")
+        parser.add_argument("--interval", type=int, default=60, help="Seconds to sleep between polls when --loop is set.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        while True:
+            total = 0
+            while True:
+                sent = SavingReminder.dispatch_due(batch_size=batch_size)
+                total += sent
+                if sent < batch_size:
+                    break
+
+            if total:
+                logger.info(f"Sent {total} saving reminder(s).")
+            self.stdout.write(f"Sent {total} saving reminder(s).")
+
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
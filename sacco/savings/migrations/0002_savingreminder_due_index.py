@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('savings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='savingreminder',
+            name='reminder_date',
+            field=models.DateTimeField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='savingreminder',
+            index=models.Index(fields=['is_sent', 'reminder_date'], name='savings_sav_is_sent_1ddcc0_idx'),
+        ),
+    ]
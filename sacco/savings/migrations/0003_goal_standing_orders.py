@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('savings', '0002_savingreminder_due_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='auto_save_amount',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='next_run',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_account_kyc'),
+        ('savings', '0003_goal_standing_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_date', models.DateField()),
+                ('run_type', models.CharField(choices=[('accrual', 'Daily Accrual'), ('capitalisation', 'Monthly Capitalisation')], max_length=20)),
+                ('goal_rate', models.DecimalField(decimal_places=2, default=0.0, max_digits=5)),
+                ('account_rate', models.DecimalField(decimal_places=2, default=0.0, max_digits=5)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=4, default=0, max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-run_date'],
+                'unique_together': {('run_date', 'run_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InterestAccrual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('amount', models.DecimalField(decimal_places=4, max_digits=15)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='interest_accruals', to='accounts.account')),
+                ('goal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='interest_accruals', to='savings.goal')),
+                ('capitalisation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='capitalised_accruals', to='savings.interestrun')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accruals', to='savings.interestrun')),
+            ],
+        ),
+    ]
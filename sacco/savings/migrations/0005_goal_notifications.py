@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_goal_notifications'),
+        ('savings', '0004_interestrun_interestaccrual'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='GoalNotification',
+        ),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Case, When, Value, ExpressionWrapper
+from django.db.models.functions import Round
 from django.utils import timezone
 from accounts.models import Account
+import calendar
 from datetime import timedelta
-from decimal import Decimal
+from decimal import Decimal, ROUND_DOWN
+from django.conf import settings
 
 class Goal(models.Model):
     SAVING_FREQUENCY_CHOICES = [
@@ -23,6 +27,8 @@ class Goal(models.Model):
     saving_frequency = models.CharField(max_length=8, choices=SAVING_FREQUENCY_CHOICES, default='MONTHLY')
     progress_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     is_active = models.BooleanField(default=True)  # To track if goal is active
+    auto_save_amount = models.PositiveIntegerField(default=0)  # Standing order moved from the account each period; 0 disables it
+    next_run = models.DateField(null=True, blank=True, db_index=True)  # Next standing order date, null when there is none
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -35,50 +41,319 @@ class Goal(models.Model):
             self.save()
 
     def update_amount(self, deposit_amount):
-        self.current_amount += deposit_amount
-        self.calculate_progress()
-        self.save()
+        """
+        Post an amount to the goal with set-based UPDATEs instead of saves:
+        one for current_amount/progress_percentage, then the lifecycle transitions
+        for the posting. Returns the list of lifecycle events.
+        """
+        deposit_amount = Decimal(str(deposit_amount))
+        new_amount = F("current_amount") + deposit_amount
 
-    def generate_milestones(self):
-        """Auto-create milestones based on target amount and frequency."""
-        from .models import SavingMilestone  # Avoid circular import
+        with transaction.atomic():
+            # progress_percentage is assigned first: MySQL evaluates SET clauses left to right,
+            # so it must read current_amount before the increment below is applied.
+            Goal.objects.filter(pk=self.pk).update(
+                progress_percentage=Case(
+                    When(target_amount__gt=0, then=ExpressionWrapper(
+                        new_amount * 100 / F("target_amount"),
+                        output_field=models.DecimalField(max_digits=5, decimal_places=2),
+                    )),
+                    default=F("progress_percentage"),
+                ),
+                current_amount=new_amount,
+            )
+            self.refresh_from_db(fields=["current_amount", "progress_percentage", "is_active"])
+            events = self.apply_transitions()
+
+        return events
+
+    def apply_transitions(self):
+        """
+        Goal state transitions for one posting, run after current_amount has been updated.
+        Crossed milestones are flipped in one UPDATE and a goal that reaches its target is
+        deactivated with a conditional UPDATE, so completion fires exactly once. The goal is
+        never re-saved; the notifications for every event are inserted in one bulk_create.
+        Returns a list of (event, detail) tuples.
+        """
+        from notifications.models import UserNotification  # Avoid circular import
+
+        # Own transaction: achieve_milestones locks rows, and goal edits call this from a bare post_save.
+        with transaction.atomic():
+            events = [("milestone", amount) for amount in self.achieve_milestones()]
+
+            if self.is_active and self.target_amount > 0 and self.current_amount >= self.target_amount:
+                if Goal.objects.filter(pk=self.pk, is_active=True).update(is_active=False):
+                    self.is_active = False
+                    events.append(("completed", self.current_amount))
+
+            if not events:
+                return events
+
+            user_id = self.account.user_id
+            source = UserNotification.source_of(self)
+            notifications = []
+            for event, detail in events:
+                if event == "milestone":
+                    notifications.append(UserNotification(
+                        user_id=user_id,
+                        account_id=self.account_id,
+                        title="Milestone Achieved",
+                        message=f"Congratulations! You have achieved the milestone of {detail} for your goal '{self.name}'.",
+                        notification_type="success",
+                        user_action="milestone_achieved",
+                        payload={"event": "Milestone Reached", "amount": str(detail)},
+                        **source,
+                    ))
+                elif event == "completed":
+                    notifications.append(UserNotification(
+                        user_id=user_id,
+                        account_id=self.account_id,
+                        title="Goal Completed",
+                        message=f"Congratulations! You have completed your goal '{self.name}' with a total deposit of {detail}.",
+                        notification_type="success",
+                        user_action="goal_completed",
+                        payload={"event": "Goal Completed", "amount": str(detail)},
+                        **source,
+                    ))
 
-        # Clear existing milestones (if goal is updated)
-        self.milestones.all().delete()
+            UserNotification.objects.bulk_create(notifications)
+            return events
 
-        start_date = timezone.now().date()
+    def achieve_milestones(self):
+        """
+        Mark every unachieved milestone at or below the current amount as achieved in one UPDATE.
+        Returns the achieved milestone amounts.
+        """
+        crossed = SavingMilestone.objects.filter(goal=self, achieved=False, milestone_amount__lte=self.current_amount)
+        amounts = list(crossed.select_for_update().values_list("milestone_amount", flat=True))
+        if amounts:
+            crossed.update(achieved=True)
+        return amounts
+
+    # Schedule parameters; changing any of them regenerates the stored checkpoints.
+    SCHEDULE_FIELDS = ("target_amount", "deadline", "saving_frequency")
+    # Standing order parameters; changing one re-arms a standing order that has no next run.
+    STANDING_ORDER_FIELDS = ("auto_save_amount", "saving_frequency")
+    # Period lengths shared by the milestone schedule, saving reminders and standing orders
+    FREQUENCY_INTERVAL_DAYS = {"DAILY": 1, "WEEKLY": 7, "MONTHLY": 30}
+    # Only this many milestones are stored per goal; the full schedule is derived on read.
+    MAX_STORED_MILESTONES = 12
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def fields_changed(self, fields):
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return False
+        return any(field in loaded and loaded[field] != getattr(self, field) for field in fields)
+
+    def schedule_changed(self):
+        return self.fields_changed(self.SCHEDULE_FIELDS)
+
+    @property
+    def schedule_start_date(self):
+        return self.created_at.date() if self.created_at else timezone.now().date()
+
+    def _schedule_shape(self):
+        """Return (start_date, interval_days, num_intervals) or None if the goal has no valid schedule."""
+        start_date = self.schedule_start_date
         total_days = (self.deadline - start_date).days
 
         if total_days <= 0 or self.target_amount <= 0:
-            return  # Avoid invalid milestone generation
-
-        # Determine milestone intervals
-        if self.saving_frequency == "DAILY":
-            interval_days = 1
-        elif self.saving_frequency == "WEEKLY":
-            interval_days = 7
-        elif self.saving_frequency == "MONTHLY":
-            interval_days = 30
-        else:
-            interval_days = total_days  # 'ONCE' case
-
-        num_intervals = total_days // interval_days
-        milestone_amount_step = self.target_amount / Decimal(num_intervals) if num_intervals > 0 else self.target_amount
-
-        milestones = []
-        for i in range(1, num_intervals + 1):
-            milestone_date = start_date + timedelta(days=i * interval_days)
-            milestone_amount = milestone_amount_step * i
-            milestones.append(SavingMilestone(goal=self, milestone_amount=milestone_amount, milestone_date=milestone_date))
-
-        # Bulk create milestones
-        SavingMilestone.objects.bulk_create(milestones)
+            return None
+
+        interval_days = self.FREQUENCY_INTERVAL_DAYS.get(self.saving_frequency, total_days)  # 'ONCE' case
+        num_intervals = max(total_days // interval_days, 1)
+        return start_date, interval_days, num_intervals
+
+    def _schedule_points(self, start_date, interval_days, num_intervals, indices):
+        """
+        Dates and cumulative amounts for the given 1-based schedule positions.
+        Amounts are computed in whole cents so the last point is exactly the target.
+        """
+        target_cents = int(self.target_amount * 100)
+        return [
+            (start_date + timedelta(days=i * interval_days), Decimal(target_cents * i // num_intervals).scaleb(-2))
+            for i in indices
+        ]
+
+    def milestone_schedule(self):
+        """Full saving schedule derived from the goal's parameters. Nothing is written to the database."""
+        shape = self._schedule_shape()
+        if shape is None:
+            return []
+        start_date, interval_days, num_intervals = shape
+        return self._schedule_points(start_date, interval_days, num_intervals, range(1, num_intervals + 1))
+
+    def milestone_checkpoints(self):
+        """Evenly spaced subset of the schedule, always ending on the target, that gets stored as milestones."""
+        shape = self._schedule_shape()
+        if shape is None:
+            return []
+        start_date, interval_days, num_intervals = shape
+        count = min(num_intervals, self.MAX_STORED_MILESTONES)
+        indices = sorted({-(-k * num_intervals // count) for k in range(1, count + 1)})
+        return self._schedule_points(start_date, interval_days, num_intervals, indices)
+
+    @classmethod
+    def bulk_generate_milestones(cls, goals):
+        """
+        Replace the stored milestones of many goals with one DELETE and one bulk INSERT.
+        Checkpoints already covered by the goal's current amount are stored as achieved.
+        """
+        goals = list(goals)
+        if not goals:
+            return []
+
+        SavingMilestone.objects.filter(goal__in=goals).delete()
+        milestones = [
+            SavingMilestone(
+                goal=goal,
+                milestone_amount=amount,
+                milestone_date=milestone_date,
+                achieved=amount <= goal.current_amount,
+            )
+            for goal in goals
+            for milestone_date, amount in goal.milestone_checkpoints()
+        ]
+        return SavingMilestone.objects.bulk_create(milestones)
+
+    def generate_milestones(self):
+        """Auto-create milestone checkpoints based on target amount and frequency."""
+        return Goal.bulk_generate_milestones([self])
+
+    def next_standing_order_date(self, after, not_before=None):
+        """
+        Date of the standing order after `after`, or None once the schedule is exhausted.
+        Periods on or before `not_before` are skipped, so a goal that fell behind is not
+        charged for the runs it missed.
+        """
+        interval_days = self.FREQUENCY_INTERVAL_DAYS.get(self.saving_frequency)
+        if interval_days is None:
+            return None  # 'ONCE' goals get a single contribution
+        next_date = after + timedelta(days=interval_days)
+        if not_before is not None and next_date <= not_before:
+            missed = (not_before - next_date).days // interval_days + 1
+            next_date += timedelta(days=missed * interval_days)
+        return next_date if next_date <= self.deadline else None
+
+    @classmethod
+    def run_standing_orders(cls, run_date=None, chunk_size=500):
+        """
+        Move auto_save_amount from each due goal's account into the goal.
+        Due goals are picked through the next_run index in chunks; each chunk is one
+        transaction with a single UPDATE per side (accounts debited, goals credited and
+        rescheduled) and one bulk INSERT of SavingTransaction rows. Goals whose account
+        can't cover the contribution get a failed transaction and are rescheduled.
+        Returns a dict with completed and failed counts.
+        """
+        from transactions.models import SavingTransaction  # Avoid circular import
+
+        run_date = run_date or timezone.now().date()
+        stats = {"completed": 0, "failed": 0}
+
+        while True:
+            with transaction.atomic():
+                goals = list(
+                    cls.objects.select_for_update(skip_locked=True, of=("self",))
+                    .select_related("account")
+                    .filter(next_run__lte=run_date, is_active=True, auto_save_amount__gt=0)
+                    .order_by("next_run", "pk")[:chunk_size]
+                )
+                if not goals:
+                    return stats
+
+                balances = dict(
+                    Account.objects.select_for_update()
+                    .filter(pk__in={goal.account_id for goal in goals})
+                    .values_list("pk", "account_balance")
+                )
+
+                debits = {}
+                credited = []
+                saving_transactions = []
+                for goal in goals:
+                    amount = goal.auto_save_amount
+                    funded = balances[goal.account_id] >= amount
+                    if funded:
+                        balances[goal.account_id] -= amount
+                        debits[goal.account_id] = debits.get(goal.account_id, 0) + amount
+                        credited.append(goal)
+                    saving_transactions.append(SavingTransaction(
+                        user_id=goal.account.user_id,
+                        goal=goal,
+                        amount=amount,
+                        description="Standing order",
+                        status="completed" if funded else "failed",
+                        transaction_type="saving",
+                        payment_method="in-house",
+                        is_processed=funded,
+                    ))
+                    stats["completed" if funded else "failed"] += 1
+
+                if debits:
+                    Account.objects.filter(pk__in=debits).update(account_balance=Case(
+                        *[When(pk=account_id, then=F("account_balance") - amount) for account_id, amount in debits.items()],
+                        default=F("account_balance"),
+                        output_field=models.PositiveIntegerField(),
+                    ))
+
+                credits = {goal.pk: goal.auto_save_amount for goal in credited}
+                credit = Case(
+                    *[When(pk=goal_id, then=Value(Decimal(amount).quantize(Decimal("0.01")))) for goal_id, amount in credits.items()],
+                    default=Value(Decimal("0.00")),
+                    output_field=models.DecimalField(max_digits=12, decimal_places=2),
+                )
+                # One charge per run: the next run moves past run_date however far behind the goal was.
+                next_runs = {goal.pk: goal.next_standing_order_date(goal.next_run, run_date) for goal in goals}
+                # progress_percentage is assigned first so MySQL reads current_amount before the increment.
+                cls.objects.filter(pk__in=next_runs).update(
+                    progress_percentage=Case(
+                        When(target_amount__gt=0, then=ExpressionWrapper(
+                            (F("current_amount") + credit) * 100 / F("target_amount"),
+                            output_field=models.DecimalField(max_digits=5, decimal_places=2),
+                        )),
+                        default=F("progress_percentage"),
+                    ),
+                    current_amount=F("current_amount") + credit,
+                    next_run=Case(
+                        *[When(pk=goal_id, then=Value(next_run)) for goal_id, next_run in next_runs.items()],
+                        output_field=models.DateField(),
+                    ),
+                )
+                SavingTransaction.objects.bulk_create(saving_transactions)
+
+                # Milestone and completion transitions only for the few goals that crossed something.
+                crossed = set(
+                    SavingMilestone.objects.filter(
+                        goal_id__in=credits, achieved=False, milestone_amount__lte=F("goal__current_amount")
+                    ).values_list("goal_id", flat=True)
+                )
+                crossed.update(
+                    goal.pk for goal in credited
+                    if goal.target_amount > 0 and goal.current_amount + goal.auto_save_amount >= goal.target_amount
+                )
+                for goal in cls.objects.select_related("account").filter(pk__in=crossed):
+                    goal.apply_transitions()
 
     def save(self, *args, **kwargs):
         created = self.pk is None  # Check if it's a new goal
+        today = timezone.now().date()
+        if not self.auto_save_amount:
+            self.next_run = None
+        elif self.next_run is None and (created or self.fields_changed(self.STANDING_ORDER_FIELDS)) and today <= self.deadline:
+            # First standing order goes out on the next run. Other edits leave a finished
+            # (ONCE or past its deadline) standing order finished.
+            self.next_run = today
+        regenerate = created or self.schedule_changed()
         super().save(*args, **kwargs)
-        if created:
-            self.generate_milestones()  # Auto-create milestones when a goal is first saved
+        self._loaded_values = {field: getattr(self, field) for field in self.SCHEDULE_FIELDS + self.STANDING_ORDER_FIELDS}
+        if regenerate:
+            self.generate_milestones()  # Auto-create milestones when a goal is first saved or rescheduled
 
 
 class Deposit(models.Model):
@@ -111,9 +386,14 @@ class SavingMilestone(models.Model):
 class SavingReminder(models.Model):
     goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='reminders')
     reminder_type = models.CharField(max_length=100)
-    reminder_date = models.DateTimeField()
+    reminder_date = models.DateTimeField(blank=True)
     is_sent = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_sent', 'reminder_date']),
+        ]
+
     def __str__(self):
         return f"Reminder for {self.goal.name} on {self.reminder_date}"
 
@@ -121,6 +401,64 @@ class SavingReminder(models.Model):
         self.is_sent = True
         self.save()
 
+    @classmethod
+    def next_reminder_date(cls, goal, after=None):
+        """Next reminder time for a goal, or its deadline for once-off goals."""
+        # Recurring reminders share the goal's schedule interval; 'ONCE' goals are reminded at the deadline only
+        interval_days = Goal.FREQUENCY_INTERVAL_DAYS.get(goal.saving_frequency)
+        if interval_days is None:
+            return goal.deadline
+        return (after or timezone.now()) + timedelta(days=interval_days)
+
+    @classmethod
+    def dispatch_due(cls, now=None, batch_size=500):
+        """
+        Send one batch of due reminders, using the (is_sent, reminder_date) index.
+        Notifications are bulk inserted, the batch is marked sent with one UPDATE, and
+        the next reminder is bulk created for goals that save on a recurring schedule.
+        Returns the number of reminders sent.
+        """
+        from notifications.models import UserNotification  # Avoid circular import
+
+        now = now or timezone.now()
+        with transaction.atomic():
+            due = list(
+                cls.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('goal__account')
+                .filter(is_sent=False, reminder_date__lte=now)
+                .order_by('reminder_date')[:batch_size]
+            )
+            if not due:
+                return 0
+
+            UserNotification.objects.bulk_create([
+                UserNotification(
+                    user_id=reminder.goal.account.user_id,
+                    account_id=reminder.goal.account_id,
+                    title="Saving Reminder",
+                    message=f"Reminder: {reminder.reminder_type} for your goal '{reminder.goal.name}'.",
+                    notification_type="warning",
+                    user_action="saving_reminder",
+                    payload={"event": "Saving Reminder", "reminder_type": reminder.reminder_type},
+                    **UserNotification.source_of(reminder.goal),
+                )
+                for reminder in due
+            ])
+
+            cls.objects.filter(pk__in=[reminder.pk for reminder in due]).update(is_sent=True)
+
+            next_reminders = []
+            for reminder in due:
+                goal = reminder.goal
+                if not goal.is_active or goal.saving_frequency not in Goal.FREQUENCY_INTERVAL_DAYS:
+                    continue
+                next_date = cls.next_reminder_date(goal, after=max(reminder.reminder_date, now))
+                if next_date.date() <= goal.deadline:
+                    next_reminders.append(cls(goal=goal, reminder_type=reminder.reminder_type, reminder_date=next_date))
+            cls.objects.bulk_create(next_reminders)
+
+        return len(due)
+
 
 class TransactionHistory(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='transaction_history')
@@ -134,13 +472,167 @@ class TransactionHistory(models.Model):
         return f"{self.transaction_type} of {self.amount} for {self.goal.name} on {self.date}"
 
 
-class GoalNotification(models.Model):
-    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='notifications')
-    goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='notifications')
-    notification_type = models.CharField(max_length=100)  # E.g., Progress, Milestone Reached
-    message = models.TextField()
-    date_sent = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
+class InterestRun(models.Model):
+    """
+    One accrual or capitalisation pass for a date. The (run_date, run_type) pair is unique,
+    so re-running a date is a no-op.
+    """
+    RUN_TYPES = [
+        ('accrual', 'Daily Accrual'),
+        ('capitalisation', 'Monthly Capitalisation'),
+    ]
+
+    run_date = models.DateField()
+    run_type = models.CharField(max_length=20, choices=RUN_TYPES)
+    goal_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)  # Annual % applied to goals
+    account_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)  # Annual % applied to accounts
+    entry_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=4, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('run_date', 'run_type')
+        ordering = ['-run_date']
+
+    def __str__(self):
+        return f"{self.get_run_type_display()} for {self.run_date}"
+
+    @classmethod
+    def accrue(cls, run_date=None, chunk_size=2000):
+        """
+        Accrue a day's interest on every active goal and account balance.
+        The database computes and rounds each day's interest in the balance query, and
+        the rows it returns are bulk inserted as accruals in chunks. Returns the run, or
+        None if the date was already accrued.
+        """
+        run_date = run_date or timezone.now().date()
+        goal_rate = Decimal(str(settings.GOAL_INTEREST_RATE))
+        account_rate = Decimal(str(settings.ACCOUNT_INTEREST_RATE))
+        days_in_year = Decimal(366 if calendar.isleap(run_date.year) else 365)
+
+        with transaction.atomic():
+            run, created = cls.objects.get_or_create(
+                run_date=run_date, run_type='accrual',
+                defaults={'goal_rate': goal_rate, 'account_rate': account_rate},
+            )
+            if not created:
+                return None
+
+            sources = []
+            if goal_rate > 0:
+                sources.append(('goal', 'current_amount', goal_rate, Goal.objects.filter(is_active=True, current_amount__gt=0)))
+            if account_rate > 0:
+                sources.append(('account', 'account_balance', account_rate, Account.objects.filter(is_active=True, is_suspended=False, account_balance__gt=0)))
+
+            amount_field = InterestAccrual._meta.get_field('amount')
+            for target, field, rate, holders in sources:
+                daily_rate = Value(rate / Decimal('100') / days_in_year, output_field=models.DecimalField())
+                accruals = (
+                    holders.annotate(interest=Round(
+                        ExpressionWrapper(F(field) * daily_rate, output_field=amount_field), amount_field.decimal_places,
+                    ))
+                    .filter(interest__gt=0)
+                    .values_list('pk', field, 'interest')
+                    .order_by('pk')
+                )
+                batch = []
+                for pk, balance, amount in accruals.iterator(chunk_size=chunk_size):
+                    batch.append(InterestAccrual(run=run, balance=balance, amount=amount, **{f'{target}_id': pk}))
+                    if len(batch) >= chunk_size:
+                        InterestAccrual.objects.bulk_create(batch)
+                        batch = []
+                InterestAccrual.objects.bulk_create(batch)
+
+            totals = run.accruals.aggregate(entry_count=models.Count('pk'), total_amount=models.Sum('amount'))
+            run.entry_count = totals['entry_count']
+            run.total_amount = totals['total_amount'] or 0
+            run.save(update_fields=['entry_count', 'total_amount'])
+        return run
+
+    @classmethod
+    def capitalise(cls, run_date=None, chunk_size=2000):
+        """
+        Credit all accruals dated before run_date to their goals and accounts.
+        Accruals are summed per holder with one grouped aggregate, balances are credited with
+        one CASE UPDATE per chunk, and the accruals are marked with one UPDATE. Goals are
+        credited to the cent and accounts to whole units; the fraction left over is carried
+        forward as a new accrual. Returns the run, or None if the date was already capitalised.
+        """
+        run_date = run_date or timezone.now().date()
+
+        with transaction.atomic():
+            run, created = cls.objects.get_or_create(run_date=run_date, run_type='capitalisation')
+            if not created:
+                return None
+
+            # Filtered by condition rather than an id list. The runs are looked up first so the
+            # filter needs no join (MySQL cannot UPDATE a joined self-select in one statement), and
+            # the pk bound keeps accruals written while this runs out of the totals and the UPDATE.
+            earlier_runs = cls.objects.filter(run_date__lt=run_date).values('pk')
+            pending = InterestAccrual.objects.filter(capitalisation__isnull=True, run__in=earlier_runs)
+            last_pk = pending.aggregate(last_pk=models.Max('pk'))['last_pk']
+            if last_pk is None:
+                return run
+            pending = pending.filter(pk__lte=last_pk)
+
+            for target, model, places in (('goal', Goal, Decimal('0.01')), ('account', Account, Decimal('1'))):
+                field = 'current_amount' if model is Goal else 'account_balance'
+                totals = (
+                    pending.filter(**{f'{target}__isnull': False})
+                    .values_list(f'{target}_id')
+                    .annotate(total=models.Sum('amount'))
+                    .order_by()
+                )
+                credits, carries = {}, []
+                for pk, total in totals:
+                    credit = total.quantize(places, rounding=ROUND_DOWN)
+                    if credit > 0:
+                        credits[pk] = credit
+                    if total - credit > 0:
+                        carries.append(InterestAccrual(run=run, balance=0, amount=total - credit, **{f'{target}_id': pk}))
+
+                holders = list(credits.items())
+                for start in range(0, len(holders), chunk_size):
+                    chunk = dict(holders[start:start + chunk_size])
+                    credit = Case(
+                        *[When(pk=pk, then=Value(amount)) for pk, amount in chunk.items()],
+                        default=Value(Decimal('0')),
+                        output_field=model._meta.get_field(field),
+                    )
+                    updates = {field: F(field) + credit}
+                    if model is Goal:
+                        # Assigned before current_amount so MySQL computes it from the pre-credit balance.
+                        updates = {
+                            'progress_percentage': Case(
+                                When(target_amount__gt=0, then=ExpressionWrapper(
+                                    (F('current_amount') + credit) * 100 / F('target_amount'),
+                                    output_field=models.DecimalField(max_digits=5, decimal_places=2),
+                                )),
+                                default=F('progress_percentage'),
+                            ),
+                            **updates,
+                        }
+                    model.objects.filter(pk__in=chunk).update(**updates)
+
+                InterestAccrual.objects.bulk_create(carries)
+                run.entry_count += len(credits)
+                run.total_amount += sum(credits.values(), Decimal('0'))
+
+            pending.update(capitalisation=run)
+            run.save(update_fields=['entry_count', 'total_amount'])
+        return run
+
+
+class InterestAccrual(models.Model):
+    """
+    A day's interest on one goal or account balance, held until it is capitalised.
+    """
+    run = models.ForeignKey(InterestRun, on_delete=models.CASCADE, related_name='accruals')
+    goal = models.ForeignKey(Goal, on_delete=models.CASCADE, null=True, blank=True, related_name='interest_accruals')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, null=True, blank=True, related_name='interest_accruals')
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    amount = models.DecimalField(max_digits=15, decimal_places=4)
+    capitalisation = models.ForeignKey(InterestRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='capitalised_accruals')
 
     def __str__(self):
-        return f"Notification for {self.goal.name} - {self.notification_type}"
+        return f"Interest of {self.amount} on {self.goal or self.account}"
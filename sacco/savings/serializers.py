@@ -1,6 +1,7 @@
 from django.utils import timezone  # Correct import for timezone.now()
 from rest_framework import serializers
-from .models import Goal, Deposit, SavingMilestone, SavingReminder, TransactionHistory, GoalNotification
+from .models import Goal, Deposit, SavingMilestone, SavingReminder, TransactionHistory
+from notifications.models import UserNotification
 
 
 # Serializer for the Goal model
@@ -10,6 +11,7 @@ class GoalSerializer(serializers.ModelSerializer):
     class Meta:
         model = Goal
         fields = '__all__'
+        read_only_fields = ['next_run']  # Scheduled by the standing order engine
 
     def validate_target_amount(self, value):
         if value <= 0:
@@ -62,11 +64,21 @@ class TransactionHistorySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-# Serializer for the GoalNotification model
+# Goal notifications live in UserNotification; this keeps the fields of the old GoalNotification model
 class GoalNotificationSerializer(serializers.ModelSerializer):
+    goal = serializers.SerializerMethodField()
+    notification_type = serializers.SerializerMethodField()
+
     class Meta:
-        model = GoalNotification
-        fields = '__all__'
+        model = UserNotification
+        fields = ['id', 'account', 'goal', 'notification_type', 'message', 'date_sent', 'is_read']
+        read_only_fields = ['id', 'account', 'goal', 'notification_type', 'message', 'date_sent']
+
+    def get_goal(self, obj):
+        return int(obj.source_id)
+
+    def get_notification_type(self, obj):
+        return (obj.payload or {}).get('event', obj.title)
 
 
 # Serializer to track the goal progress (especially for updates)
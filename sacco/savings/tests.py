@@ -1,3 +1,380 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import Account
+from accounts.testing import make_member, make_admin
+from notifications.models import UserNotification
+from transactions.models import SavingTransaction
+from .models import Goal, Deposit, SavingMilestone, SavingReminder, InterestRun, InterestAccrual
 
-# Create your tests here.
+
+def make_goal(account, days=60, **fields):
+    values = {
+        "name": "School fees", "target_amount": Decimal("1000.00"),
+        "deadline": timezone.now().date() + datetime.timedelta(days=days),
+    }
+    values.update(fields)
+    return Goal.objects.create(account=account, **values)
+
+
+def milestones(goal):
+    return list(SavingMilestone.objects.filter(goal=goal).order_by("milestone_date").values_list(
+        "milestone_date", "milestone_amount", "achieved"
+    ))
+
+
+class MilestoneScheduleTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1)
+        self.today = timezone.now().date()
+
+    def test_long_daily_goal_stores_only_checkpoints(self):
+        goal = make_goal(self.account, days=365, saving_frequency="DAILY", target_amount=Decimal("3650.00"))
+
+        stored = milestones(goal)
+        self.assertEqual(len(stored), Goal.MAX_STORED_MILESTONES)
+        self.assertEqual(stored[-1][:2], (goal.deadline, Decimal("3650.00")))
+        self.assertEqual(len(goal.milestone_schedule()), 365)
+
+    def test_schedule_amounts_end_exactly_on_target(self):
+        goal = make_goal(self.account, days=21, saving_frequency="WEEKLY")
+
+        week = datetime.timedelta(days=7)
+        expected = [
+            (self.today + week, Decimal("333.33")),
+            (self.today + 2 * week, Decimal("666.66")),
+            (self.today + 3 * week, Decimal("1000.00")),
+        ]
+        self.assertEqual(goal.milestone_schedule(), expected)
+        self.assertEqual([row[:2] for row in milestones(goal)], expected)
+
+    def test_checkpoints_already_covered_are_achieved(self):
+        goal = make_goal(self.account, days=28, saving_frequency="WEEKLY", current_amount=Decimal("500.00"))
+
+        self.assertEqual([row[2] for row in milestones(goal)], [True, True, False, False])
+
+    def test_rescheduling_regenerates_checkpoints(self):
+        goal = make_goal(self.account, days=21, saving_frequency="WEEKLY")
+        goal.target_amount = Decimal("300.00")
+        goal.save()
+
+        self.assertEqual([row[1] for row in milestones(goal)], [Decimal("100.00"), Decimal("200.00"), Decimal("300.00")])
+
+    def test_other_edits_keep_stored_checkpoints(self):
+        goal = make_goal(self.account, days=21, saving_frequency="WEEKLY")
+        before = set(SavingMilestone.objects.filter(goal=goal).values_list("pk", flat=True))
+
+        goal = Goal.objects.get(pk=goal.pk)
+        goal.name = "Renamed"
+        goal.save()
+
+        self.assertEqual(set(SavingMilestone.objects.filter(goal=goal).values_list("pk", flat=True)), before)
+
+    def test_schedule_endpoint_pages_the_derived_schedule(self):
+        goal = make_goal(self.account, days=365, saving_frequency="DAILY", target_amount=Decimal("3650.00"))
+        client = APIClient()
+        client.force_authenticate(make_admin("savings-admin"))
+
+        response = client.get(f"/api/goals/{goal.pk}/schedule/", {"page": 37})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 365)
+        self.assertEqual(response.data["results"][-1]["milestone_amount"], Decimal("3650.00"))
+
+
+class GoalDepositTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1)
+        # Checkpoints at 250, 500, 750 and 1000
+        self.goal = make_goal(self.account, days=28, saving_frequency="WEEKLY")
+
+    def milestone_notices(self):
+        return UserNotification.objects.filter(
+            user_action="milestone_achieved", **UserNotification.source_of(self.goal)
+        ).count()
+
+    def test_deposit_posts_amount_progress_and_milestones(self):
+        Deposit.objects.create(goal=self.goal, amount=Decimal("600.00"))
+
+        self.goal.refresh_from_db()
+        self.assertEqual((self.goal.current_amount, self.goal.progress_percentage), (Decimal("600.00"), Decimal("60.00")))
+        self.assertEqual([row[2] for row in milestones(self.goal)], [True, True, False, False])
+        self.assertEqual(self.milestone_notices(), 2)
+
+    def test_later_deposit_only_reports_new_milestones(self):
+        Deposit.objects.create(goal=self.goal, amount=Decimal("300.00"))
+        Deposit.objects.create(goal=self.goal, amount=Decimal("300.00"))
+
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal("600.00"))
+        self.assertEqual(self.milestone_notices(), 2)
+
+    def test_deposit_endpoint_posts_amount_once(self):
+        user = self.account.user
+        user.user_permissions.add(Permission.objects.get(codename="add_deposit"))
+        client = APIClient()
+        client.force_authenticate(type(user).objects.get(pk=user.pk))
+
+        response = client.post(
+            f"/api/goals/{self.goal.pk}/make-deposit/", {"goal": self.goal.pk, "amount": "300.00"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal("300.00"))
+
+
+class SavingReminderDispatchTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.goal = make_goal(make_member(1), days=60, saving_frequency="WEEKLY")
+
+    def remind(self, goal=None, hours_ago=1):
+        return SavingReminder.objects.create(
+            goal=goal or self.goal, reminder_type="Weekly deposit",
+            reminder_date=self.now - datetime.timedelta(hours=hours_ago),
+        )
+
+    def test_due_reminder_is_sent_and_rescheduled(self):
+        reminder = self.remind()
+
+        self.assertEqual(SavingReminder.dispatch_due(now=self.now), 1)
+
+        reminder.refresh_from_db()
+        self.assertTrue(reminder.is_sent)
+        notice = UserNotification.objects.get(user_action="saving_reminder")
+        self.assertEqual((notice.source_type, notice.source_id), ("goal", str(self.goal.pk)))
+        pending = SavingReminder.objects.get(is_sent=False)
+        self.assertEqual(pending.reminder_date, self.now + datetime.timedelta(days=7))
+
+    def test_future_reminders_are_left_alone(self):
+        self.remind(hours_ago=-1)
+
+        self.assertEqual(SavingReminder.dispatch_due(now=self.now), 0)
+        self.assertFalse(SavingReminder.objects.filter(is_sent=True).exists())
+
+    def test_batches_are_bounded(self):
+        for hours_ago in (1, 2, 3):
+            self.remind(hours_ago=hours_ago)
+
+        self.assertEqual(SavingReminder.dispatch_due(now=self.now, batch_size=2), 2)
+        self.assertEqual(SavingReminder.dispatch_due(now=self.now, batch_size=2), 1)
+        self.assertEqual(SavingReminder.dispatch_due(now=self.now, batch_size=2), 0)
+
+    def test_monthly_reminders_follow_the_goal_schedule(self):
+        goal = make_goal(self.goal.account, days=90, saving_frequency="MONTHLY", name="Rent")
+
+        self.assertEqual(
+            SavingReminder.next_reminder_date(goal, after=self.now) - self.now,
+            goal.milestone_schedule()[1][0] - goal.milestone_schedule()[0][0],
+        )
+
+    def test_no_reminder_is_scheduled_past_the_deadline(self):
+        goal = make_goal(self.goal.account, days=3, saving_frequency="WEEKLY", name="Trip")
+        self.remind(goal=goal)
+
+        SavingReminder.dispatch_due(now=self.now)
+        self.assertFalse(SavingReminder.objects.filter(is_sent=False).exists())
+
+
+class GoalEditTests(TransactionTestCase):
+    """
+    Goal edits run outside any request transaction, like under autocommit in production.
+    """
+
+    def setUp(self):
+        self.account = make_member(1)
+        self.goal = make_goal(self.account, current_amount=Decimal("600.00"))
+        self.client = APIClient()
+        self.client.force_authenticate(make_admin("savings-admin"))
+
+    def test_editing_a_goal_applies_transitions_in_a_transaction(self):
+        in_transaction = []
+        achieve_milestones = Goal.achieve_milestones
+
+        def spy(goal):
+            in_transaction.append(connection.in_atomic_block)
+            return achieve_milestones(goal)
+
+        with mock.patch.object(Goal, "achieve_milestones", spy):
+            response = self.client.patch(f"/api/goals/{self.goal.pk}/", {"target_amount": "500.00"}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(in_transaction, [True])
+        self.goal.refresh_from_db()
+        self.assertFalse(self.goal.is_active)
+        self.assertFalse(SavingMilestone.objects.filter(goal=self.goal, achieved=False).exists())
+
+
+class GoalNotificationEndpointTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1)
+        self.goal = make_goal(self.account, days=28, saving_frequency="WEEKLY")
+        self.client = APIClient()
+        self.client.force_authenticate(self.account.user)
+
+    def test_goal_notices_keep_the_old_shape(self):
+        Deposit.objects.create(goal=self.goal, amount=Decimal("300.00"))
+        UserNotification.objects.create(
+            user=self.account.user, account=self.account, title="Deposit", message="Not about a goal",
+        )
+
+        response = self.client.get("/api/notifications/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        notice = response.data["results"][0]
+        self.assertEqual((notice["goal"], notice["notification_type"]), (self.goal.pk, "Milestone Reached"))
+
+    def test_goal_notices_cannot_be_created(self):
+        self.client.force_authenticate(make_admin("savings-admin"))
+        response = self.client.post("/api/notifications/", {"goal": self.goal.pk, "message": "Hi"}, format="json")
+        self.assertEqual(response.status_code, 405)
+
+
+class StandingOrderTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1, balance=1000)
+        self.today = datetime.date.today()
+
+    def balance(self):
+        return Account.objects.get(pk=self.account.pk).account_balance
+
+    def test_once_order_is_not_rearmed_by_an_edit(self):
+        goal = make_goal(self.account, saving_frequency="ONCE", auto_save_amount=100)
+        Goal.run_standing_orders(self.today)
+        goal.refresh_from_db()
+        self.assertIsNone(goal.next_run)
+
+        goal.name = "Renamed"
+        goal.save()
+        Goal.run_standing_orders(self.today)
+
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_amount, Decimal("100.00"))
+        self.assertEqual(self.balance(), 900)
+
+    def test_changing_the_amount_rearms_a_finished_order(self):
+        goal = make_goal(self.account, saving_frequency="ONCE", auto_save_amount=100)
+        Goal.run_standing_orders(self.today)
+        goal.refresh_from_db()
+
+        goal.auto_save_amount = 50
+        goal.save()
+        self.assertEqual(goal.next_run, self.today)
+
+    def test_goal_behind_schedule_is_charged_once(self):
+        goal = make_goal(self.account, saving_frequency="DAILY", auto_save_amount=100)
+        Goal.objects.filter(pk=goal.pk).update(next_run=self.today - datetime.timedelta(days=20))
+
+        stats = Goal.run_standing_orders(self.today)
+
+        self.assertEqual(stats, {"completed": 1, "failed": 0})
+        self.assertEqual(self.balance(), 900)
+        self.assertEqual(SavingTransaction.objects.filter(goal=goal).count(), 1)
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_amount, Decimal("100.00"))
+        self.assertEqual(goal.next_run, self.today + datetime.timedelta(days=1))
+
+    def test_next_run_is_read_only_over_the_api(self):
+        goal = make_goal(self.account, saving_frequency="WEEKLY", auto_save_amount=100)
+        client = APIClient()
+        client.force_authenticate(make_admin("savings-admin"))
+
+        response = client.patch(
+            f"/api/goals/{goal.pk}/", {"next_run": (self.today - datetime.timedelta(days=7)).isoformat()}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        goal.refresh_from_db()
+        self.assertEqual(goal.next_run, self.today)
+
+
+@override_settings(GOAL_INTEREST_RATE="10", ACCOUNT_INTEREST_RATE="3.65")
+class InterestAccrualTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1, balance=1000)
+        self.goal = make_goal(self.account, current_amount=Decimal("100.00"))
+
+    def accrued(self, run):
+        return sorted(run.accruals.values_list("goal", "account", "balance", "amount"), key=str)
+
+    def test_accrues_a_day_of_interest_per_holder(self):
+        run = InterestRun.accrue(datetime.date(2025, 6, 1))
+
+        self.assertEqual(self.accrued(run), sorted([
+            (self.goal.pk, None, Decimal("100.00"), Decimal("0.0274")),
+            (None, self.account.pk, Decimal("1000.00"), Decimal("0.1000")),
+        ], key=str))
+        self.assertEqual((run.entry_count, run.total_amount), (2, Decimal("0.1274")))
+
+    def test_leap_years_have_366_days(self):
+        run = InterestRun.accrue(datetime.date(2024, 6, 1))
+
+        self.assertEqual(run.accruals.get(goal=self.goal).amount, Decimal("0.0273"))
+
+    def test_interest_that_rounds_to_nothing_is_skipped(self):
+        make_goal(self.account, name="Loose change", current_amount=Decimal("0.01"))
+        make_goal(self.account, name="Closed", current_amount=Decimal("500.00"), is_active=False)
+
+        run = InterestRun.accrue(datetime.date(2025, 6, 1))
+
+        self.assertEqual(run.entry_count, 2)
+
+    def test_a_date_is_accrued_once(self):
+        InterestRun.accrue(datetime.date(2025, 6, 1))
+
+        self.assertIsNone(InterestRun.accrue(datetime.date(2025, 6, 1)))
+        self.assertEqual(InterestAccrual.objects.count(), 2)
+
+
+class InterestCapitalisationTests(TestCase):
+
+    def setUp(self):
+        self.account = make_member(1, balance=1000)
+        self.goal = make_goal(self.account, current_amount=Decimal("100.00"))
+        self.today = datetime.date.today()
+
+    def accrue(self, days_ago, **holder):
+        run, _ = InterestRun.objects.get_or_create(
+            run_date=self.today - datetime.timedelta(days=days_ago), run_type="accrual"
+        )
+        return InterestAccrual.objects.create(run=run, balance=0, **holder)
+
+    def test_capitalise_credits_earlier_accruals_and_carries_fractions(self):
+        self.accrue(2, goal=self.goal, amount=Decimal("0.0150"))
+        self.accrue(1, goal=self.goal, amount=Decimal("0.0150"))
+        self.accrue(1, account=self.account, amount=Decimal("1.6000"))
+        today = self.accrue(0, goal=self.goal, amount=Decimal("5.0000"))
+
+        run = InterestRun.capitalise(self.today)
+
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal("100.03"))
+        self.assertEqual(Account.objects.get(pk=self.account.pk).account_balance, 1001)
+        self.assertEqual(run.capitalised_accruals.count(), 3)
+        today.refresh_from_db()
+        self.assertIsNone(today.capitalisation)
+        carry = InterestAccrual.objects.get(run=run)
+        self.assertEqual((carry.account_id, carry.amount), (self.account.pk, Decimal("0.6000")))
+
+    def test_carried_fraction_is_capitalised_on_a_later_run(self):
+        self.accrue(40, account=self.account, amount=Decimal("0.6000"))
+        InterestRun.capitalise(self.today - datetime.timedelta(days=30))
+        self.accrue(1, account=self.account, amount=Decimal("0.6000"))
+
+        run = InterestRun.capitalise(self.today)
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).account_balance, 1001)
+        self.assertEqual(list(InterestAccrual.objects.filter(capitalisation__isnull=True).values_list("run", "amount")), [(run.pk, Decimal("0.2000"))])
@@ -1,7 +1,9 @@
 from rest_framework import viewsets, permissions
-from .models import Goal, Deposit, SavingMilestone, SavingReminder, TransactionHistory, GoalNotification
+from .models import Goal, Deposit, SavingMilestone, SavingReminder, TransactionHistory
+from notifications.models import UserNotification
 from .serializers import GoalSerializer, DepositSerializer, SavingMilestoneSerializer, SavingReminderSerializer, TransactionHistorySerializer, GoalNotificationSerializer, GoalProgressSerializer
 from rest_framework.response import Response
+from rest_framework.decorators import action
 from rest_framework import status , filters
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import GoalFilter, DepositFilter, SavingMilestoneFilter, TransactionHistoryFilter
@@ -25,6 +27,26 @@ class GoalViewSet(viewsets.ModelViewSet):
     # def perform_create(self, serializer):
         # serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def schedule(self, request, pk=None):
+        """
+        Full saving schedule for a goal, derived from its parameters on read.
+        Only a handful of checkpoints are stored as milestones.
+        """
+        goal = self.get_object()
+        schedule = [
+            {
+                'milestone_date': milestone_date,
+                'milestone_amount': amount,
+                'achieved': amount <= goal.current_amount,
+            }
+            for milestone_date, amount in goal.milestone_schedule()
+        ]
+        page = self.paginate_queryset(schedule)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(schedule)
+
 
 # View for Deposit (ModelViewSet)
 class DepositViewSet(viewsets.ModelViewSet):
@@ -96,22 +118,24 @@ class TransactionHistoryViewSet(viewsets.ModelViewSet):
         return self.queryset  # Admin or any other role has access to all transaction histories
 
 
-# View for Goal Notifications (ModelViewSet)
+# View for Goal Notifications: the goal-related rows of UserNotification, in the old GoalNotification shape.
+# They are raised by the goal itself, so they can be read, marked read or deleted but not created.
 class GoalNotificationViewSet(viewsets.ModelViewSet):
-    queryset = GoalNotification.objects.all()
+    queryset = UserNotification.objects.filter(source_type='goal').order_by('-date_sent')
     serializer_class = GoalNotificationSerializer
+    http_method_names = ['get', 'patch', 'delete', 'head', 'options']
 
     def get_queryset(self):
         # Return notifications related to the authenticated user
         user = self.request.user
         if user.role == 'customer':
-            return self.queryset.filter(account__user=user)
+            return self.queryset.filter(user=user)
         return self.queryset  # Admin or any other role has access to all notifications
 
 
 # View to update the goal progress (Custom Update View)
 class GoalProgressUpdateView(viewsets.ViewSet):
-    queryset = GoalNotification.objects.all()
+    queryset = Goal.objects.all()
     serializer_class = GoalProgressSerializer
 
     permission_classes = [permissions.IsAuthenticated]
@@ -129,8 +153,6 @@ class GoalProgressUpdateView(viewsets.ViewSet):
 
         # Update goal progress
         goal.update_amount(new_deposit_amount)
-        goal.progress_percentage = (goal.current_amount / goal.target_amount) * 100
-        goal.save()
 
         return Response({'progress_percentage': goal.progress_percentage}, status=status.HTTP_200_OK)
 
@@ -148,9 +170,7 @@ class MakeDepositViewSet(viewsets.ViewSet):
 
         serializer = DepositSerializer(data=request.data)
         if serializer.is_valid():
-            # Assign goal to the deposit and save
-            serializer.save(user=request.user, goal=goal)
-            goal.update_amount(serializer.validated_data['amount'])
-            goal.save()
+            # Assign goal to the deposit and save; the Deposit post_save signal posts the amount to the goal
+            serializer.save(goal=goal)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -19,6 +19,7 @@ from .models import (
 )
 from accounts.models import Account
 from loans.models import Loan, LoanPayment, LoanHistory
+from notifications import push
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -192,6 +193,24 @@ def update_balance_on_deposit(sender, instance, created, **kwargs):
         logger.error(f"Error processing deposit transaction {instance.transaction_id}: {str(e)}")
         raise
 
+@receiver(post_save, sender=DepositTransaction)
+def push_deposit_status(sender, instance, created, **kwargs):
+    """
+    Let the depositor's open streams know where the deposit stands, so clients waiting on an
+    STK push don't have to poll.
+    """
+    state = (instance.status, instance.is_processed)
+    if getattr(instance, "_pushed_state", None) == state:
+        return  # Re-saved (e.g. by update_balance_on_deposit) without a visible change
+    instance._pushed_state = state
+    push.publish_to_user(instance.user_id, "deposit.status", {
+        "transaction_id": instance.transaction_id,
+        "status": instance.status,
+        "amount": instance.amount,
+        "is_processed": instance.is_processed,
+        "update": instance.update,
+    })
+
 @receiver(post_save, sender=LoanTransaction)
 @transaction.atomic
 def update_balance_on_loan(sender, instance, created, **kwargs):
@@ -304,18 +323,14 @@ def update_balance_on_saving(sender, instance, created, **kwargs):
             return
 
         if instance.transaction_type == "saving":
-            # Update goal amount
-            goal.current_amount += amount
+            # Post the amount to the goal (progress, milestones and completion)
+            goal.update_amount(amount)
         elif instance.transaction_type == "withdraw":
-            # Update goal amount
-            goal.current_amount -= amount
+            goal.update_amount(-amount)
 
         # Set is_processed to True
         instance.is_processed = True
 
-        # Save goal
-        goal.save()
-
         # Save instance
         instance.save()
 
@@ -92,15 +92,13 @@ class TransferTransactionViewSet(viewsets.ModelViewSet):
                 sender_account.account_balance -= amount
                 sender_account.save()
             if sender_goal:
-                sender_goal.current_amount -= amount
-                sender_goal.save()
+                sender_goal.update_amount(-amount)
 
             if receiver_account:
                 receiver_account.account_balance += amount
                 receiver_account.save()
             if receiver_goal:
-                receiver_goal.current_amount += amount
-                receiver_goal.save()
+                receiver_goal.update_amount(amount)
 
             # Create the transfer transaction
             data['payment_method'] = 'in-house'
@@ -447,11 +445,7 @@ class SavingTransactionViewSet(viewsets.ModelViewSet):
             account.account_balance -= amount
             account.save()
 
-            # Update goal amount
-            goal.current_amount += amount
-            goal.save()
-
-            # Create saving transaction
+            # Create saving transaction; update_balance_on_saving posts the amount to the goal
             transaction = SavingTransaction.objects.create(
                 user=request.user,
                 goal=goal,
@@ -491,15 +485,11 @@ class SavingTransactionViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Account does not exist.'}, status=400)
 
         try:
-            # Deduct amount from goal
-            goal.current_amount -= amount
-            goal.save()
-
             # Add amount to account balance
             account.account_balance += amount
             account.save()
 
-            # Create saving transaction
+            # Create saving transaction; update_balance_on_saving takes the amount off the goal
             transaction = SavingTransaction.objects.create(
                 user=request.user,
                 goal=goal,